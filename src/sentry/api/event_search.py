@@ -1,7 +1,8 @@
 import re
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 from copy import deepcopy
 from datetime import datetime
+from threading import Lock
 
 from django.utils.functional import cached_property
 from parsimonious.exceptions import IncompleteParseError, ParseError
@@ -25,6 +26,7 @@ from sentry.search.utils import (
     parse_release,
 )
 from sentry.snuba.dataset import Dataset
+from sentry.utils import metrics
 from sentry.utils.compat import filter, map, zip
 from sentry.utils.dates import to_timestamp
 from sentry.utils.snuba import (
@@ -357,6 +359,9 @@ class SearchVisitor(NodeVisitor):
     def __init__(self, allow_boolean=True, params=None):
         self.allow_boolean = allow_boolean
         self.params = params if params is not None else {}
+        # Whether the result of the last visit only depends on the query and
+        # ``allow_boolean``, and can be cached by ``SearchQueryCache``.
+        self.cacheable = True
         super().__init__()
 
     @cached_property
@@ -537,6 +542,8 @@ class SearchVisitor(NodeVisitor):
             aggregate_value = None
             if search_value.expr_name in ["duration_format", "percentage_format"]:
                 # Even if the search value matches duration format, only act as duration for certain columns
+                if self.params:
+                    self.cacheable = False
                 function = resolve_field(
                     search_key.name, self.params, functions_acl=FUNCTIONS.keys()
                 )
@@ -579,6 +586,7 @@ class SearchVisitor(NodeVisitor):
         operator = self.handle_negation(negation, operator)
         is_date_aggregate = any(key in search_key.name for key in self.date_keys)
         if is_date_aggregate:
+            self.cacheable = False
             try:
                 from_val, to_val = parse_datetime_range(search_value.text)
             except InvalidQuery as exc:
@@ -628,6 +636,8 @@ class SearchVisitor(NodeVisitor):
     def visit_rel_time_filter(self, node, children):
         (search_key, _, value) = children
         if search_key.name in self.date_keys:
+            # Relative dates are resolved against the current time.
+            self.cacheable = False
             try:
                 from_val, to_val = parse_datetime_range(value.text)
             except InvalidQuery as exc:
@@ -827,9 +837,61 @@ class SearchVisitor(NodeVisitor):
         return children or node
 
 
-def parse_search_query(query, allow_boolean=True, params=None):
+class SearchQueryCache:
+    """
+    A bounded LRU cache of parsed search queries.
+
+    Entries are keyed by the query and the configuration of the visitor
+    (its class and ``allow_boolean``). Results which depend on anything else,
+    like relative dates or the ``params`` passed to the visitor, are not
+    cached (see ``SearchVisitor.cacheable``), and neither are parse errors.
+
+    The cached terms are shared between callers, which must not modify them.
+    Every lookup returns a new list of terms, so that callers can still add
+    or remove terms of their own.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def parse(self, query, visitor, parse_tree):
+        """
+        Returns the terms of ``query``, as parsed with ``parse_tree`` and
+        visited with ``visitor``.
+        """
+        key = (type(visitor), visitor.allow_boolean, query)
+        with self._lock:
+            terms = self._items.get(key)
+            if terms is not None:
+                self._items.move_to_end(key)
+
+        if terms is not None:
+            metrics.incr("event_search.parse_cache", tags={"result": "hit"}, sample_rate=0.1)
+            return list(terms)
+
+        terms = visitor.visit(parse_tree(query))
+        if visitor.cacheable:
+            with self._lock:
+                self._items[key] = tuple(terms)
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+
+        metrics.incr("event_search.parse_cache", tags={"result": "miss"}, sample_rate=0.1)
+        return list(terms)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+search_query_cache = SearchQueryCache()
+
+
+def _parse_event_search_tree(query):
     try:
-        tree = event_search_grammar.parse(query)
+        return event_search_grammar.parse(query)
     except IncompleteParseError as e:
         idx = e.column()
         prefix = query[max(0, idx - 5) : idx]
@@ -840,7 +902,12 @@ def parse_search_query(query, allow_boolean=True, params=None):
                 "This is commonly caused by unmatched parentheses. Enclose any text in double quotes.",
             )
         )
-    return SearchVisitor(allow_boolean, params=params).visit(tree)
+
+
+def parse_search_query(query, allow_boolean=True, params=None):
+    return search_query_cache.parse(
+        query, SearchVisitor(allow_boolean, params=params), _parse_event_search_tree
+    )
 
 
 def convert_aggregate_filter_to_snuba_query(aggregate_filter, params):
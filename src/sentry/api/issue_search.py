@@ -10,6 +10,7 @@ from sentry.api.event_search import (
     SearchVisitor,
     equality_operators,
     event_search_grammar,
+    search_query_cache,
     to_list,
 )
 from sentry.models.group import STATUS_QUERY_CHOICES
@@ -80,9 +81,9 @@ class IssueSearchVisitor(SearchVisitor):
         )
 
 
-def parse_search_query(query):
+def _parse_issue_search_tree(query):
     try:
-        tree = event_search_grammar.parse(query)
+        return event_search_grammar.parse(query)
     except IncompleteParseError as e:
         raise InvalidSearchQuery(
             "%s %s"
@@ -91,7 +92,12 @@ def parse_search_query(query):
                 "This is commonly caused by unmatched-parentheses. Enclose any text in double quotes.",
             )
         )
-    return IssueSearchVisitor(allow_boolean=False).visit(tree)
+
+
+def parse_search_query(query):
+    return search_query_cache.parse(
+        query, IssueSearchVisitor(allow_boolean=False), _parse_issue_search_tree
+    )
 
 
 def convert_actor_or_none_value(value, projects, user, environments):
@@ -1,12 +1,18 @@
 import logging
+from collections import defaultdict
 
 from django.db.models import F
 
+from sentry.db.models.query import bulk_increment
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
 from sentry.utils.services import Service
 
 
+def _has_expressions(values):
+    return any(hasattr(v, "resolve_expression") for v in values.values())
+
+
 class BufferMount(type):
     def __new__(cls, name, bases, attrs):
         new_cls = type.__new__(cls, name, bases, attrs)
@@ -82,3 +88,68 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, items):
+        """
+        Process many buffered increments at once. ``items`` is a list of
+        ``(model, columns, filters, extra, signal_only)`` tuples, as passed to
+        ``process``.
+
+        Increments for existing rows are applied with a single statement per
+        model and set of columns; anything else (new rows, signal only
+        increments, expressions) goes through ``process``.
+        """
+        from sentry.models import Group
+
+        batches = defaultdict(list)
+        for item in items:
+            model, columns, filters, extra, signal_only = item
+            if signal_only or _has_expressions(filters):
+                self.process(*item)
+                continue
+            batch_key = (
+                model,
+                tuple(sorted(filters)),
+                tuple(sorted(columns)),
+                tuple(sorted(extra or ())),
+            )
+            batches[batch_key].append(item)
+
+        for (model, _, column_names, extra_names), batch in batches.items():
+            expressions = {}
+            # See the score HACK in ``process``, which overrides any score
+            # passed in ``extra``.
+            if model is Group and "last_seen" in extra_names and "times_seen" in column_names:
+                expressions["score"] = (
+                    "log(t.times_seen + v.i_times_seen) * 600 "
+                    "+ floor(extract(epoch from v.e_last_seen))"
+                )
+
+            rows = []
+            fallback = []
+            for item in batch:
+                _, columns, filters, extra, _ = item
+                values = {k: v for k, v in (extra or {}).items() if k not in expressions}
+                if len(batch) == 1 or not (columns or values) or _has_expressions(values):
+                    fallback.append(item)
+                else:
+                    rows.append((item, (filters, columns, values)))
+
+            updated = bulk_increment(model, [row for _, row in rows], expressions=expressions)
+            for index, (item, _) in enumerate(rows):
+                if index not in updated:
+                    # The row does not exist yet, let ``process`` create it.
+                    fallback.append(item)
+                    continue
+                _, columns, filters, extra, _ = item
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+            for item in fallback:
+                self.process(*item)
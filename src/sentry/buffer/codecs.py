@@ -0,0 +1,164 @@
+"""
+Value codecs used by the Redis buffer to serialize ``filters`` and ``extra``
+columns into hash fields.
+
+Every codec can read values written by any other codec (as well as values
+written by older versions of Sentry), so switching the ``value_codec`` option
+of ``RedisBuffer`` does not require draining the buffer first.
+
+The wire formats are distinguished by their first bytes:
+
+- Values starting with ``MSGPACK_HEADER`` are versioned msgpack payloads.
+- Values starting with ``{`` or ``[`` are typed JSON payloads. A dictionary is
+  encoded as ``{"key": [type, value], ...}``, any other value as ``[type, value]``.
+- Everything else is a pickle, which is the legacy format.
+"""
+
+import pickle
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Mapping, Tuple
+
+import msgpack
+
+from sentry.utils import json
+from sentry.utils.codecs import Codec
+
+# ``\x00`` can neither start a pickle (protocol 0 starts with an opcode
+# character, later protocols with ``\x80``) nor a JSON document.
+MSGPACK_HEADER = b"\x00\x01"
+
+_EXT_DATETIME = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class PickleValueCodec(Codec[Any, bytes]):
+    """
+    Legacy format. Supports arbitrary values, but is the most expensive to
+    store and to load.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value)
+
+    def decode(self, value: bytes) -> Any:
+        return pickle.loads(value)
+
+
+class TypedJSONValueCodec(Codec[Any, bytes]):
+    """
+    Encodes strings, integers, floats and datetimes (or flat dictionaries of
+    those) as JSON, tagging every scalar with its type. Values that cannot be
+    represented fall back to pickle.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            if isinstance(value, Mapping):
+                payload = {k: self._dump_value(v) for k, v in value.items()}
+            else:
+                payload = self._dump_value(value)
+        except TypeError:
+            return PickleValueCodec().encode(value)
+        return json.dumps(payload).encode("utf-8")
+
+    def decode(self, value: bytes) -> Any:
+        payload = json.loads(value.decode("utf-8"))
+        if isinstance(payload, dict):
+            return {k: self._load_value(v) for k, v in payload.items()}
+        return self._load_value(payload)
+
+    def _dump_value(self, value: Any) -> Tuple[str, str]:
+        if isinstance(value, str):
+            type_ = "s"
+        elif isinstance(value, datetime):
+            type_ = "d"
+            value = value.strftime("%s.%f")
+        elif isinstance(value, bool):
+            # ``bool`` is a subclass of ``int`` and would not round-trip.
+            raise TypeError(type(value))
+        elif isinstance(value, int):
+            type_ = "i"
+        elif isinstance(value, float):
+            type_ = "f"
+        else:
+            raise TypeError(type(value))
+        return (type_, str(value))
+
+    def _load_value(self, payload: Tuple[str, str]) -> Any:
+        (type_, value) = payload
+        if type_ == "s":
+            return str(value)
+        elif type_ == "d":
+            return datetime.fromtimestamp(float(value)).replace(tzinfo=timezone.utc)
+        elif type_ == "i":
+            return int(value)
+        elif type_ == "f":
+            return float(value)
+        else:
+            raise TypeError(f"invalid type: {type_}")
+
+
+class MsgpackValueCodec(Codec[Any, bytes]):
+    """
+    Encodes values as msgpack, prefixed with ``MSGPACK_HEADER``. Datetimes are
+    stored as an extension type holding microseconds since the epoch (naive
+    datetimes are assumed to be UTC). Values containing types msgpack cannot
+    represent fall back to pickle.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            return MSGPACK_HEADER + msgpack.packb(
+                value, default=self._default, use_bin_type=True, strict_types=True
+            )
+        except TypeError:
+            return PickleValueCodec().encode(value)
+
+    def decode(self, value: bytes) -> Any:
+        return msgpack.unpackb(
+            value[len(MSGPACK_HEADER) :], ext_hook=self._ext_hook, raw=False, strict_map_key=False
+        )
+
+    def _default(self, value: Any) -> Any:
+        # With ``strict_types`` anything that is not exactly a builtin type
+        # ends up here (e.g. tuples or Django's ``SafeString``), so that it is
+        # pickled instead of silently losing its type.
+        if type(value) is datetime:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            micros = (value - EPOCH) // timedelta(microseconds=1)
+            return msgpack.ExtType(_EXT_DATETIME, struct.pack(">q", micros))
+        raise TypeError(type(value))
+
+    def _ext_hook(self, code: int, data: bytes) -> Any:
+        if code == _EXT_DATETIME:
+            (micros,) = struct.unpack(">q", data)
+            return EPOCH + timedelta(microseconds=micros)
+        return msgpack.ExtType(code, data)
+
+
+VALUE_CODECS = {
+    "pickle": PickleValueCodec,
+    "json": TypedJSONValueCodec,
+    "msgpack": MsgpackValueCodec,
+}
+
+
+def get_value_codec(name: str) -> Codec[Any, bytes]:
+    try:
+        return VALUE_CODECS[name]()
+    except KeyError:
+        raise ValueError(f"unknown buffer value codec: {name!r}")
+
+
+def decode_value(value: bytes) -> Any:
+    """
+    Decode a value written by any of the buffer value codecs.
+    """
+    if value.startswith(MSGPACK_HEADER):
+        return MsgpackValueCodec().decode(value)
+    if value.startswith((b"{", b"[")):
+        return TypedJSONValueCodec().decode(value)
+    return PickleValueCodec().decode(value)
@@ -1,16 +1,17 @@
-import pickle
+import atexit
 import threading
-from datetime import datetime
+import weakref
+from collections import defaultdict
 from time import time
 
 from django.db import models
-from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 
 from sentry.buffer import Buffer
+from sentry.buffer.codecs import decode_value, get_value_codec
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 from sentry.utils.compat import crc32
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
@@ -19,6 +20,16 @@ from sentry.utils.redis import get_cluster_from_options
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
 
+# Buffers coalescing increments, which are flushed when the process exits.
+_coalescing_buffers = weakref.WeakSet()
+_coalescing_buffers_lock = threading.Lock()
+_flush_on_shutdown_connected = False
+
+
+def _flush_coalescing_buffers(**kwargs):
+    for buffer in list(_coalescing_buffers):
+        buffer.flush_incrs()
+
 
 class PendingBuffer:
     def __init__(self, size):
@@ -47,16 +58,94 @@ class PendingBuffer:
         return rv
 
 
+class PendingIncrs:
+    """
+    Coalesces increments for the same buffer key in memory: counters are
+    summed, extra values are last write wins and filters are kept from the
+    first write (as ``hsetnx`` would).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, key, model, columns, filters, extra, signal_only):
+        pending = self.values.get(key)
+        if pending is None:
+            self.values[key] = [model, dict(columns), filters, dict(extra or {}), signal_only]
+            return
+
+        pending_columns, pending_extra = pending[1], pending[3]
+        for column, amount in columns.items():
+            pending_columns[column] = pending_columns.get(column, 0) + amount
+        if extra:
+            pending_extra.update(extra)
+        if signal_only is True:
+            pending[4] = True
+
+    def requeue(self, key, model, columns, filters, extra, signal_only):
+        """
+        Adds back drained increments which could not be written. They are
+        older than anything added for the key since, so their extra values
+        do not win.
+        """
+        pending = self.values.get(key)
+        if pending is None:
+            self.values[key] = [model, columns, filters, extra, signal_only]
+            return
+
+        pending_columns = pending[1]
+        for column, amount in columns.items():
+            pending_columns[column] = pending_columns.get(column, 0) + amount
+        pending[2] = filters
+        pending[3] = dict(extra, **pending[3])
+        if signal_only is True:
+            pending[4] = True
+
+    def drain(self):
+        rv = self.values
+        self.values = {}
+        return rv
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        value_codec="pickle",
+        incr_coalesce_window=None,
+        incr_coalesce_size=1000,
+        process_batched=False,
+        **options,
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        # Values written by any codec can always be read back, see
+        # ``sentry.buffer.codecs``.
+        self.value_codec = get_value_codec(value_codec)
+        # When set, increments are held in memory for up to
+        # ``incr_coalesce_window`` seconds (or until ``incr_coalesce_size``
+        # distinct keys are pending) and written with one pipeline per host.
+        self.incr_coalesce_window = incr_coalesce_window
+        self.incr_coalesce_size = incr_coalesce_size
+        self.pending_incrs = PendingIncrs()
+        # When set, ``process`` applies all keys of a batch at once instead of
+        # one by one. Use with a larger ``incr_batch_size``.
+        self.process_batched = process_batched
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.incr_coalesce_size > 0
+
+        if self.incr_coalesce_window:
+            self._connect_flush_on_shutdown()
 
     def validate(self):
         try:
@@ -103,45 +192,6 @@ class RedisBuffer(Buffer):
     def _make_lock_key(self, key):
         return f"l:{key}"
 
-    def _dump_values(self, values):
-        result = {}
-        for k, v in values.items():
-            result[k] = self._dump_value(v)
-        return result
-
-    def _dump_value(self, value):
-        if isinstance(value, str):
-            type_ = "s"
-        elif isinstance(value, datetime):
-            type_ = "d"
-            value = value.strftime("%s.%f")
-        elif isinstance(value, int):
-            type_ = "i"
-        elif isinstance(value, float):
-            type_ = "f"
-        else:
-            raise TypeError(type(value))
-        return (type_, str(value))
-
-    def _load_values(self, payload):
-        result = {}
-        for k, (t, v) in payload.items():
-            result[k] = self._load_value((t, v))
-        return result
-
-    def _load_value(self, payload):
-        (type_, value) = payload
-        if type_ == "s":
-            return force_text(value)
-        elif type_ == "d":
-            return datetime.fromtimestamp(float(value)).replace(tzinfo=timezone.utc)
-        elif type_ == "i":
-            return int(value)
-        elif type_ == "f":
-            return float(value)
-        else:
-            raise TypeError(f"invalid type: {type_}")
-
     def incr(self, model, columns, filters, extra=None, signal_only=None):
         """
         Increment the key by doing the following:
@@ -153,20 +203,29 @@ class RedisBuffer(Buffer):
         - Add hashmap key to pending flushes
         """
 
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
         key = self._make_key(model, filters)
+
+        if self.incr_coalesce_window:
+            self._coalesce_incr(key, model, columns, filters, extra, signal_only)
+        else:
+            # We can't use conn.map() due to wanting to support multiple pending
+            # keys (one per Redis partition)
+            conn = self.cluster.get_local_client_for_key(key)
+            pipe = conn.pipeline()
+            self._write_incr(pipe, key, model, columns, filters, extra, signal_only)
+            pipe.execute()
+
+        metrics.incr(
+            "buffer.incr",
+            skip_internal=True,
+            tags={"module": model.__module__, "model": model.__name__},
+        )
+
+    def _write_incr(self, pipe, key, model, columns, filters, extra, signal_only):
         pending_key = self._make_pending_key_from_key(key)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis partition)
-        conn = self.cluster.get_local_client_for_key(key)
 
-        pipe = conn.pipeline()
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
-        # TODO(dcramer): once this goes live in production, we can kill the pickle path
-        # (this is to ensure a zero downtime deploy where we can transition event processing)
-        pipe.hsetnx(key, "f", pickle.dumps(filters))
-        # pipe.hsetnx(key, 'f', json.dumps(self._dump_values(filters)))
+        pipe.hsetnx(key, "f", self.value_codec.encode(filters))
         for column, amount in columns.items():
             pipe.hincrby(key, "i+" + column, amount)
 
@@ -175,23 +234,88 @@ class RedisBuffer(Buffer):
             # hook here
             # e.g. "update score if last_seen or times_seen is changed"
             for column, value in extra.items():
-                # TODO(dcramer): once this goes live in production, we can kill the pickle path
-                # (this is to ensure a zero downtime deploy where we can transition event processing)
-                pipe.hset(key, "e+" + column, pickle.dumps(value))
-                # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
+                pipe.hset(key, "e+" + column, self.value_codec.encode(value))
 
         if signal_only is True:
             pipe.hset(key, "s", "1")
 
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
 
-        metrics.incr(
-            "buffer.incr",
-            skip_internal=True,
-            tags={"module": model.__module__, "model": model.__name__},
-        )
+    def _coalesce_incr(self, key, model, columns, filters, extra, signal_only):
+        with self.pending_incrs.lock:
+            self.pending_incrs.add(key, model, columns, filters, extra, signal_only)
+            pending_count = len(self.pending_incrs)
+
+        if pending_count >= self.incr_coalesce_size:
+            self.flush_incrs()
+        elif pending_count == 1:
+            # The first pending key starts the window. If the window was
+            # already flushed by size, a late timer just flushes early.
+            self._schedule_flush_incrs()
+
+    def _schedule_flush_incrs(self):
+        timer = threading.Timer(self.incr_coalesce_window, self.flush_incrs)
+        timer.daemon = True
+        timer.start()
+
+    def flush_incrs(self):
+        """
+        Write all coalesced increments to Redis, using a single pipeline per
+        host.
+
+        Increments of hosts that could not be written to are queued again and
+        retried with the next flush, as this usually runs in a timer thread
+        where errors would go unnoticed.
+        """
+        with self.pending_incrs.lock:
+            pending = self.pending_incrs.drain()
+
+        if not pending:
+            return
+
+        router = self.cluster.get_router()
+        pipes = {}
+        keys_by_host = defaultdict(list)
+        for key, (model, columns, filters, extra, signal_only) in pending.items():
+            # Keys have to be written to their own host, as the pending set
+            # they are added to lives next to them.
+            host_id = router.get_host_for_key(key)
+            pipe = pipes.get(host_id)
+            if pipe is None:
+                pipe = pipes[host_id] = self.cluster.get_local_client(host_id).pipeline()
+            self._write_incr(pipe, key, model, columns, filters, extra, signal_only)
+            keys_by_host[host_id].append(key)
+
+        failed_keys = []
+        for host_id, pipe in pipes.items():
+            try:
+                pipe.execute()
+            except Exception:
+                self.logger.exception("buffer.incr-flush-failed", extra={"host_id": host_id})
+                failed_keys.extend(keys_by_host[host_id])
+
+        metrics.timing("buffer.incr-coalesced-keys", len(pending))
+
+        if failed_keys:
+            metrics.incr("buffer.incr-flush-failed", amount=len(failed_keys), skip_internal=True)
+            with self.pending_incrs.lock:
+                for key in failed_keys:
+                    self.pending_incrs.requeue(key, *pending[key])
+            self._schedule_flush_incrs()
+
+    def _connect_flush_on_shutdown(self):
+        global _flush_on_shutdown_connected
+        from celery.signals import worker_process_shutdown
+
+        with _coalescing_buffers_lock:
+            if not _flush_on_shutdown_connected:
+                # The handlers are only connected once per process, as they
+                # flush all buffers.
+                atexit.register(_flush_coalescing_buffers)
+                worker_process_shutdown.connect(_flush_coalescing_buffers, weak=False)
+                _flush_on_shutdown_connected = True
+            _coalescing_buffers.add(self)
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -243,9 +367,43 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.process_batched and len(batch_keys) > 1:
+            self._process_batch(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
+    def _load_incr(self, values):
+        """
+        Turn the (non-empty) contents of a buffer hash into the arguments
+        for ``Buffer.process``.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
+
+        filters = decode_value(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                extra_values[k[2:]] = decode_value(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -266,42 +424,64 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
             if not values:
                 metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
                 self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
                 return
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
+            super().process(*self._load_incr(values))
+        finally:
+            client.delete(lock_key)
 
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+    def _process_batch(self, keys):
+        """
+        Like ``_process_single_incr``, but locks and reads all keys with one
+        round trip per host and applies them with ``Buffer.process_batch``.
+        """
+        # The keys stay locked until the whole batch is applied, so give the
+        # locks a second per key on top of the timeout for a single key.
+        lock_expire = 10 + len(keys)
+        with self.cluster.map() as conn:
+            locks = {
+                key: conn.set(self._make_lock_key(key), "1", nx=True, ex=lock_expire)
+                for key in keys
+            }
+
+        locked_keys = []
+        for key, result in locks.items():
+            if result.value:
+                locked_keys.append(key)
             else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            super().process(model, incr_values, filters, extra_values, signal_only)
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+        try:
+            router = self.cluster.get_router()
+            keys_by_host = defaultdict(list)
+            for key in locked_keys:
+                keys_by_host[router.get_host_for_key(key)].append(key)
+
+            items = []
+            for host_id, host_keys in keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for key, values in zip(host_keys, results[::3]):
+                    if not values:
+                        metrics.incr(
+                            "buffer.revoked", tags={"reason": "empty"}, skip_internal=False
+                        )
+                        self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                        continue
+                    items.append(self._load_incr(values))
+
+            metrics.timing("buffer.process-batch-size", len(items))
+            super().process_batch(items)
         finally:
-            client.delete(lock_key)
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
@@ -22,3 +22,18 @@ class BaseCache(local):
 
     def get(self, key, version=None, raw=False):
         raise NotImplementedError
+
+    def get_many(self, keys, version=None, raw=False):
+        """
+        Returns the values of ``keys`` in the same order, ``None`` for
+        missing keys.
+        """
+        return [self.get(key, version=version, raw=raw) for key in keys]
+
+    def set_many(self, items, timeout, version=None, raw=False):
+        for key, value in items:
+            self.set(key, value, timeout, version=version, raw=raw)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
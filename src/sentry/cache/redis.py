@@ -37,6 +37,40 @@ class CommonRedisCache(BaseCache):
             result = json.loads(result)
         return result
 
+    def _encode_items(self, items, version, raw):
+        rv = []
+        for key, value in items:
+            key = self.make_key(key, version=version)
+            v = json.dumps(value) if not raw else value
+            if len(v) > self.max_size:
+                raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+            rv.append((key, v))
+        return rv
+
+    def _decode_values(self, values, raw):
+        return [json.loads(v) if v is not None and not raw else v for v in values]
+
+    def get_many(self, keys, version=None, raw=False):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self.make_key(key, version=version))
+        return self._decode_values(pipe.execute(), raw)
+
+    def set_many(self, items, timeout, version=None, raw=False):
+        pipe = self.client.pipeline(transaction=False)
+        for key, v in self._encode_items(items, version, raw):
+            if timeout:
+                pipe.setex(key, int(timeout), v)
+            else:
+                pipe.set(key, v)
+        pipe.execute()
+
+    def delete_many(self, keys, version=None):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.delete(self.make_key(key, version=version))
+        pipe.execute()
+
 
 class RbCache(CommonRedisCache):
     def __init__(self, **options):
@@ -44,12 +78,38 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    # The routing client does not support pipelines, but sends the commands
+    # issued in a ``map`` context to all hosts in parallel.
+
+    def get_many(self, keys, version=None, raw=False):
+        with self.client.map() as client:
+            promises = [client.get(self.make_key(key, version=version)) for key in keys]
+        return self._decode_values([p.value for p in promises], raw)
+
+    def set_many(self, items, timeout, version=None, raw=False):
+        with self.client.map() as client:
+            for key, v in self._encode_items(items, version, raw):
+                if timeout:
+                    client.setex(key, int(timeout), v)
+                else:
+                    client.set(key, v)
+
+    def delete_many(self, keys, version=None):
+        with self.client.map() as client:
+            for key in keys:
+                client.delete(self.make_key(key, version=version))
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
 
 
 class RedisClusterCache(CommonRedisCache):
-    def __init__(self, cluster_id, **options):
-        client = redis_clusters.get(cluster_id)
+    def __init__(self, cluster_id, raw_values=False, **options):
+        if raw_values:
+            # Binary values can only be read with a client which does not
+            # decode responses to strings.
+            client = redis_clusters.get(cluster_id, decode_responses=False)
+        else:
+            client = redis_clusters.get(cluster_id)
         CommonRedisCache.__init__(self, client=client, **options)
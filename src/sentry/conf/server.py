@@ -1187,6 +1187,10 @@ SENTRY_ATTACHMENTS_OPTIONS = {}
 SENTRY_EVENT_PROCESSING_STORE = "sentry.eventstore.processing.default.DefaultEventProcessingStore"
 SENTRY_EVENT_PROCESSING_STORE_OPTIONS = {}
 
+# Index of events processed by the ingest consumer, used for deduplication
+SENTRY_INGEST_DEDUPLICATOR = "sentry.ingest.deduplication.default.CacheEventDeduplicator"
+SENTRY_INGEST_DEDUPLICATOR_OPTIONS = {}
+
 # The internal Django cache is still used in many places
 # TODO(dcramer): convert uses over to Sentry's backend
 CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
@@ -1225,6 +1229,15 @@ SENTRY_DEFAULT_MAX_EVENTS_PER_MINUTE = "90%"
 SENTRY_SNUBA = os.environ.get("SNUBA", "http://127.0.0.1:1218")
 SENTRY_SNUBA_TIMEOUT = 30
 SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
+# How many seconds expired query cache entries are still served while one
+# worker refreshes them (stale-while-revalidate)
+SENTRY_SNUBA_CACHE_STALE_SECONDS = 0
+# If set, only one worker queries snuba on a query cache miss while others
+# wait up to this many seconds for its result
+SENTRY_SNUBA_CACHE_LOCK_WAIT_SECONDS = 0
+# Quantize the time window of queries relative to now to this many seconds in
+# query cache keys
+SENTRY_SNUBA_CACHE_TIME_QUANTUM_SECONDS = 0
 
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
@@ -1312,6 +1325,21 @@ SENTRY_SOURCE_FETCH_SOCKET_TIMEOUT = 2
 # Maximum content length for source files before we abort fetching
 SENTRY_SOURCE_FETCH_MAX_SIZE = 40 * 1024 * 1024
 
+# Number of threads (shared by all events processed by a worker) fetching the
+# source files and source maps of JavaScript events concurrently. Sources are
+# fetched serially when this is 0.
+SENTRY_SOURCE_FETCH_WORKERS = 0
+
+# Maximum number of concurrent source fetches for a single event, and for a
+# single host within an event
+SENTRY_SOURCE_FETCH_EVENT_CONCURRENCY = 8
+SENTRY_SOURCE_FETCH_HOST_CONCURRENCY = 4
+
+# Maximum total size (in bytes) of the source maps and source files whose
+# parsed views are kept in memory by each worker, to be reused by the
+# following events. Disabled when 0.
+SENTRY_SOURCEMAP_VIEW_CACHE_SIZE = 0
+
 # Maximum content length for cache value.  Currently used only to avoid
 # pointless compression of sourcemaps and other release files because we
 # silently fail to cache the compressed result anyway.  Defaults to None which
@@ -2109,6 +2137,22 @@ SYMBOLICATOR_POLL_TIMEOUT = 10
 # max number of second to wait between subsequent attempts.
 SYMBOLICATOR_MAX_RETRY_AFTER = 5
 
+# Keep up to this many connections to symbolicator alive in every process,
+# shared by all events. Set to 0 to connect to symbolicator for every event.
+SYMBOLICATOR_POOL_SIZE = 10
+
+# How often to retry requests to symbolicator that fail with a network error,
+# and the number of seconds to wait before the first retry. The wait doubles
+# with every retry.
+SYMBOLICATOR_MAX_RETRIES = 3
+SYMBOLICATOR_RETRY_BACKOFF = 0.5
+
+# Park events waiting for symbolicator with the symbolication scheduler
+# (`sentry run symbolication-scheduler`) instead of polling symbolicator in the
+# symbolicate_event task, which blocks the worker until symbolication is done.
+SENTRY_SYMBOLICATION_SCHEDULER = False
+SENTRY_SYMBOLICATION_SCHEDULER_OPTIONS = {}
+
 SENTRY_REQUEST_METRIC_ALLOWED_PATHS = (
     "sentry.web.api",
     "sentry.web.frontend",
@@ -104,7 +104,10 @@ class NodeData(collections.MutableMapping):
             return self._node_data
 
         elif self.id:
-            self.bind_data(nodestore.get(self.id) or {})
+            from sentry.eventstore.compressor import assemble_many
+
+            data = assemble_many({self.id: nodestore.get(self.id)})[self.id]
+            self.bind_data(data or {})
             return self._node_data
 
         rv = {}
@@ -129,13 +132,16 @@ class NodeData(collections.MutableMapping):
             self.data["_ref"] = ref
             self.data["_ref_version"] = self.ref_version
 
-    def save(self, subkeys=None):
+    def save(self, subkeys=None, deduplicate=False):
         """
         Write current data back to nodestore.
 
         :param subkeys: Additional JSON payloads to attach to nodestore value,
             currently only {"unprocessed": {...}} is added for reprocessing.
             See documentation of nodestore.
+        :param deduplicate: Store the parts of the data that repeat across
+            events in shared nodes, see ``sentry.eventstore.compressor``.
+            The data of this instance is not modified.
         """
 
         # We never loaded any data for reading or writing, so there
@@ -149,6 +155,12 @@ class NodeData(collections.MutableMapping):
         if isinstance(to_write, CANONICAL_TYPES):
             to_write = dict(to_write.items())
 
+        if deduplicate:
+            from sentry.eventstore import compressor
+
+            to_write, extra_keys = compressor.deduplicate(to_write)
+            compressor.save_blobs(extra_keys)
+
         subkeys = subkeys or {}
         subkeys[None] = to_write
 
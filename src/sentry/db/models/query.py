@@ -1,14 +1,14 @@
 import itertools
 from functools import reduce
 
-from django.db import IntegrityError, router, transaction
+from django.db import IntegrityError, connections, router, transaction
 from django.db.models import Model, Q
 from django.db.models.expressions import CombinedExpression
 from django.db.models.signals import post_save
 
 from .utils import resolve_combined_expression
 
-__all__ = ("update", "create_or_update")
+__all__ = ("update", "create_or_update", "bulk_increment")
 
 
 def update(self, using=None, **kwargs):
@@ -95,6 +95,88 @@ def create_or_update(model, using=None, **kwargs):
     return affected, False
 
 
+def bulk_increment(model, rows, using=None, expressions=None):
+    """
+    Apply many ``create_or_update``-style updates to existing rows with a
+    single ``UPDATE ... FROM (VALUES ...)`` statement. Rows that do not exist
+    yet are not created.
+
+    ``rows`` is a list of ``(filters, columns, values)`` tuples, all of which
+    have to use the same keys: ``columns`` are added to the current value of
+    the column, ``values`` replace it. ``expressions`` maps additional
+    columns to raw SQL, which can reference the current row as ``t`` and the
+    row's parameters as ``v.f_<filter>``, ``v.i_<column>`` and ``v.e_<value>``.
+
+    Returns the set of indexes into ``rows`` that matched an existing row.
+
+    >>> bulk_increment(Group, [
+    >>>     ({'id': 1}, {'times_seen': 1}, {'last_seen': now}),
+    >>>     ({'id': 2}, {'times_seen': 3}, {'last_seen': now}),
+    >>> ])
+    """
+    if not rows:
+        return set()
+
+    if not using:
+        using = router.db_for_write(model)
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+
+    def get_field(name):
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    # (position in the row tuple, prefix, name, field) for every parameter,
+    # in the order given by the first row.
+    params_spec = [
+        (position, prefix, name, get_field(name))
+        for position, prefix in enumerate(("f_", "i_", "e_"))
+        for name in rows[0][position]
+    ]
+
+    row_sql = "(%s)" % ", ".join(
+        ["%s"] + [f"CAST(%s AS {field.db_type(connection)})" for _, _, _, field in params_spec]
+    )
+    params = []
+    for index, row in enumerate(rows):
+        params.append(index)
+        for position, _, name, field in params_spec:
+            value = row[position][name]
+            if isinstance(value, Model):
+                value = value.pk
+            params.append(field.get_db_prep_save(value, connection))
+
+    assignments = []
+    conditions = []
+    for _, prefix, name, field in params_spec:
+        col, param = qn(field.column), qn(prefix + name)
+        if prefix == "f_":
+            conditions.append(f"t.{col} = v.{param}")
+        elif prefix == "i_":
+            assignments.append(f"{col} = t.{col} + v.{param}")
+        else:
+            assignments.append(f"{col} = v.{param}")
+    for name, sql in (expressions or {}).items():
+        assignments.append(f"{qn(get_field(name).column)} = {sql}")
+
+    sql = (
+        "UPDATE {table} AS t SET {assignments} "
+        "FROM (VALUES {rows}) AS v({names}) "
+        "WHERE {conditions} RETURNING v._idx"
+    ).format(
+        table=qn(opts.db_table),
+        assignments=", ".join(assignments),
+        rows=", ".join([row_sql] * len(rows)),
+        names=", ".join(["_idx"] + [qn(prefix + name) for _, prefix, name, _ in params_spec]),
+        conditions=" AND ".join(conditions),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {index for (index,) in cursor.fetchall()}
+
+
 def in_iexact(column, values):
     """Operator to test if any of the given values are (case-insensitive)
     matching to values in the given column."""
@@ -1,6 +1,7 @@
 import copy
 import ipaddress
 import logging
+import random
 import time
 from datetime import datetime, timedelta
 from io import BytesIO
@@ -767,6 +768,8 @@ def _tsdb_record_all_metrics(jobs):
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs):
+    deduplicate = random.random() < options.get("store.nodestore-deduplication-sample-rate")
+
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -780,7 +783,7 @@ def _nodestore_save_many(jobs):
             if data is not None:
                 subkeys["unprocessed"] = data
 
-        job["event"].data.save(subkeys=subkeys)
+        job["event"].data.save(subkeys=subkeys, deduplicate=deduplicate)
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
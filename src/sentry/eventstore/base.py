@@ -6,6 +6,7 @@ from sentry import nodestore
 from sentry.snuba.events import Columns
 from sentry.utils.services import Service
 
+from .compressor import assemble_many
 from .models import Event
 
 
@@ -255,7 +256,7 @@ class EventStorage(Service):
             if not node_ids:
                 return
 
-            node_results = nodestore.get_multi(node_ids)
+            node_results = assemble_many(nodestore.get_multi(node_ids))
 
             for item, node in object_node_list:
                 data = node_results.get(node.id) or {}
@@ -3,15 +3,37 @@ Eventstore compressor is responsible for pulling out repeating data across
 events such that they can be stored only once. For example SDK modules list, or
 debug_meta.
 
-This is not used in production yet, we are still collecting metrics there.
+The repeating parts of an interface are stored as separate, content-addressed
+nodes (see ``get_blob_id``), which are shared by all events containing them.
+The event node itself keeps the remaining ("inlined") parts of the interface
+and a list of patchsets to reassemble the full payload when it is loaded.
+
+Blobs are never deleted explicitly, as other events may still reference them.
+Instead, they are written again by events referencing them, so that they expire
+together with their newest event through the retention of nodestore. To avoid
+writing popular blobs for every event, blobs are only written again once
+``BLOB_WRITE_CACHE_TTL`` seconds have passed since their last write.
+
+Writing deduplicated events is enabled with the
+``store.nodestore-deduplication-sample-rate`` option, deduplicated events are
+always assembled when they are loaded.
 """
 
+import copy
 import hashlib
 
-from sentry.utils import json
+from django.core.cache import cache
+
+from sentry import nodestore
+from sentry.nodestore.base import json_dumps
+from sentry.utils import metrics
 
 _INTERFACES = {}
 
+# How long blobs are not written again after they were written, see the
+# module docstring.
+BLOB_WRITE_CACHE_TTL = 300
+
 
 def _deduplicate_interface(*keys):
     def inner(f):
@@ -31,17 +53,23 @@ class DebugMeta:
     def encode(data):
         dedup = {}
 
-        if data:
-            for image in data.get("images") or []:
-                image = image or {}
+        if data and data.get("images"):
+            images = []
+            for image in data["images"]:
+                if image:
+                    image = dict(image)
                 for name in DebugMeta._DEDUP_FIELDS:
-                    dedup.setdefault(name, []).append(image.pop(name, None))
+                    dedup.setdefault(name, []).append(image.pop(name, None) if image else None)
+                images.append(image)
+
+            data = dict(data)
+            data["images"] = images
 
         return dedup, data
 
     @staticmethod
     def decode(dedup, data):
-        if data:
+        if data and dedup:
             for i, image in enumerate(data.get("images") or []):
                 for name, arr in dedup.items():
                     value = arr[i]
@@ -51,7 +79,149 @@ class DebugMeta:
         return data
 
 
+@_deduplicate_interface("modules", "sdk")
+class Whole:
+    """
+    Interfaces that are usually identical for all events of a release, which
+    are deduplicated entirely.
+    """
+
+    @staticmethod
+    def encode(data):
+        return data, None
+
+    @staticmethod
+    def decode(dedup, data):
+        return dedup
+
+
+@_deduplicate_interface("contexts")
+class Contexts:
+    """
+    Deduplicates the OS context, as well as the fields of the device context
+    which describe the device rather than its state at the time of the event.
+    """
+
+    _DEVICE_FIELDS = frozenset(
+        (
+            "name",
+            "family",
+            "model",
+            "model_id",
+            "arch",
+            "brand",
+            "manufacturer",
+            "simulator",
+            "screen_resolution",
+            "screen_density",
+            "screen_dpi",
+            "screen_width_pixels",
+            "screen_height_pixels",
+            "memory_size",
+            "storage_size",
+            "external_storage_size",
+            "processor_count",
+            "processor_frequency",
+            "cpu_description",
+            "device_type",
+        )
+    )
+
+    @staticmethod
+    def encode(data):
+        dedup = {}
+
+        if isinstance(data, dict):
+            data = dict(data)
+            if "os" in data:
+                dedup["os"] = data.pop("os")
+
+            device = data.get("device")
+            if isinstance(device, dict):
+                static = {k: v for k, v in device.items() if k in Contexts._DEVICE_FIELDS}
+                if static:
+                    dedup["device"] = static
+                    data["device"] = {
+                        k: v for k, v in device.items() if k not in Contexts._DEVICE_FIELDS
+                    }
+
+        return dedup, data
+
+    @staticmethod
+    def decode(dedup, data):
+        if data is not None and dedup:
+            if "os" in dedup:
+                data["os"] = dedup["os"]
+            if "device" in dedup:
+                data["device"] = dict(data.get("device") or {}, **dedup["device"])
+
+        return data
+
+
+@_deduplicate_interface("breadcrumbs")
+class Breadcrumbs:
+    """
+    Deduplicates the set of breadcrumb "templates" (the fields which do not
+    change between occurrences of the same breadcrumb), breadcrumbs reference
+    their template by index.
+    """
+
+    _TEMPLATE_FIELDS = ("type", "category", "level", "message")
+    _TEMPLATE_IDS = "__template_ids"
+
+    @staticmethod
+    def encode(data):
+        crumbs = data.get("values") if isinstance(data, dict) else None
+        if not crumbs or not all(isinstance(crumb, dict) for crumb in crumbs):
+            return None, data
+
+        crumb_templates = [
+            {k: crumb[k] for k in Breadcrumbs._TEMPLATE_FIELDS if k in crumb} for crumb in crumbs
+        ]
+        serialized = [json_dumps(template) for template in crumb_templates]
+        template_ids = {s: i for i, s in enumerate(sorted(set(serialized)))}
+        templates = [None] * len(template_ids)
+        for s, template in zip(serialized, crumb_templates):
+            templates[template_ids[s]] = template
+
+        data = dict(data)
+        data["values"] = [
+            {k: v for k, v in crumb.items() if k not in Breadcrumbs._TEMPLATE_FIELDS}
+            for crumb in crumbs
+        ]
+        data[Breadcrumbs._TEMPLATE_IDS] = [template_ids[s] for s in serialized]
+        return templates, data
+
+    @staticmethod
+    def decode(dedup, data):
+        template_ids = data.pop(Breadcrumbs._TEMPLATE_IDS, None)
+        if dedup is not None and template_ids is not None:
+            for crumb, template_id in zip(data["values"], template_ids):
+                crumb.update(dedup[template_id])
+
+        return data
+
+
+def get_blob_id(checksum):
+    """
+    Returns the nodestore id of the blob with the given checksum.
+
+    The checksum is used as the id as it is, node ids are limited to 40
+    characters by the Django backend. Event node ids have 32 characters, so
+    they cannot collide with blobs.
+    """
+    return checksum
+
+
 def deduplicate(data):
+    """
+    Splits the repeating parts out of an event payload. Returns the payload
+    to store in the event node, and a mapping of checksums to the blobs it
+    references.
+
+    ``data`` itself is not modified.
+    """
+    data = dict(data)
     patchsets = []
     extra_keys = {}
 
@@ -59,11 +229,18 @@ def deduplicate(data):
         if key not in data:
             continue
 
-        to_deduplicate, to_inline = interface.encode(data.pop(key))
-        to_deduplicate_serialized = json.dumps(to_deduplicate, sort_keys=True).encode("utf8")
-        checksum = hashlib.md5(to_deduplicate_serialized).hexdigest()
+        to_deduplicate, to_inline = interface.encode(data[key])
+        if not to_deduplicate:
+            continue
+
+        to_deduplicate_serialized = json_dumps(to_deduplicate).encode("utf8")
+        # The checksum is used as the id of the blob, which is shared across
+        # projects, so it has to be collision resistant. It is truncated to
+        # 160 bits to fit node ids (see ``get_blob_id``).
+        checksum = hashlib.sha256(to_deduplicate_serialized).hexdigest()[:40]
         extra_keys[checksum] = to_deduplicate
         patchsets.append([key, checksum, to_inline])
+        del data[key]
 
     if patchsets:
         data["__nodestore_patchsets"] = patchsets
@@ -82,8 +259,62 @@ def assemble(data, get_extra_keys):
     deduplicated_interfaces = get_extra_keys(checksums)
 
     for key, checksum, inlined in data["__nodestore_patchsets"]:
-        deduplicated = deduplicated_interfaces[checksum]
-        data[key] = _INTERFACES[key].decode(deduplicated, inlined)
+        deduplicated = deduplicated_interfaces.get(checksum)
+        if deduplicated is None:
+            # The blob expired before the event (e.g. because retention was
+            # shortened), restore whatever was inlined.
+            metrics.incr("eventstore.compressor.missing_blob", tags={"interface": key})
+        value = _INTERFACES[key].decode(copy.deepcopy(deduplicated), inlined)
+        if value is not None:
+            data[key] = value
 
     del data["__nodestore_patchsets"]
     return data
+
+
+def assemble_many(nodes):
+    """
+    Assembles all deduplicated payloads of a mapping of node ids to payloads
+    in place, fetching the blobs they reference with a single
+    ``nodestore.get_multi``. Returns the mapping.
+    """
+    checksums = set()
+    for data in nodes.values():
+        for _, checksum, _ in (data or {}).get("__nodestore_patchsets") or ():
+            checksums.add(checksum)
+
+    if not checksums:
+        return nodes
+
+    blobs = nodestore.get_multi([get_blob_id(checksum) for checksum in checksums])
+
+    def get_extra_keys(checksums):
+        return {checksum: blobs.get(get_blob_id(checksum)) for checksum in checksums}
+
+    for id, data in nodes.items():
+        if data:
+            nodes[id] = assemble(data, get_extra_keys)
+
+    return nodes
+
+
+def _get_blob_write_cache_key(checksum):
+    return f"eventstore.compressor.written:{checksum}"
+
+
+def save_blobs(extra_keys):
+    """
+    Writes the blobs returned by ``deduplicate`` with a single
+    ``nodestore.set_many``, skipping blobs that were written recently. This
+    has to happen before the event node referencing them is written.
+    """
+    cache_keys = {checksum: _get_blob_write_cache_key(checksum) for checksum in extra_keys}
+    written = cache.get_many(list(cache_keys.values()))
+    to_write = [checksum for checksum in extra_keys if cache_keys[checksum] not in written]
+
+    if to_write:
+        nodestore.set_many({get_blob_id(checksum): extra_keys[checksum] for checksum in to_write})
+        cache.set_many({cache_keys[checksum]: 1 for checksum in to_write}, BLOB_WRITE_CACHE_TTL)
+
+    metrics.incr("eventstore.compressor.blobs_written", amount=len(to_write))
+    metrics.incr("eventstore.compressor.blobs_skipped", amount=len(extra_keys) - len(to_write))
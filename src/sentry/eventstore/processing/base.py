@@ -1,15 +1,64 @@
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, List, Mapping, Optional, Sequence
 
+from sentry.utils import metrics
 from sentry.utils.cache import cache_key_for_event
+from sentry.utils.codecs import BytesCodec, Codec, JSONCodec, ZstdCodec
 from sentry.utils.kvstore.abstract import KVStorage
 
 DEFAULT_TIMEOUT = 60 * 60 * 24
 
+# Every zstd frame starts with these bytes.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
 
 Event = Any
 
 
+class CompressedEventCodec(Codec[Event, bytes]):
+    """
+    Encodes events as JSON compressed with zstd, optionally using a dictionary
+    trained on event payloads (see ``bin/train-processing-store-dictionary``.)
+
+    Uncompressed JSON is decoded as well, so that compression can be enabled
+    while events are being processed.
+    """
+
+    def __init__(self, dictionary: Optional[bytes] = None, level: int = 3) -> None:
+        self.serializer = JSONCodec() | BytesCodec()
+        self.compressor = ZstdCodec(dictionary=dictionary, level=level)
+
+    def encode(self, value: Event) -> bytes:
+        return self.compressor.encode(self.serializer.encode(value))
+
+    def decode(self, value: bytes) -> Event:
+        if value.startswith(ZSTD_MAGIC):
+            value = self.compressor.decode(value)
+        return self.serializer.decode(value)
+
+
+def get_event_codec(
+    compression: Optional[str] = None,
+    compression_dictionary: Optional[str] = None,
+    compression_level: int = 3,
+) -> Optional[Codec[Event, bytes]]:
+    """
+    Returns the codec for the compression options of a processing store
+    backend, or ``None`` if events are stored without compression.
+    ``compression_dictionary`` is the path to a zstd dictionary file.
+    """
+    if compression is None:
+        return None
+    if compression != "zstd":
+        raise ValueError(f"unknown processing store compression: {compression!r}")
+
+    dictionary = None
+    if compression_dictionary is not None:
+        with open(compression_dictionary, "rb") as f:
+            dictionary = f.read()
+    return CompressedEventCodec(dictionary=dictionary, level=compression_level)
+
+
 class EventProcessingStore:
     """
     Store for event blobs during processing
@@ -21,30 +70,89 @@ class EventProcessingStore:
 
     Separating processing store from the cache allows use of different
     implementations.
+
+    If a ``codec`` is provided, events are encoded to bytes by the store
+    before they are written to ``inner``, and the size of every stored event
+    is recorded per processing ``stage``.
     """
 
-    def __init__(self, inner: KVStorage[str, Event]):
+    def __init__(self, inner: KVStorage[str, Any], codec: Optional[Codec[Event, bytes]] = None):
         self.inner = inner
+        self.codec = codec
         self.timeout = timedelta(seconds=DEFAULT_TIMEOUT)
 
     def __get_unprocessed_key(self, key: str) -> str:
         return key + ":u"
 
-    def store(self, event: Event, unprocessed: bool = False) -> str:
+    def __encode(self, event: Event, stage: str) -> Any:
+        if self.codec is None:
+            return event
+        value = self.codec.encode(event)
+        metrics.timing("eventstore.processing.stored_bytes", len(value), tags={"stage": stage})
+        return value
+
+    def __decode(self, value: Any) -> Event:
+        if self.codec is None:
+            return value
+        return self.codec.decode(value)
+
+    def store(self, event: Event, unprocessed: bool = False, stage: str = "unknown") -> str:
         key = cache_key_for_event(event)
         if unprocessed:
             key = self.__get_unprocessed_key(key)
-        self.inner.set(key, event, self.timeout)
+        self.inner.set(key, self.__encode(event, stage), self.timeout)
         return key
 
+    def store_many(
+        self, events: Sequence[Event], unprocessed: bool = False, stage: str = "unknown"
+    ) -> List[str]:
+        """
+        Stores multiple events at once and returns their keys in the same
+        order.
+        """
+        keys = [cache_key_for_event(event) for event in events]
+        if unprocessed:
+            keys = [self.__get_unprocessed_key(key) for key in keys]
+        self.inner.set_many(
+            [(key, self.__encode(event, stage)) for key, event in zip(keys, events)],
+            self.timeout,
+        )
+        return keys
+
     def get(self, key: str, unprocessed: bool = False) -> Optional[Event]:
         if unprocessed:
             key = self.__get_unprocessed_key(key)
-        return self.inner.get(key)
+        value = self.inner.get(key)
+        if value is None:
+            return None
+        return self.__decode(value)
+
+    def get_many(self, keys: Sequence[str], unprocessed: bool = False) -> Mapping[str, Event]:
+        """
+        Fetches multiple events at once. Returns a mapping of the given keys
+        to events, missing events are not included.
+        """
+        if not unprocessed:
+            return {key: self.__decode(value) for key, value in self.inner.get_many(keys)}
+
+        inner_keys = {self.__get_unprocessed_key(key): key for key in keys}
+        return {
+            inner_keys[inner_key]: self.__decode(value)
+            for inner_key, value in self.inner.get_many(list(inner_keys))
+        }
 
     def delete_by_key(self, key: str) -> None:
-        self.inner.delete(key)
-        self.inner.delete(self.__get_unprocessed_key(key))
+        self.delete_many([key])
+
+    def delete_many(self, keys: Sequence[str]) -> None:
+        """
+        Deletes the events (as well as the unprocessed events) of all keys.
+        """
+        inner_keys = []
+        for key in keys:
+            inner_keys.append(key)
+            inner_keys.append(self.__get_unprocessed_key(key))
+        self.inner.delete_many(inner_keys)
 
     def delete(self, event: Event) -> None:
         key = cache_key_for_event(event)
@@ -1,12 +1,15 @@
 from sentry.cache import default_cache
 from sentry.utils.kvstore.cache import CacheKVStorage
 
-from .base import EventProcessingStore
+from .base import EventProcessingStore, get_event_codec
 
 
-def DefaultEventProcessingStore() -> EventProcessingStore:
+def DefaultEventProcessingStore(**options) -> EventProcessingStore:
     """
     Creates an instance of the processing store which uses the
     ``default_cache`` as its backend.
+
+    Keyword arguments configure compression (see ``get_event_codec``.)
     """
-    return EventProcessingStore(CacheKVStorage(default_cache))
+    codec = get_event_codec(**options)
+    return EventProcessingStore(CacheKVStorage(default_cache, raw=codec is not None), codec=codec)
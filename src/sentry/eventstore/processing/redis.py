@@ -1,14 +1,21 @@
 from sentry.cache.redis import RedisClusterCache
 from sentry.utils.kvstore.cache import CacheKVStorage
 
-from .base import EventProcessingStore
+from .base import EventProcessingStore, get_event_codec
 
 
-def RedisClusterEventProcessingStore(**options) -> EventProcessingStore:
+def RedisClusterEventProcessingStore(
+    compression=None, compression_dictionary=None, compression_level=3, **options
+) -> EventProcessingStore:
     """
     Creates an instance of the processing store which uses the Redis Cluster
     cache as its backend.
 
-    Keyword argument are forwarded to the ``RedisClusterCache`` constructor.
+    The compression arguments are passed to ``get_event_codec``, all other
+    keyword arguments are forwarded to the ``RedisClusterCache`` constructor.
     """
-    return EventProcessingStore(CacheKVStorage(RedisClusterCache(**options)))
+    codec = get_event_codec(compression, compression_dictionary, compression_level)
+    raw = codec is not None
+    return EventProcessingStore(
+        CacheKVStorage(RedisClusterCache(raw_values=raw, **options), raw=raw), codec=codec
+    )
@@ -1,4 +1,5 @@
 import base64
+import functools
 import os
 import zlib
 
@@ -121,16 +122,199 @@ MATCHERS = {
 }
 
 
+# Match keys whose frame values are modified by actions (``+app`` and
+# ``category=``) while the rules of an enhancement config are applied.
+MUTABLE_MATCH_KEYS = frozenset(["app", "category"])
+
+# Characters with a special meaning in glob patterns. Patterns without any of
+# them are compared literally, without going through ``glob_match``.
+GLOB_SPECIAL_CHARS = frozenset("*?[]{}!\\")
+
+
+def _is_ascii(value):
+    # ``str.isascii`` is not available before Python 3.7.
+    try:
+        value.encode("ascii")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
 class InvalidEnhancerConfig(Exception):
     pass
 
 
+def _get_frame_value(key, frame_data, platform, exception_data):
+    """Returns the value of a frame that is matched by matchers of ``key``."""
+    if key == "path":
+        return frame_data.get("abs_path") or frame_data.get("filename") or ""
+    elif key == "package":
+        return frame_data.get("package") or ""
+    elif key == "family":
+        return get_behavior_family_for_platform(frame_data.get("platform") or platform)
+    elif key == "app":
+        return frame_data.get("in_app")
+    elif key == "function":
+        from sentry.stacktraces.functions import get_function_name_for_frame
+
+        return get_function_name_for_frame(frame_data, platform) or "<unknown>"
+    elif key == "module":
+        return frame_data.get("module") or "<unknown>"
+    elif key == "type":
+        return get_path(exception_data, "type") or "<unknown>"
+    elif key == "value":
+        return get_path(exception_data, "value") or "<unknown>"
+    elif key == "mechanism":
+        return get_path(exception_data, "mechanism", "type") or "<unknown>"
+    elif key == "category":
+        return get_path(frame_data, "data", "category") or "<unknown>"
+    # should not happen :)
+    return "<unknown>"
+
+
+class PatternMatcher:
+    """Matches frame values against the pattern of a matcher.
+
+    Instances are shared between all matchers with the same key and pattern
+    (see `get_pattern_matcher`), and remember the result per matched value,
+    so that a pattern is only evaluated once for every distinct function,
+    module or path across rules, passes and events.
+    """
+
+    # Maximum number of values to remember the result for.
+    cache_size = 500
+
+    def __init__(self, key, pattern):
+        self.key = key
+        self.pattern = pattern
+        self._cache = {}
+
+        if key == "family":
+            self._families = frozenset(pattern.split(","))
+        elif key == "app":
+            self._in_app = get_rule_bool(pattern)
+
+        if GLOB_SPECIAL_CHARS.isdisjoint(pattern):
+            if key in ("path", "package"):
+                # Path matches are case insensitive. Only ASCII patterns are
+                # compared literally, for which lowercasing is equivalent.
+                self.literal = pattern.lower() if _is_ascii(pattern) else None
+            else:
+                self.literal = pattern
+        else:
+            self.literal = None
+
+    def matches(self, value):
+        # families need custom handling
+        if self.key == "family":
+            return "all" in self._families or value in self._families
+
+        # in-app matching is just a bool
+        if self.key == "app":
+            return self._in_app is not None and self._in_app == value
+
+        # Exception values are unbounded, there is no point in caching them.
+        if self.key == "value":
+            return self._matches(value)
+
+        try:
+            return self._cache[value]
+        except KeyError:
+            pass
+
+        rv = self._matches(value)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[value] = rv
+        return rv
+
+    def _matches(self, value):
+        # Path matches are always case insensitive
+        if self.key in ("path", "package"):
+            if self._matches_path(value):
+                return True
+            if not value.startswith("/") and self._matches_path("/" + value):
+                return True
+            return False
+
+        # all other matches are case sensitive
+        if self.literal is not None:
+            return value == self.literal
+        return glob_match(value, self.pattern)
+
+    def _matches_path(self, value):
+        if self.literal is not None and _is_ascii(value):
+            return value.replace("\\", "/").lower() == self.literal
+        return glob_match(
+            value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True
+        )
+
+
+@functools.lru_cache(maxsize=5000)
+def get_pattern_matcher(key, pattern):
+    return PatternMatcher(key, pattern)
+
+
+class FrameMatchContext:
+    """Remembers frame values and match results for the frames of a single
+    stacktrace while the rules of an enhancement config are applied to it.
+
+    Values of `MUTABLE_MATCH_KEYS` can be changed by the actions of earlier
+    rules, so they are read from the frame every time.
+    """
+
+    def __init__(self, frames, platform, exception_data):
+        self.frames = frames
+        self.platform = platform
+        self.exception_data = exception_data
+        self._values = {}
+        self._results = {}
+        self._indexes = {}
+
+    def get_value(self, key, idx):
+        if key in MUTABLE_MATCH_KEYS:
+            return _get_frame_value(key, self.frames[idx], self.platform, self.exception_data)
+
+        try:
+            return self._values[key, idx]
+        except KeyError:
+            rv = self._values[key, idx] = _get_frame_value(
+                key, self.frames[idx], self.platform, self.exception_data
+            )
+            return rv
+
+    def matches(self, matcher, idx):
+        if matcher.key in MUTABLE_MATCH_KEYS:
+            return matcher.matches(self.get_value(matcher.key, idx))
+
+        try:
+            return self._results[matcher, idx]
+        except KeyError:
+            rv = self._results[matcher, idx] = matcher.matches(self.get_value(matcher.key, idx))
+            return rv
+
+    def get_frame_indexes(self, key, value):
+        """Returns the indexes of all frames where ``key`` has the given value."""
+        try:
+            index = self._indexes[key]
+        except KeyError:
+            index = self._indexes[key] = {}
+            for idx in range(len(self.frames)):
+                index.setdefault(self.get_value(key, idx), []).append(idx)
+        return index.get(value, ())
+
+
 class Match:
     description = None
 
     def matches_frame(self, frames, idx, platform, exception_data):
         raise NotImplementedError()
 
+    def _compile(self):
+        """Returns a ``(frame offset, pattern matcher, negated)`` tuple used by
+        `Rule` to evaluate this match in a `FrameMatchContext`."""
+        raise NotImplementedError()
+
     def _to_config_structure(self, version):
         raise NotImplementedError()
 
@@ -163,6 +347,7 @@ class FrameMatch(Match):
             raise InvalidEnhancerConfig("Unknown matcher '%s'" % key)
         self.pattern = pattern
         self.negated = negated
+        self._matcher = get_pattern_matcher(self.key, pattern)
 
     @property
     def description(self):
@@ -173,62 +358,13 @@ class FrameMatch(Match):
 
     def matches_frame(self, frames, idx, platform, exception_data):
         frame_data = frames[idx]
-        rv = self._positive_frame_match(frame_data, platform, exception_data)
+        rv = self._matcher.matches(_get_frame_value(self.key, frame_data, platform, exception_data))
         if self.negated:
             rv = not rv
         return rv
 
-    def _positive_frame_match(self, frame_data, platform, exception_data):
-        # Path matches are always case insensitive
-        if self.key in ("path", "package"):
-            if self.key == "package":
-                value = frame_data.get("package") or ""
-            else:
-                value = frame_data.get("abs_path") or frame_data.get("filename") or ""
-            if glob_match(
-                value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True
-            ):
-                return True
-            if not value.startswith("/") and glob_match(
-                "/" + value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True
-            ):
-                return True
-
-            return False
-
-        # families need custom handling as well
-        if self.key == "family":
-            flags = self.pattern.split(",")
-            if "all" in flags:
-                return True
-            family = get_behavior_family_for_platform(frame_data.get("platform") or platform)
-            return family in flags
-
-        # in-app matching is just a bool
-        if self.key == "app":
-            ref_val = get_rule_bool(self.pattern)
-            return ref_val is not None and ref_val == frame_data.get("in_app")
-
-        # all other matches are case sensitive
-        if self.key == "function":
-            from sentry.stacktraces.functions import get_function_name_for_frame
-
-            value = get_function_name_for_frame(frame_data, platform) or "<unknown>"
-        elif self.key == "module":
-            value = frame_data.get("module") or "<unknown>"
-        elif self.key == "type":
-            value = get_path(exception_data, "type") or "<unknown>"
-        elif self.key == "value":
-            value = get_path(exception_data, "value") or "<unknown>"
-        elif self.key == "mechanism":
-            value = get_path(exception_data, "mechanism", "type") or "<unknown>"
-        elif self.key == "category":
-            value = get_path(frame_data, "data", "category") or "<unknown>"
-        else:
-            # should not happen :)
-            value = "<unknown>"
-
-        return glob_match(value, self.pattern)
+    def _compile(self):
+        return (0, self._matcher, self.negated)
 
     def _to_config_structure(self, version):
         if self.key == "family":
@@ -254,6 +390,10 @@ class CallerMatch(Match):
     def matches_frame(self, frames, idx, platform, exception_data):
         return idx > 0 and self.caller.matches_frame(frames, idx - 1, platform, exception_data)
 
+    def _compile(self):
+        _, matcher, negated = self.caller._compile()
+        return (-1, matcher, negated)
+
 
 class CalleeMatch(Match):
     def __init__(self, caller: FrameMatch):
@@ -271,6 +411,10 @@ class CalleeMatch(Match):
             frames, idx + 1, platform, exception_data
         )
 
+    def _compile(self):
+        _, matcher, negated = self.caller._compile()
+        return (1, matcher, negated)
+
 
 class Action:
     def apply_modifications_to_frame(self, frames, idx, rule=None):
@@ -444,16 +588,22 @@ class Enhancements:
         """This applies the frame modifications to the frames itself.  This
         does not affect grouping.
         """
+        context = FrameMatchContext(frames, platform, exception_data)
         for rule in self.iter_rules():
-            for idx, action in rule.get_matching_frame_actions(frames, platform, exception_data):
+            for idx, action in rule.get_matching_frame_actions(
+                frames, platform, exception_data, context=context
+            ):
                 action.apply_modifications_to_frame(frames, idx, rule=rule)
 
     def update_frame_components_contributions(self, components, frames, platform, exception_data):
         stacktrace_state = StacktraceState()
 
         # Apply direct frame actions and update the stack state alongside
+        context = FrameMatchContext(frames, platform, exception_data)
         for rule in self.iter_rules():
-            for idx, action in rule.get_matching_frame_actions(frames, platform, exception_data):
+            for idx, action in rule.get_matching_frame_actions(
+                frames, platform, exception_data, context=context
+            ):
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
 
@@ -588,6 +738,23 @@ class Rule:
         self.matchers = matchers
         self.actions = actions
 
+        self._compiled_matchers = [m._compile() for m in matchers]
+        # A literal match on a frame value that is not changed by actions
+        # restricts the frames this rule can match, which are then looked up
+        # by value instead of checking every frame. Paths are normalized and
+        # families are lists (or "all"), so neither is compared by equality.
+        self._index_matcher = None
+        for offset, matcher, negated in self._compiled_matchers:
+            if (
+                offset == 0
+                and not negated
+                and matcher.literal is not None
+                and matcher.key not in ("path", "package", "family")
+                and matcher.key not in MUTABLE_MATCH_KEYS
+            ):
+                self._index_matcher = matcher
+                break
+
     @property
     def matcher_description(self):
         rv = " ".join(x.description for x in self.matchers)
@@ -601,17 +768,34 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None):
+    def get_matching_frame_actions(self, frames, platform, exception_data=None, context=None):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        A `FrameMatchContext` can be passed to share frame values and match
+        results between the rules applied to the same frames.
         """
         if not self.matchers:
             return []
 
+        if context is None:
+            context = FrameMatchContext(frames, platform, exception_data)
+
+        if self._index_matcher is not None:
+            candidates = context.get_frame_indexes(
+                self._index_matcher.key, self._index_matcher.literal
+            )
+        else:
+            candidates = range(len(frames))
+
         rv = []
 
-        for idx, frame in enumerate(frames):
-            if all(m.matches_frame(frames, idx, platform, exception_data) for m in self.matchers):
+        for idx in candidates:
+            if all(
+                0 <= idx + offset < len(frames)
+                and context.matches(matcher, idx + offset) != negated
+                for offset, matcher, negated in self._compiled_matchers
+            ):
                 for action in self.actions:
                     rv.append((idx, action))
 
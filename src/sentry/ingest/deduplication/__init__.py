@@ -0,0 +1,10 @@
+from django.conf import settings
+
+from sentry.utils.imports import import_string
+
+event_deduplicator = import_string(settings.SENTRY_INGEST_DEDUPLICATOR)(
+    **settings.SENTRY_INGEST_DEDUPLICATOR_OPTIONS
+)
+
+
+__all__ = ["event_deduplicator"]
@@ -0,0 +1,26 @@
+from typing import Iterable, Set, Tuple
+
+# (project id, event id)
+EventKey = Tuple[int, str]
+
+
+class EventDeduplicator:
+    """
+    Index of the events that have been processed by the ingest consumer.
+
+    Kafka messages can be consumed more than once, e.g. if a consumer dies
+    before it could commit its offsets. The index is used to skip events that
+    have already been processed.
+    """
+
+    def get_duplicates(self, events: Iterable[EventKey]) -> Set[EventKey]:
+        """
+        Returns the subset of ``events`` that have been marked as processed.
+        """
+        raise NotImplementedError
+
+    def mark_processed(self, events: Iterable[EventKey]) -> None:
+        raise NotImplementedError
+
+    def is_duplicate(self, project_id: int, event_id: str) -> bool:
+        return bool(self.get_duplicates([(project_id, event_id)]))
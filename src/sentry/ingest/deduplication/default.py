@@ -0,0 +1,32 @@
+from typing import Iterable, Set
+
+from django.core.cache import cache
+
+from .base import EventDeduplicator, EventKey
+
+DEFAULT_TIMEOUT = 60 * 60
+
+
+class CacheEventDeduplicator(EventDeduplicator):
+    """
+    Remembers processed events in the Django cache.
+
+    This provides no guarantees: the cache has no consistency guarantees and
+    events are only remembered for ``timeout`` seconds. It does provide some
+    protection against reprocessing events if a single consumer is in a
+    restart loop.
+    """
+
+    def __init__(self, timeout: int = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def _make_key(self, event: EventKey) -> str:
+        project_id, event_id = event
+        return f"ev:{project_id}:{event_id}"
+
+    def get_duplicates(self, events: Iterable[EventKey]) -> Set[EventKey]:
+        keys = {self._make_key(event): event for event in events}
+        return {keys[key] for key in cache.get_many(list(keys))}
+
+    def mark_processed(self, events: Iterable[EventKey]) -> None:
+        cache.set_many({self._make_key(event): "" for event in events}, self.timeout)
@@ -0,0 +1,124 @@
+import struct
+from collections import defaultdict
+from time import time
+from typing import Iterable, List, Set
+
+from pkg_resources import resource_string
+
+from sentry.utils import metrics
+from sentry.utils.hashlib import md5_text
+from sentry.utils.redis import SentryScript, get_cluster_from_options
+
+from .base import EventDeduplicator, EventKey
+
+CheckScript = SentryScript(
+    None, resource_string("sentry", "scripts/ingest/deduplication_check.lua")
+)
+
+MarkScript = SentryScript(None, resource_string("sentry", "scripts/ingest/deduplication_mark.lua"))
+
+
+class RedisEventDeduplicator(EventDeduplicator):
+    """
+    Remembers processed events in Redis for at least ``horizon`` seconds.
+
+    The index of every project is split into ``partitions`` time partitions
+    (plus the current one), which expire as a whole. Every partition consists
+    of a bloom filter of ``bloom_filter_bits`` bits, that is checked first, and
+    the exact set of event ids, that is only checked if the bloom filter
+    contains an event, so that false positives never cause events to be
+    dropped.
+
+    All keys of a project are stored on the same host, so that checking or
+    marking a batch of events takes one round trip to each host.
+    """
+
+    def __init__(
+        self,
+        horizon: int = 60 * 60 * 24,
+        partitions: int = 24,
+        bloom_filter_bits: int = 1 << 16,
+        hash_count: int = 4,
+        **options,
+    ):
+        self.cluster, options = get_cluster_from_options(
+            "SENTRY_INGEST_DEDUPLICATOR_OPTIONS", options
+        )
+        self.horizon = horizon
+        self.partitions = partitions
+        self.partition_seconds = horizon / partitions
+        self.bloom_filter_bits = bloom_filter_bits
+        self.hash_count = hash_count
+
+    def _get_partition(self, timestamp: float) -> int:
+        return int(timestamp / self.partition_seconds)
+
+    def _make_keys(self, project_id: int, partition: int) -> List[str]:
+        return [f"dedup:b:{project_id}:{partition}", f"dedup:e:{project_id}:{partition}"]
+
+    def _get_bit_offsets(self, event_id: str) -> List[int]:
+        # Double hashing, see Kirsch & Mitzenmacher, "Less Hashing, Same
+        # Performance: Building a Better Bloom Filter".
+        h1, h2 = struct.unpack("<QQ", md5_text(event_id).digest())
+        return [(h1 + i * h2) % self.bloom_filter_bits for i in range(self.hash_count)]
+
+    def _make_args(self, event_ids: Iterable[str]) -> List:
+        args = []
+        for event_id in event_ids:
+            args.append(event_id)
+            args.extend(self._get_bit_offsets(event_id))
+        return args
+
+    def _group_by_project(self, events: Iterable[EventKey]):
+        rv = defaultdict(list)
+        for project_id, event_id in events:
+            rv[project_id].append(event_id)
+        return rv
+
+    def get_duplicates(self, events: Iterable[EventKey]) -> Set[EventKey]:
+        events_by_project = self._group_by_project(events)
+        if not events_by_project:
+            return set()
+
+        current = self._get_partition(time())
+        commands = {}
+        for project_id, event_ids in events_by_project.items():
+            keys = []
+            for partition in range(current - self.partitions, current + 1):
+                keys.extend(self._make_keys(project_id, partition))
+            commands[f"dedup:{project_id}"] = [
+                (CheckScript, keys, [self.hash_count] + self._make_args(event_ids))
+            ]
+
+        with metrics.timer("ingest.deduplication.check"):
+            results = self.cluster.execute_commands(commands)
+
+        duplicates = set()
+        for project_id, event_ids in events_by_project.items():
+            (result,) = results[f"dedup:{project_id}"]
+            for event_id, duplicate in zip(event_ids, result.value):
+                if duplicate:
+                    duplicates.add((project_id, event_id))
+
+        metrics.incr("ingest.deduplication.duplicates", amount=len(duplicates), skip_internal=True)
+        return duplicates
+
+    def mark_processed(self, events: Iterable[EventKey]) -> None:
+        events_by_project = self._group_by_project(events)
+        if not events_by_project:
+            return
+
+        partition = self._get_partition(time())
+        ttl = int(self.horizon + self.partition_seconds) + 1
+        self.cluster.execute_commands(
+            {
+                f"dedup:{project_id}": [
+                    (
+                        MarkScript,
+                        self._make_keys(project_id, partition),
+                        [self.hash_count, ttl] + self._make_args(event_ids),
+                    )
+                ]
+                for project_id, event_ids in events_by_project.items()
+            }
+        )
@@ -1,16 +1,17 @@
 import functools
 import logging
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 import msgpack
 import sentry_sdk
 from django.conf import settings
-from django.core.cache import cache
 
 from sentry import eventstore, features, options
 from sentry.attachments import CachedAttachment, attachment_cache
 from sentry.event_manager import save_attachment
 from sentry.eventstore.processing import event_processing_store
+from sentry.ingest.deduplication import event_deduplicator
 from sentry.ingest.types import ConsumerType
 from sentry.ingest.userreport import Conflict, save_userreport
 from sentry.models import Project
@@ -30,6 +31,24 @@ CACHE_TIMEOUT = 3600
 
 
 class IngestConsumerWorker(AbstractBatchWorker):
+    """
+    With a ``concurrency`` greater than one, messages of a batch are processed
+    by a pool of threads. Messages are partitioned by project and event id:
+    the messages of one partition are processed in order by a single thread,
+    and all attachment chunks of a batch are processed before any other
+    message. ``flush_batch`` only returns (and offsets are only committed)
+    once all partitions have been processed.
+    """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or 1
+        if self.concurrency > 1:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="ingest-consumer"
+            )
+        else:
+            self.executor = None
+
     def process_message(self, message):
         message = msgpack.unpackb(message.value(), use_list=False)
         return message
@@ -67,19 +86,120 @@ class IngestConsumerWorker(AbstractBatchWorker):
         with metrics.timer("ingest_consumer.fetch_projects"):
             projects = {p.id: p for p in Project.objects.get_many_from_cache(projects_to_fetch)}
 
+        with metrics.timer("ingest_consumer.deduplicate_events"):
+            other_messages = _deduplicate_events(other_messages)
+
+        with metrics.timer("ingest_consumer.store_events"):
+            other_messages = _store_events(other_messages, projects)
+
         if attachment_chunks:
             # attachment_chunk messages need to be processed before attachment/event messages.
             with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
-                for attachment_chunk in attachment_chunks:
-                    process_attachment_chunk(attachment_chunk, projects=projects)
+                self._process_messages(
+                    [(process_attachment_chunk, message) for message in attachment_chunks],
+                    projects,
+                )
 
         if other_messages:
             with metrics.timer("ingest_consumer.process_other_messages_batch"):
-                for processing_func, message in other_messages:
-                    processing_func(message, projects=projects)
+                self._process_messages(other_messages, projects)
+
+    def _process_messages(self, messages, projects):
+        if self.executor is None:
+            for processing_func, message in messages:
+                processing_func(message, projects=projects)
+            return
+
+        partitions = {}
+        for processing_func, message in messages:
+            key = (message["project_id"], message.get("event_id"))
+            partitions.setdefault(key, []).append((processing_func, message))
+
+        metrics.timing("ingest_consumer.flush.partitions", len(partitions))
+
+        futures = [
+            self.executor.submit(_process_partition, partition, projects)
+            for partition in partitions.values()
+        ]
+
+        # Wait for all partitions before raising, so that no message is
+        # processed anymore once the batch has failed.
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
 
     def shutdown(self):
-        pass
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def _deduplicate_events(messages):
+    """
+    Checks the events of a batch against the deduplication index at once, and
+    drops events that have already been processed (or occur more than once
+    within the batch). The remaining events are not checked again.
+    """
+    events = {
+        (int(message["project_id"]), message["event_id"])
+        for processing_func, message in messages
+        if message["type"] == "event"
+    }
+    if not events:
+        return messages
+
+    duplicates = event_deduplicator.get_duplicates(events)
+
+    rv = []
+    for processing_func, message in messages:
+        if message["type"] == "event":
+            event = (int(message["project_id"]), message["event_id"])
+            if event in duplicates:
+                logger.warning(
+                    "pre-process-forwarder detected a duplicated event with id:%s for project:%s.",
+                    event[1],
+                    event[0],
+                )
+                continue
+            duplicates.add(event)
+            processing_func = functools.partial(process_event, check_duplicate=False)
+        rv.append((processing_func, message))
+    return rv
+
+
+def _store_events(messages, projects):
+    """
+    Parses the payloads of the events of a batch and writes them to the
+    processing store at once, instead of one round trip per event.
+    """
+    load_shed_projects = options.get("store.load-shed-pipeline-projects") or ()
+
+    events = []
+    for index, (processing_func, message) in enumerate(messages):
+        if message["type"] != "event":
+            continue
+        project_id = int(message["project_id"])
+        # These events are skipped by `process_event`.
+        if project_id in load_shed_projects or project_id not in projects:
+            continue
+        events.append((index, json.loads(message["payload"])))
+
+    if not events:
+        return messages
+
+    cache_keys = event_processing_store.store_many([data for _, data in events], stage="ingest")
+
+    rv = list(messages)
+    for (index, data), cache_key in zip(events, cache_keys):
+        processing_func, message = rv[index]
+        rv[index] = (functools.partial(processing_func, data=data, cache_key=cache_key), message)
+    return rv
+
+
+def _process_partition(messages, projects):
+    mark_scope_as_unsafe()
+    for processing_func, message in messages:
+        processing_func(message, projects=projects)
 
 
 def trace_func(**span_kwargs):
@@ -98,7 +218,7 @@ def trace_func(**span_kwargs):
 
 
 @metrics.wraps("ingest_consumer.process_event")
-def _do_process_event(message, projects):
+def _do_process_event(message, projects, check_duplicate=True, data=None, cache_key=None):
     payload = message["payload"]
     start_time = float(message["start_time"])
     event_id = message["event_id"]
@@ -110,21 +230,9 @@ def _do_process_event(message, projects):
         metrics.incr("internal.captured.ingest_consumer.unparsed")
 
     # check that we haven't already processed this event (a previous instance of the forwarder
-    # died before it could commit the event queue offset)
-    #
-    # XXX(markus): I believe this code is extremely broken:
-    #
-    # * it practically uses memcached in prod which has no consistency
-    #   guarantees (no idea how we don't run into issues there)
-    #
-    # * a TTL of 1h basically doesn't guarantee any deduplication at all. It
-    #   just guarantees a good error message... for one hour.
-    #
-    # This code has been ripped from the old python store endpoint. We're
-    # keeping it around because it does provide some protection against
-    # reprocessing good events if a single consumer is in a restart loop.
-    deduplication_key = f"ev:{project_id}:{event_id}"
-    if cache.get(deduplication_key) is not None:
+    # died before it could commit the event queue offset). Batches are checked at once by
+    # `_deduplicate_events` already.
+    if check_duplicate and event_deduplicator.is_duplicate(project_id, event_id):
         logger.warning(
             "pre-process-forwarder detected a duplicated event" " with id:%s for project:%s.",
             event_id,
@@ -145,10 +253,12 @@ def _do_process_event(message, projects):
 
     # Parse the JSON payload. This is required to compute the cache key and
     # call process_event. The payload will be put into Kafka raw, to avoid
-    # serializing it again.
+    # serializing it again. Events of a batch are parsed (and stored) at once
+    # by `_store_events` already.
     # XXX: Do not use CanonicalKeyDict here. This may break preprocess_event
     # which assumes that data passed in is a raw dictionary.
-    data = json.loads(payload)
+    if data is None:
+        data = json.loads(payload)
 
     if project_id == settings.SENTRY_PROJECT:
         metrics.incr(
@@ -156,7 +266,8 @@ def _do_process_event(message, projects):
             tags={"event_type": data.get("type") or "null"},
         )
 
-    cache_key = event_processing_store.store(data)
+    if cache_key is None:
+        cache_key = event_processing_store.store(data, stage="ingest")
 
     if attachments:
         attachment_objects = [
@@ -178,16 +289,18 @@ def _do_process_event(message, projects):
             project=project,
         )
 
-    # remember for an 1 hour that we saved this event (deduplication protection)
-    cache.set(deduplication_key, "", CACHE_TIMEOUT)
+    # remember that we saved this event (deduplication protection)
+    event_deduplicator.mark_processed([(project_id, event_id)])
 
     # emit event_accepted once everything is done
     event_accepted.send_robust(ip=remote_addr, data=data, project=project, sender=process_event)
 
 
 @trace_func(name="ingest_consumer.process_event")
-def process_event(message, projects):
-    return _do_process_event(message, projects)
+def process_event(message, projects, check_duplicate=True, data=None, cache_key=None):
+    return _do_process_event(
+        message, projects, check_duplicate=check_duplicate, data=data, cache_key=cache_key
+    )
 
 
 @trace_func(name="ingest_consumer.process_attachment_chunk")
@@ -277,7 +390,7 @@ def process_userreport(message, projects):
         return False
 
 
-def get_ingest_consumer(consumer_types, once=False, **options):
+def get_ingest_consumer(consumer_types, once=False, concurrency=None, **options):
     """
     Handles events coming via a kafka queue.
 
@@ -285,5 +398,5 @@ def get_ingest_consumer(consumer_types, once=False, **options):
     """
     topic_names = {ConsumerType.get_topic_name(consumer_type) for consumer_type in consumer_types}
     return create_batching_kafka_consumer(
-        topic_names=topic_names, worker=IngestConsumerWorker(), **options
+        topic_names=topic_names, worker=IngestConsumerWorker(concurrency=concurrency), **options
     )
@@ -1,8 +1,14 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
 from symbolic import SourceView
 
+from sentry.utils import metrics
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "ParsedViewCache", "parse_view"]
 
 
 def is_utf8(codec):
@@ -50,7 +56,7 @@ class SourceCache:
                     source = source.decode(encoding).encode("utf-8")
                 except UnicodeError:
                     pass
-            source = SourceView.from_bytes(source)
+            source = parse_view("source", SourceView.from_bytes, source)
         self._cache[url] = source
 
     def add_error(self, url, error):
@@ -90,3 +96,84 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ParsedViewCache:
+    """
+    An LRU cache of parsed source files and source maps, so that the same
+    release artifacts are not parsed again for every event.
+
+    Views are keyed by the checksum of the payload they were parsed from
+    (which for release artifacts is the checksum of the artifact), and the
+    cache is bounded by the total size of these payloads.
+
+    Views are shared between all events (and threads) using them, and must
+    not be modified.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_parse(self, kind, parse, body):
+        if len(body) > self.max_size:
+            return parse(body)
+
+        key = (kind, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+
+        if item is not None:
+            metrics.incr("sourcemaps.view_cache.hit", tags={"kind": kind}, skip_internal=True)
+            return item[0]
+
+        metrics.incr("sourcemaps.view_cache.miss", tags={"kind": kind}, skip_internal=True)
+        view = parse(body)
+
+        evictions = 0
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (view, len(body))
+                self.size += len(body)
+                while self.size > self.max_size:
+                    _, (_, size) = self._items.popitem(last=False)
+                    self.size -= size
+                    evictions += 1
+            size = self.size
+
+        if evictions:
+            metrics.incr("sourcemaps.view_cache.evict", amount=evictions, skip_internal=True)
+        metrics.timing("sourcemaps.view_cache.size", size)
+        return view
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+_view_caches = {}
+_view_caches_lock = Lock()
+
+
+def _get_view_cache(max_size):
+    with _view_caches_lock:
+        cache = _view_caches.get(max_size)
+        if cache is None:
+            cache = _view_caches[max_size] = ParsedViewCache(max_size)
+        return cache
+
+
+def parse_view(kind, parse, body):
+    """
+    Parses ``body`` with ``parse``, reusing the view parsed from the same
+    payload before if ``SENTRY_SOURCEMAP_VIEW_CACHE_SIZE`` is set.
+    """
+    max_size = settings.SENTRY_SOURCEMAP_VIEW_CACHE_SIZE
+    if not max_size:
+        return parse(body)
+    return _get_view_cache(max_size).get_or_parse(kind, parse, body)
@@ -8,11 +8,15 @@ import logging
 import re
 import sys
 import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from os.path import splitext
+from threading import BoundedSemaphore, Lock
 from urllib.parse import urlsplit
 
 import sentry_sdk
 from django.conf import settings
+from django.db import close_old_connections
 from requests.utils import get_encoding_from_headers
 from symbolic import SourceMapView
 
@@ -33,7 +37,7 @@ from sentry.utils.retries import ConditionalRetryPolicy, exponential_delay
 from sentry.utils.safe import get_path
 from sentry.utils.urls import non_standard_url_join
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, parse_view
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -68,6 +72,45 @@ CACHE_MAX_VALUE_SIZE = settings.SENTRY_CACHE_MAX_VALUE_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Thread pool fetching sources concurrently, see ``SENTRY_SOURCE_FETCH_WORKERS``.
+_fetch_executor = None
+_fetch_executor_lock = Lock()
+
+
+def _get_fetch_executor():
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(
+                max_workers=settings.SENTRY_SOURCE_FETCH_WORKERS, thread_name_prefix="source-fetch"
+            )
+        return _fetch_executor
+
+
+class FetchLimiter:
+    """
+    Limits the number of concurrent fetches, overall and per host.
+    """
+
+    def __init__(self, concurrency, host_concurrency):
+        self.host_concurrency = host_concurrency
+        self._semaphore = BoundedSemaphore(concurrency)
+        self._host_semaphores = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def limit(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            host_semaphore = self._host_semaphores.get(host)
+            if host_semaphore is None:
+                host_semaphore = self._host_semaphores[host] = BoundedSemaphore(
+                    self.host_concurrency
+                )
+
+        with host_semaphore, self._semaphore:
+            yield
+
 
 class UnparseableSourcemap(http.BadSource):
     error_type = EventError.JS_INVALID_SOURCEMAP
@@ -253,11 +296,22 @@ def fetch_release_file(filename, release, dist=None):
             "Checking database for release artifact %r (release_id=%s)", filename, release.id
         )
 
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release, dist=dist, ident__in=filename_idents
-            ).select_related("file")
-        )
+        manifest = ReleaseFile.get_manifest(release, dist)
+        if manifest is None:
+            possible_files = list(
+                ReleaseFile.objects.filter(
+                    release=release, dist=dist, ident__in=filename_idents
+                ).select_related("file")
+            )
+        else:
+            # The manifest tells us whether (and which) artifact matches
+            # without querying the database for all candidates, or at all.
+            releasefile_ids = [manifest[ident] for ident in filename_idents if ident in manifest]
+            possible_files = list(
+                ReleaseFile.objects.filter(id__in=releasefile_ids[:1]).select_related("file")
+                if releasefile_ids
+                else ()
+            )
 
         if len(possible_files) == 0:
             logger.debug(
@@ -493,7 +547,7 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
         )
         body = result.body
     try:
-        return SourceMapView.from_json_bytes(body)
+        return parse_view("sourcemap", SourceMapView.from_json_bytes, body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(str(exc), exc_info=True)
@@ -576,6 +630,11 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         self.release = None
         self.dist = None
 
+        # futures of sources and source maps fetched ahead of time by
+        # ``prefetch_sources``
+        self.prefetched_sources = {}
+        self.prefetched_sourcemaps = {}
+
     def get_stacktraces(self, data):
         exceptions = get_path(data, "exception", "values", filter=True, default=())
         stacktraces = [e["stacktrace"] for e in exceptions if e.get("stacktrace")]
@@ -863,6 +922,24 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             self.cache_source(filename)
         return self.cache.get(filename)
 
+    def fetch_file(self, url):
+        return fetch_file(
+            url,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping,
+        )
+
+    def fetch_sourcemap(self, url):
+        return fetch_sourcemap(
+            url,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping,
+        )
+
     def cache_source(self, filename):
         """
         Look for and (if found) cache a source file and its associated source
@@ -886,13 +963,8 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
             ) as span:
                 span.set_data("filename", filename)
-                result = fetch_file(
-                    filename,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
+                future = self.prefetched_sources.pop(filename, None)
+                result = future.result() if future is not None else self.fetch_file(filename)
         except http.BadSource as exc:
             # most people don't upload release artifacts for their third-party libraries,
             # so ignore missing node_modules files
@@ -924,13 +996,11 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
             ) as span:
                 span.set_data("sourcemap_url", sourcemap_url)
-                sourcemap_view = fetch_sourcemap(
-                    sourcemap_url,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
+                future = self.prefetched_sourcemaps.get(sourcemap_url)
+                if future is not None:
+                    sourcemap_view = future.result()
+                else:
+                    sourcemap_view = self.fetch_sourcemap(sourcemap_url)
         except http.BadSource as exc:
             # we don't perform the same check here as above, because if someone has
             # uploaded a node_modules file, which has a sourceMappingURL, they
@@ -949,6 +1019,45 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             if source_view is not None:
                 self.cache.add(non_standard_url_join(sourcemap_url, source_name), source_view)
 
+    def prefetch_sources(self, filenames):
+        """
+        Starts fetching the given source files concurrently, followed by the
+        source maps they reference as soon as a source file has been fetched.
+        ``cache_source`` waits for and caches the results.
+        """
+        executor = _get_fetch_executor()
+        limiter = FetchLimiter(
+            settings.SENTRY_SOURCE_FETCH_EVENT_CONCURRENCY,
+            settings.SENTRY_SOURCE_FETCH_HOST_CONCURRENCY,
+        )
+        lock = Lock()
+
+        def fetch(fetch_fn, url):
+            # The threads of the pool outlive the events they fetch sources
+            # for, so they have to take care of their database connections.
+            close_old_connections()
+            with limiter.limit(url):
+                return fetch_fn(url)
+
+        def fetch_source(filename):
+            result = fetch(self.fetch_file, filename)
+            try:
+                sourcemap_url = discover_sourcemap(result)
+            except Exception:
+                # This is raised again when the source is cached.
+                sourcemap_url = None
+
+            if sourcemap_url:
+                with lock:
+                    if sourcemap_url not in self.prefetched_sourcemaps:
+                        self.prefetched_sourcemaps[sourcemap_url] = executor.submit(
+                            fetch, self.fetch_sourcemap, sourcemap_url
+                        )
+            return result
+
+        for filename in filenames:
+            self.prefetched_sources[filename] = executor.submit(fetch_source, filename)
+
     def populate_source_cache(self, frames):
         """
         Fetch all sources that we know are required (being referenced directly
@@ -970,6 +1079,11 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
+        pending_file_list = list(pending_file_list)
+        if settings.SENTRY_SOURCE_FETCH_WORKERS > 0:
+            # Only prefetch the files that ``cache_source`` would fetch.
+            self.prefetch_sources(pending_file_list[: max(self.max_fetches - self.fetch_count, 0)])
+
         for idx, filename in enumerate(pending_file_list):
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
@@ -977,6 +1091,8 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 span.set_data("filename", filename)
                 self.cache_source(filename=filename)
 
+        self.prefetched_sourcemaps.clear()
+
     def close(self):
         StacktraceProcessor.close(self)
         if self.sourcemaps_touched:
@@ -0,0 +1,251 @@
+"""
+The symbolication scheduler keeps track of events waiting for symbolicator.
+
+Without the scheduler, ``symbolicate_event`` polls symbolicator until the
+event is symbolicated, sleeping between polls, which blocks a worker for as
+long as symbolicator takes (up to ``SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT``).
+With ``SENTRY_SYMBOLICATION_SCHEDULER`` enabled, the task instead parks the
+event in a Redis sorted set, scored by the time it should be polled next, and
+returns.
+
+``sentry run symbolication-scheduler`` claims the events that are due, polls
+symbolicator for many of them concurrently and either parks them again or
+resumes them by scheduling ``symbolicate_event`` again, which picks up the
+response (see ``Symbolicator.poll_task``) and continues processing.
+
+Claimed events stay in the sorted set with a lease, and are only removed right
+before they are resumed, as long as they still hold the lease. Events of a
+scheduler that fails before parking or resuming them are claimed again when
+the lease runs out.
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from pkg_resources import resource_string
+
+from sentry.utils import json, metrics
+from sentry.utils.redis import SentryScript, get_cluster_from_options
+
+logger = logging.getLogger(__name__)
+
+ClaimScript = SentryScript(None, resource_string("sentry", "scripts/symbolication/claim.lua"))
+ReleaseScript = SentryScript(None, resource_string("sentry", "scripts/symbolication/release.lua"))
+
+# Seconds added to the lease on top of the time it takes to poll a batch, to
+# park or resume the events of the batch.
+LEASE_MARGIN = 30
+
+ParkedEvent = namedtuple(
+    "ParkedEvent",
+    [
+        "project_id",
+        "event_id",
+        "cache_key",
+        "start_time",
+        "symbolication_start_time",
+        "from_reprocessing",
+    ],
+)
+
+
+class SymbolicationScheduler:
+    """
+    Parks events in the ``key`` sorted set of the Redis cluster configured
+    with the ``cluster`` option. Claimed events are leased for ``lease``
+    seconds, which has to cover polling a batch of ``batch_size`` events. By
+    default, it is derived from the timeouts of symbolicator requests (see
+    ``get_lease``).
+    """
+
+    def __init__(
+        self, key="symbolicate:parked", interval=0.5, batch_size=100, lease=None, **options
+    ):
+        self.cluster, options = get_cluster_from_options(
+            "SENTRY_SYMBOLICATION_SCHEDULER_OPTIONS", options
+        )
+        self.key = key
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease = lease
+
+    def _get_client(self):
+        return self.cluster.get_local_client_for_key(self.key)
+
+    def park(self, event, retry_after):
+        """
+        Parks an event until symbolicator is polled for it again in
+        ``retry_after`` seconds.
+        """
+        self._park_member(json.dumps(list(event)), retry_after)
+
+    def _park_member(self, member, retry_after):
+        self._get_client().zadd(self.key, {member: self._get_park_score(retry_after)})
+
+    def _get_park_score(self, retry_after):
+        return time.time() + min(retry_after, settings.SYMBOLICATOR_MAX_RETRY_AFTER)
+
+    def get_lease(self, concurrency=1):
+        """
+        Returns for how many seconds to lease a batch of events which is
+        polled with ``concurrency`` polls at a time, covering the worst case
+        of every request to symbolicator timing out and being retried.
+        """
+        if self.lease is not None:
+            return self.lease
+
+        attempts = settings.SYMBOLICATOR_MAX_RETRIES + 1
+        backoff = settings.SYMBOLICATOR_RETRY_BACKOFF * (2 ** settings.SYMBOLICATOR_MAX_RETRIES - 1)
+        poll_timeout = attempts * (settings.SYMBOLICATOR_POLL_TIMEOUT + 1) + backoff
+        return math.ceil(self.batch_size / concurrency) * poll_timeout + LEASE_MARGIN
+
+    def claim(self, now=None, limit=None, lease=None):
+        """
+        Leases the events which are due to be polled and returns them as
+        ``(member, event, lease_end)`` tuples. Until the lease runs out, events
+        are not returned to other schedulers.
+
+        Claimed events have to be released with their member and the end of
+        their lease, see ``release``.
+        """
+        if now is None:
+            now = time.time()
+        if limit is None:
+            limit = self.batch_size
+        if lease is None:
+            lease = self.get_lease()
+
+        lease_end = now + lease
+        members = ClaimScript(
+            keys=[self.key], args=[now, lease_end, limit], client=self._get_client()
+        )
+        return [
+            (member, ParkedEvent(*json.loads(member.decode("utf-8"))), lease_end)
+            for member in members
+        ]
+
+    def release(self, member, lease_end, retry_after=None):
+        """
+        Parks a claimed event again for ``retry_after`` seconds, or removes it
+        if ``retry_after`` is ``None``. Returns whether the event still held
+        the lease ending at ``lease_end``, otherwise it is left alone.
+        """
+        score = "" if retry_after is None else self._get_park_score(retry_after)
+        return bool(
+            ReleaseScript(
+                keys=[self.key], args=[member, lease_end, score], client=self._get_client()
+            )
+        )
+
+    def poll(self, event):
+        """
+        Polls symbolicator for a parked event. Returns the number of seconds
+        to park the event for again, or ``None`` to resume it.
+        """
+        from sentry.lang.native.symbolicator import Symbolicator
+        from sentry.models import Project
+
+        elapsed = time.time() - event.symbolication_start_time
+        if elapsed > settings.SYMBOLICATOR_PROCESS_EVENT_HARD_TIMEOUT:
+            # Resume the event, so that the task gives up on it.
+            return None
+
+        try:
+            project = Project.objects.get_from_cache(id=event.project_id)
+            return Symbolicator(project=project, event_id=event.event_id).poll_task()
+        except Exception:
+            logger.exception(
+                "symbolication_scheduler.poll_failed",
+                extra={"project_id": event.project_id, "event_id": event.event_id},
+            )
+            return None
+        finally:
+            close_old_connections()
+
+    def resume(self, event):
+        from sentry.tasks.store import symbolicate_event, symbolicate_event_from_reprocessing
+
+        task = symbolicate_event_from_reprocessing if event.from_reprocessing else symbolicate_event
+        task.delay(
+            cache_key=event.cache_key,
+            start_time=event.start_time,
+            event_id=event.event_id,
+            symbolication_start_time=event.symbolication_start_time,
+        )
+
+    async def _poll_many(self, loop, executor, events):
+        polls = [loop.run_in_executor(executor, self.poll, event) for event in events]
+        return await asyncio.gather(*polls)
+
+    def poll_due(self, loop, executor, concurrency=1):
+        """
+        Polls symbolicator for all events which are due with ``concurrency``
+        polls at a time, and parks or resumes them. Returns the number of
+        events polled.
+        """
+        claimed = self.claim(lease=self.get_lease(concurrency))
+        if not claimed:
+            return 0
+
+        events = [event for _, event, _ in claimed]
+        with metrics.timer("symbolication_scheduler.poll_due"):
+            results = loop.run_until_complete(self._poll_many(loop, executor, events))
+
+        resumed = 0
+        for (member, event, lease_end), retry_after in zip(claimed, results):
+            # Events which cannot be released stay leased, and are polled
+            # again once the lease runs out. Events which fail to resume are
+            # parked again to be polled right away.
+            try:
+                if not self.release(member, lease_end, retry_after):
+                    # The lease ran out and the event was claimed by another
+                    # scheduler in the meantime.
+                    metrics.incr("symbolication_scheduler.lease_lost", skip_internal=True)
+                    continue
+
+                if retry_after is None:
+                    # The event is removed before it is resumed, as the task
+                    # may park it again right away.
+                    try:
+                        self.resume(event)
+                    except Exception:
+                        self._park_member(member, 0)
+                        raise
+                    resumed += 1
+            except Exception:
+                logger.exception(
+                    "symbolication_scheduler.update_failed",
+                    extra={"project_id": event.project_id, "event_id": event.event_id},
+                )
+
+        metrics.incr("symbolication_scheduler.polled", amount=len(events), skip_internal=True)
+        metrics.incr("symbolication_scheduler.resumed", amount=resumed, skip_internal=True)
+        return len(events)
+
+    def run(self, concurrency=16):
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            while True:
+                try:
+                    polled = self.poll_due(loop, executor, concurrency)
+                except Exception:
+                    logger.exception("symbolication_scheduler.poll_due_failed")
+                    polled = 0
+                if polled < self.batch_size:
+                    time.sleep(self.interval)
+        finally:
+            executor.shutdown()
+            loop.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_scheduler():
+    return SymbolicationScheduler(**settings.SENTRY_SYMBOLICATION_SCHEDULER_OPTIONS)
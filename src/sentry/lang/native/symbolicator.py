@@ -1,13 +1,16 @@
 import base64
 import logging
+import os
 import sys
 import time
+from threading import Lock
 from urllib.parse import urljoin
 
 import jsonschema
 import sentry_sdk
 from django.conf import settings
 from django.urls import reverse
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 from sentry import features, options
@@ -18,7 +21,6 @@ from sentry.net.http import Session
 from sentry.tasks.store import RetrySymbolication
 from sentry.utils import json, metrics
 
-MAX_ATTEMPTS = 3
 REQUEST_CACHE_TIMEOUT = 3600
 INTERNAL_SOURCE_NAME = "sentry:project"
 
@@ -100,6 +102,10 @@ def _task_id_cache_key_for_event(project_id, event_id):
     return f"symbolicator:{event_id}:{project_id}"
 
 
+def _response_cache_key_for_event(project_id, event_id):
+    return f"symbolicator:response:{event_id}:{project_id}"
+
+
 class Symbolicator:
     def __init__(self, project, event_id):
         symbolicator_options = options.get("symbolicator.options")
@@ -123,14 +129,20 @@ class Symbolicator:
         )
 
         self.task_id_cache_key = _task_id_cache_key_for_event(project.id, event_id)
+        self.response_cache_key = _response_cache_key_for_event(project.id, event_id)
 
     def _process(self, create_task, task_name):
         task_id = default_cache.get(self.task_id_cache_key)
         json_response = None
 
+        if task_id:
+            # The symbolication scheduler may have received the response
+            # already, see ``poll_task``.
+            json_response = default_cache.get(self.response_cache_key)
+
         with self.sess:
             try:
-                if task_id:
+                if task_id and json_response is None:
                     # Processing has already started and we need to poll
                     # symbolicator for an update. This in turn may put us back into
                     # the queue.
@@ -166,13 +178,45 @@ class Symbolicator:
                 raise RetrySymbolication(retry_after=json_response["retry_after"])
             else:
                 # Once we arrive here, we are done processing. Clean up the
-                # task id from the cache.
+                # task id (and response) from the cache.
                 default_cache.delete(self.task_id_cache_key)
+                default_cache.delete(self.response_cache_key)
                 metrics.timing(
                     "events.symbolicator.response.completed.size", len(json.dumps(json_response))
                 )
                 return json_response
 
+    def poll_task(self):
+        """
+        Polls symbolicator for the task of the event without waiting for it,
+        on behalf of the symbolication scheduler. Returns the number of seconds
+        to wait before polling again while the task is pending, or ``None``
+        once the event can be processed again.
+
+        Symbolicator only returns the response of a task once, so it is cached
+        for ``_process`` to pick up.
+        """
+        task_id = default_cache.get(self.task_id_cache_key)
+        if not task_id:
+            return None
+
+        with self.sess:
+            try:
+                json_response = self.sess.query_task(task_id)
+            except ServiceUnavailable:
+                return settings.SYMBOLICATOR_MAX_RETRY_AFTER
+
+        if json_response is None:
+            # Symbolicator does not know the task anymore, it is sent again
+            # when the event is processed.
+            return None
+
+        if json_response["status"] == "pending":
+            return json_response["retry_after"]
+
+        default_cache.set(self.response_cache_key, json_response, REQUEST_CACHE_TIMEOUT)
+        return None
+
     def process_minidump(self, minidump):
         return self._process(lambda: self.sess.upload_minidump(minidump), "process_minidump")
 
@@ -358,7 +402,34 @@ def get_sources_for_project(project):
     return sources
 
 
+# Sessions shared by all ``SymbolicatorSession`` instances of a process, so
+# that connections to symbolicator are kept alive across events.
+_pooled_sessions = {}
+_pooled_sessions_lock = Lock()
+
+
+def _get_pooled_session(url, pool_size):
+    # Connections must not be shared with forked processes.
+    key = (os.getpid(), url, pool_size)
+    with _pooled_sessions_lock:
+        session = _pooled_sessions.get(key)
+        if session is None:
+            session = _pooled_sessions[key] = Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+
 class SymbolicatorSession:
+    """
+    A client for the symbolicator API, bound to an event.
+
+    With ``SYMBOLICATOR_POOL_SIZE`` set, all sessions of a process share one
+    connection pool per symbolicator URL, which keeps up to that many
+    connections alive. Otherwise, every session opens its own connections.
+    """
+
     def __init__(
         self, url=None, sources=None, project_id=None, event_id=None, timeout=None, options=None
     ):
@@ -369,6 +440,7 @@ class SymbolicatorSession:
         self.options = options or None
         self.timeout = timeout
         self.session = None
+        self.pooled = False
 
         # Build some maps for use in ._process_response()
         self.reverse_source_aliases = reverse_aliases_map(settings.SENTRY_BUILTIN_SOURCES)
@@ -391,11 +463,17 @@ class SymbolicatorSession:
 
     def open(self):
         if self.session is None:
-            self.session = Session()
+            self.pooled = bool(settings.SYMBOLICATOR_POOL_SIZE)
+            if self.pooled:
+                self.session = _get_pooled_session(self.url, settings.SYMBOLICATOR_POOL_SIZE)
+            else:
+                self.session = Session()
 
     def close(self):
         if self.session is not None:
-            self.session.close()
+            # Pooled sessions are shared with other events.
+            if not self.pooled:
+                self.session.close()
             self.session = None
 
     def _ensure_open(self):
@@ -434,12 +512,13 @@ class SymbolicatorSession:
         kwargs.setdefault("headers", {})["x-sentry-event-id"] = self.event_id
 
         attempts = 0
-        wait = 0.5
+        wait = settings.SYMBOLICATOR_RETRY_BACKOFF
 
         while True:
             try:
                 with metrics.timer(
-                    "events.symbolicator.session.request", tags={"attempt": attempts}
+                    "events.symbolicator.session.request",
+                    tags={"attempt": attempts, "method": method.lower()},
                 ):
                     response = self.session.request(
                         method, url, timeout=settings.SYMBOLICATOR_POLL_TIMEOUT + 1, **kwargs
@@ -484,7 +563,7 @@ class SymbolicatorSession:
                 # retry a couple of times, but ultimately need to bail out.
                 #
                 # This can happen for any network failure.
-                if attempts > MAX_ATTEMPTS:
+                if attempts > settings.SYMBOLICATOR_MAX_RETRIES:
                     logger.error("Failed to contact symbolicator", exc_info=True)
                     raise
 
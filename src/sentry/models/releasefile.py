@@ -1,9 +1,12 @@
 import errno
 import os
 from urllib.parse import urlsplit, urlunsplit
+from uuid import uuid4
 
+from django.core.cache import cache
 from django.core.files.base import File as FileObj
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.signals import post_delete, post_save
 
 from sentry import options
 from sentry.db.models import BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr
@@ -11,6 +14,13 @@ from sentry.models import clear_cached_files
 from sentry.utils import metrics
 from sentry.utils.hashlib import sha1_text
 
+# Releases with more artifacts than this are not indexed in a manifest, to
+# keep manifests within the size limits of the cache.
+MAX_MANIFEST_SIZE = 5000
+MANIFEST_CACHE_TTL = 3600
+# Outlives all manifests built with a version, see ``get_manifest``.
+MANIFEST_VERSION_TTL = 2 * MANIFEST_CACHE_TTL
+
 
 class ReleaseFile(Model):
     r"""
@@ -84,6 +94,53 @@ class ReleaseFile(Model):
             urls.append("~" + urlunsplit(uri_relative_without_query))
         return urls
 
+    @classmethod
+    def get_manifest(cls, release, dist=None):
+        """
+        Returns the manifest of a release and distribution, which maps the
+        idents of all their artifacts to the ids of the ``ReleaseFile``.
+
+        Manifests are cached until an artifact of the release changes. Returns
+        ``None`` for releases with more than ``MAX_MANIFEST_SIZE`` artifacts.
+        """
+        # Manifests are keyed by a version of the release, which changes with
+        # every change of its artifacts, rather than deleted. This way, a
+        # manifest built from the artifacts before the change cannot be cached
+        # after the change anymore.
+        version = cache.get(cls.get_manifest_version_cache_key(release.id))
+        cache_key = "releasefile:manifest:v1:{}:{}:{}".format(
+            release.id, dist.id if dist else None, version
+        )
+
+        manifest = cache.get(cache_key)
+        if manifest is None:
+            idents = list(
+                cls.objects.filter(release=release, dist=dist).values_list("ident", "id")[
+                    : MAX_MANIFEST_SIZE + 1
+                ]
+            )
+            manifest = dict(idents) if len(idents) <= MAX_MANIFEST_SIZE else False
+            cache.set(cache_key, manifest, MANIFEST_CACHE_TTL)
+
+        return manifest if manifest is not False else None
+
+    @classmethod
+    def get_manifest_version_cache_key(cls, release_id):
+        return f"releasefile:manifest-version:{release_id}"
+
+    @classmethod
+    def invalidate_manifest(cls, release_id):
+        def invalidate():
+            cache.set(
+                cls.get_manifest_version_cache_key(release_id), uuid4().hex, MANIFEST_VERSION_TTL
+            )
+
+        # Invalidate once more after the transaction commits, so that a
+        # manifest built in the meantime (from the artifacts before the
+        # change) is not used either.
+        invalidate()
+        transaction.on_commit(invalidate, using=router.db_for_write(cls))
+
 
 class ReleaseFileCache:
     @property
@@ -118,3 +175,15 @@ class ReleaseFileCache:
 
 
 ReleaseFile.cache = ReleaseFileCache()
+
+
+post_save.connect(
+    lambda instance, **kwargs: ReleaseFile.invalidate_manifest(instance.release_id),
+    sender=ReleaseFile,
+    weak=False,
+)
+post_delete.connect(
+    lambda instance, **kwargs: ReleaseFile.invalidate_manifest(instance.release_id),
+    sender=ReleaseFile,
+    weak=False,
+)
@@ -1,10 +1,15 @@
-from threading import local
+import struct
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+from time import monotonic
 
 import sentry_sdk
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
+from sentry.utils import json, metrics
 from sentry.utils.cache import memoize
+from sentry.utils.codecs import ZstdCodec
 from sentry.utils.services import Service
 
 # Cache an instance of the encoder we want to use
@@ -22,6 +27,134 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# Framed (version 1) encoding of nodes:
+#
+#   FRAMED_HEADER | index length (u32, big endian) | index | section | section | ...
+#
+# The index is a JSON list of ``[subkey, section length, compression]``
+# entries (the default payload has the subkey ``null``), which allows reading
+# a single subkey by slicing it out of the value without looking at any other
+# section. The header can neither start a legacy (JSON) nor a pickled node.
+FRAMED_HEADER = b"\x00ns\x01"
+_FRAMED_INDEX_LENGTH = struct.Struct(">I")
+
+SECTION_CODECS = {"zstd": ZstdCodec()}
+
+# Thread pools used for the fallback implementations of ``_get_bytes_multi``
+# and ``delete_multi``, shared between all instances (and threads) using the
+# same concurrency.
+_multi_executors = {}
+_multi_executors_lock = Lock()
+
+
+def _get_multi_executor(max_workers):
+    with _multi_executors_lock:
+        executor = _multi_executors.get(max_workers)
+        if executor is None:
+            executor = _multi_executors[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="nodestore-multi"
+            )
+        return executor
+
+
+class LocalNodeCache:
+    """
+    A process-wide, size-bounded LRU cache of nodes with a TTL, which sits in
+    front of the shared ``nodedata`` cache.
+
+    Nodes are stored JSON-encoded, so that the size is bounded by bytes and
+    callers always get their own copy of a node to mutate.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, id):
+        now = monotonic()
+        with self._lock:
+            item = self._items.get(id)
+            if item is not None:
+                expires, payload = item
+                if expires > now:
+                    self._items.move_to_end(id)
+                else:
+                    self._remove(id)
+                    item = None
+
+        if item is None:
+            metrics.incr("nodestore.local_cache.miss", skip_internal=True)
+            return None
+
+        metrics.incr("nodestore.local_cache.hit", skip_internal=True)
+        return json_loads(payload)
+
+    def get_many(self, id_list):
+        rv = {}
+        for id in id_list:
+            value = self.get(id)
+            if value is not None:
+                rv[id] = value
+        return rv
+
+    def set(self, id, data):
+        payload = json_dumps(data).encode("utf8")
+        if len(payload) > self.max_size:
+            self.delete(id)
+            return
+
+        evictions = 0
+        with self._lock:
+            self._remove(id)
+            self._items[id] = (monotonic() + self.ttl, payload)
+            self.size += len(payload)
+            while self.size > self.max_size:
+                self._remove(next(iter(self._items)))
+                evictions += 1
+
+        if evictions:
+            metrics.incr("nodestore.local_cache.evict", amount=evictions, skip_internal=True)
+
+    def set_many(self, items):
+        for id, data in items.items():
+            self.set(id, data)
+
+    def delete(self, id):
+        with self._lock:
+            self._remove(id)
+
+    def delete_many(self, id_list):
+        with self._lock:
+            for id in id_list:
+                self._remove(id)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def _remove(self, id):
+        item = self._items.pop(id, None)
+        if item is not None:
+            self.size -= len(item[1])
+
+
+# Local caches are shared between all threads (nodestores are thread locals)
+# and instances with the same configuration.
+_local_caches = {}
+_local_caches_lock = Lock()
+
+
+def _get_local_cache(max_size, ttl):
+    with _local_caches_lock:
+        cache = _local_caches.get((max_size, ttl))
+        if cache is None:
+            cache = _local_caches[(max_size, ttl)] = LocalNodeCache(max_size, ttl)
+        return cache
+
 
 class NodeStorage(local, Service):
     """
@@ -56,6 +189,23 @@ class NodeStorage(local, Service):
 
     This is used in reprocessing to store a snapshot of the event from multiple
     stages of the pipeline.
+
+    :param framed_encoding: Write nodes in the framed encoding, which allows
+        reading a subkey without scanning the other subkeys. Nodes in either
+        encoding can always be read.
+    :param section_compression: When writing framed nodes, compress every
+        subkey individually. Only ``"zstd"`` is supported.
+    :param multi_concurrency: How many nodes to fetch (or delete, or write)
+        concurrently in ``get_multi`` (or ``delete_multi``, ``set_many``) for
+        backends without native batching. ``1`` fetches them sequentially.
+    :param multi_timeout: Timeout in seconds for all of the concurrent fetches
+        (or deletes, or writes) of one call, after which
+        ``concurrent.futures.TimeoutError`` is raised.
+    :param local_cache_size: Size in bytes of an in-process LRU cache of nodes
+        in front of the ``nodedata`` cache. ``0`` disables it.
+    :param local_cache_ttl: How many seconds nodes are kept in the in-process
+        cache. Deletes and writes from other processes are only picked up
+        after this time.
     """
 
     __all__ = (
@@ -64,12 +214,33 @@ class NodeStorage(local, Service):
         "get",
         "get_multi",
         "set",
+        "set_many",
         "set_subkeys",
         "cleanup",
         "validate",
         "bootstrap",
     )
 
+    def __init__(
+        self,
+        framed_encoding=False,
+        section_compression=None,
+        multi_concurrency=1,
+        multi_timeout=None,
+        local_cache_size=0,
+        local_cache_ttl=60,
+    ):
+        if section_compression is not None and section_compression not in SECTION_CODECS:
+            raise ValueError(f"unsupported section compression: {section_compression!r}")
+        assert multi_concurrency > 0
+        self.framed_encoding = framed_encoding
+        self.section_compression = section_compression
+        self.multi_concurrency = multi_concurrency
+        self.multi_timeout = multi_timeout
+        self.local_cache = (
+            _get_local_cache(local_cache_size, local_cache_ttl) if local_cache_size else None
+        )
+
     def delete(self, id):
         """
         >>> nodestore.delete('key1')
@@ -85,13 +256,32 @@ class NodeStorage(local, Service):
 
         >>> delete_multi(['key1', 'key2'])
         """
-        for id in id_list:
-            self.delete(id)
+        self._map_multi("delete_multi", self.delete, id_list)
+
+    def _map_multi(self, operation, func, id_list):
+        """
+        Call ``func`` for every id, concurrently if ``multi_concurrency``
+        allows it, and return the results in order.
+        """
+        tags = {"operation": operation}
+        metrics.timing("nodestore.multi.batch_size", len(id_list), tags=tags)
+
+        with metrics.timer("nodestore.multi.duration", tags=tags):
+            if self.multi_concurrency == 1 or len(id_list) <= 1:
+                return [func(id) for id in id_list]
+
+            # Nodestores are thread locals, so every worker thread sets up its
+            # own backend state (e.g. connections) on first use.
+            executor = _get_multi_executor(self.multi_concurrency)
+            return list(executor.map(func, id_list, timeout=self.multi_timeout))
 
     def _decode(self, value, subkey):
         if value is None:
             return None
 
+        if value.startswith(FRAMED_HEADER):
+            return self._decode_framed(value, subkey)
+
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -112,6 +302,23 @@ class NodeStorage(local, Service):
         except StopIteration:
             return None
 
+    def _decode_framed(self, value, subkey):
+        offset = len(FRAMED_HEADER)
+        (index_length,) = _FRAMED_INDEX_LENGTH.unpack_from(value, offset)
+        offset += _FRAMED_INDEX_LENGTH.size
+        index = json_loads(value[offset : offset + index_length])
+        offset += index_length
+
+        for key, length, compression in index:
+            if key == subkey:
+                section = value[offset : offset + length]
+                if compression is not None:
+                    section = SECTION_CODECS[compression].decode(section)
+                return json_loads(section)
+            offset += length
+
+        return None
+
     def _get_bytes(self, id):
         """
         >>> nodestore._get_bytes('key1')
@@ -154,7 +361,7 @@ class NodeStorage(local, Service):
             "key2": b'{"message": "hello world"}'
         }
         """
-        return {id: self._get_bytes(id) for id in id_list}
+        return dict(zip(id_list, self._map_multi("get_bytes_multi", self._get_bytes, id_list)))
 
     def get_multi(self, id_list, subkey=None):
         """
@@ -200,6 +407,9 @@ class NodeStorage(local, Service):
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
         """
+        if self.framed_encoding:
+            return self._encode_framed(data)
+
         lines = [json_dumps(data.pop(None)).encode("utf8")]
         for key, value in data.items():
             lines.append(key.encode("ascii"))
@@ -207,6 +417,28 @@ class NodeStorage(local, Service):
 
         return b"\n".join(lines)
 
+    def _encode_framed(self, data):
+        """
+        Encode data dict in the framed encoding, see ``FRAMED_HEADER``.
+        """
+        codec = SECTION_CODECS.get(self.section_compression)
+        index = []
+        sections = []
+        for key, value in data.items():
+            if key is not None:
+                # See ``_decode``, subkeys are static ASCII identifiers.
+                key.encode("ascii")
+            section = json_dumps(value).encode("utf8")
+            if codec is not None:
+                section = codec.encode(section)
+            index.append([key, len(section), self.section_compression])
+            sections.append(section)
+
+        index_bytes = json_dumps(index).encode("utf8")
+        return b"".join(
+            [FRAMED_HEADER, _FRAMED_INDEX_LENGTH.pack(len(index_bytes)), index_bytes] + sections
+        )
+
     def _set_bytes(self, id, data, ttl=None):
         """
         >>> nodestore.set('key1', b"{'foo': 'bar'}")
@@ -222,6 +454,30 @@ class NodeStorage(local, Service):
         """
         return self.set_subkeys(id, {None: data}, ttl=ttl)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        """
+        >>> nodestore._set_bytes_multi({'key1': b"{'foo': 'bar'}"})
+        """
+        self._map_multi(
+            "set_bytes_multi", lambda item: self._set_bytes(*item, ttl=ttl), list(items.items())
+        )
+
+    def set_many(self, items, ttl=None):
+        """
+        Set the values of multiple nodes, without subkeys.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_many({'key1': {'foo': 'bar'}, 'key2': {'foo': 'baz'}})
+        """
+        with sentry_sdk.start_span(op="nodestore.set_many") as span:
+            span.set_tag("num_ids", len(items))
+            bytes_items = {id: self._encode({None: data}) for id, data in items.items()}
+            self._set_bytes_multi(bytes_items, ttl=ttl)
+            # set cache only after encoding and write to nodestore has succeeded
+            self._set_cache_items(items)
+
     def set_subkeys(self, id, data, ttl=None):
         """
         Set value for `id` and its subkeys.
@@ -250,29 +506,58 @@ class NodeStorage(local, Service):
         raise NotImplementedError
 
     def _get_cache_item(self, id):
+        if self.local_cache:
+            rv = self.local_cache.get(id)
+            if rv is not None:
+                return rv
+
         if self.cache:
-            return self.cache.get(id)
+            rv = self.cache.get(id)
+            if rv and self.local_cache:
+                self.local_cache.set(id, rv)
+            return rv
 
     def _get_cache_items(self, id_list):
+        rv = {}
+        if self.local_cache:
+            rv = self.local_cache.get_many(id_list)
+            if len(rv) == len(id_list):
+                return rv
+            id_list = [id for id in id_list if id not in rv]
+
         if self.cache:
-            return self.cache.get_many(id_list)
-        return {}
+            items = self.cache.get_many(id_list)
+            if self.local_cache:
+                self.local_cache.set_many({id: data for id, data in items.items() if data})
+            rv.update(items)
+        return rv
 
     def _set_cache_item(self, id, data):
         if self.cache and data:
             self.cache.set(id, data)
+        if self.local_cache:
+            if data:
+                self.local_cache.set(id, data)
+            else:
+                self.local_cache.delete(id)
 
     def _set_cache_items(self, items):
         if self.cache:
             self.cache.set_many(items)
+        if self.local_cache:
+            self.local_cache.set_many({id: data for id, data in items.items() if data})
 
     def _delete_cache_item(self, id):
         if self.cache:
             self.cache.delete(id)
+        if self.local_cache:
+            self.local_cache.delete(id)
 
     def _delete_cache_items(self, id_list):
         if self.cache:
             self.cache.delete_many([id for id in id_list])
+        if self.local_cache:
+            self.local_cache.delete_many(id_list)
 
     @memoize
     def cache(self):
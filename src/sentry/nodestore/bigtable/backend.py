@@ -18,6 +18,10 @@ class BigtableNodeStorage(NodeStorage):
         valid for reading + returning)
     :param compression: A boolean whether to enable zlib-compression, or the
         string "zstd" to use zstd.
+    :param framed_encoding: See ``NodeStorage``.
+    :param section_compression: See ``NodeStorage``.
+    :param local_cache_size: See ``NodeStorage``.
+    :param local_cache_ttl: See ``NodeStorage``.
 
     >>> BigtableNodeStorage(
     ...     project='some-project',
@@ -38,8 +42,19 @@ class BigtableNodeStorage(NodeStorage):
         automatic_expiry=False,
         default_ttl=None,
         compression=False,
+        framed_encoding=False,
+        section_compression=None,
+        local_cache_size=0,
+        local_cache_ttl=60,
         **client_options,
     ):
+        super().__init__(
+            framed_encoding=framed_encoding,
+            section_compression=section_compression,
+            local_cache_size=local_cache_size,
+            local_cache_ttl=local_cache_ttl,
+        )
+
         if compression is True:
             compression = "zlib"
         elif compression is False:
@@ -67,6 +82,9 @@ class BigtableNodeStorage(NodeStorage):
     def _set_bytes(self, id, data, ttl=None):
         self.store.set(id, data, ttl)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        self.store.set_many(list(items.items()), ttl)
+
     def delete(self, id):
         if self.skip_deletes:
             return
@@ -5,7 +5,7 @@ import pickle
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.base import FRAMED_HEADER, NodeStorage
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
@@ -23,7 +23,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith((b"{", FRAMED_HEADER)):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -60,6 +60,8 @@ class DjangoNodeStorage(NodeStorage):
         BulkDeleteQuery(model=Node, dtfield="timestamp", days=days).execute()
         if self.cache:
             self.cache.clear()
+        if self.local_cache:
+            self.local_cache.clear()
 
     def bootstrap(self):
         # Nothing for Django backend to do during bootstrap
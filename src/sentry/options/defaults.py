@@ -212,6 +212,10 @@ register("store.projects-normalize-in-rust-percent-opt-in", default=0.0)  # unus
 # From 0.0 to 1.0: Randomly disable normalization code in interfaces when loading from db
 register("store.empty-interface-sample-rate", default=0.0)
 
+# From 0.0 to 1.0: Randomly store events with their repeating interfaces
+# deduplicated in nodestore (see ``sentry.eventstore.compressor``)
+register("store.nodestore-deduplication-sample-rate", default=0.0)
+
 # Enable multiple topics for eventstream. It allows specific event types to be sent
 # to specific topic.
 register("store.eventstream-per-type-topic", default=False, flags=FLAG_PRIORITIZE_DISK)
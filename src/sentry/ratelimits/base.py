@@ -2,9 +2,17 @@ from sentry.utils.services import Service
 
 
 class RateLimiter(Service):
-    __all__ = ("is_limited", "validate")
+    __all__ = ("is_limited", "is_limited_many", "validate")
 
     window = 60
 
     def is_limited(self, key, limit, project=None, window=None):
         return False
+
+    def is_limited_many(self, requests):
+        """
+        Check (and count) multiple rate limits at once. ``requests`` is a
+        sequence of dictionaries of ``is_limited`` keyword arguments, and a
+        list of booleans is returned in the same order.
+        """
+        return [self.is_limited(**request) for request in requests]
@@ -1,16 +1,43 @@
 from time import time
 
+from pkg_resources import resource_string
+
 from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.base import RateLimiter
 from sentry.utils.hashlib import md5_text
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import SentryScript, get_cluster_from_options
+
+SlidingWindowScript = SentryScript(
+    None, resource_string("sentry", "scripts/ratelimits/sliding_window.lua")
+)
+
+GCRAScript = SentryScript(None, resource_string("sentry", "scripts/ratelimits/gcra.lua"))
 
 
 class RedisRateLimiter(RateLimiter):
+    """
+    Supports the following algorithms, selected with the ``algorithm`` option:
+
+    * ``fixed_window``: counts requests in fixed windows. This allows bursts
+      of up to twice the limit around window boundaries.
+    * ``sliding_window``: approximates a sliding window from the counters of
+      the current and the previous fixed window.
+    * ``gcra``: the generic cell rate algorithm, which behaves like a token
+      bucket holding ``limit`` tokens that refills over ``window``.
+
+    Requests that are limited are not counted by the ``sliding_window`` and
+    ``gcra`` algorithms.
+    """
+
     window = 60
 
-    def __init__(self, **options):
+    algorithms = ("fixed_window", "sliding_window", "gcra")
+
+    def __init__(self, algorithm="fixed_window", **options):
         self.cluster, options = get_cluster_from_options("SENTRY_RATELIMITER_OPTIONS", options)
+        if algorithm not in self.algorithms:
+            raise InvalidConfiguration(f"unknown rate limiting algorithm: {algorithm!r}")
+        self.algorithm = algorithm
 
     def validate(self):
         try:
@@ -19,20 +46,62 @@ class RedisRateLimiter(RateLimiter):
         except Exception as e:
             raise InvalidConfiguration(str(e))
 
+    def _make_key(self, key, project):
+        key_hex = md5_text(key).hexdigest()
+        if project:
+            return f"{key_hex}:{project.id}"
+        return key_hex
+
     def is_limited(self, key, limit, project=None, window=None):
-        if window is None:
-            window = self.window
+        return self.is_limited_many(
+            [{"key": key, "limit": limit, "project": project, "window": window}]
+        )[0]
 
-        key_hex = md5_text(key).hexdigest()
-        bucket = int(time() / window)
+    def is_limited_many(self, requests):
+        now = time()
 
-        if project:
-            key = f"rl:{key_hex}:{project.id}:{bucket}"
-        else:
-            key = f"rl:{key_hex}:{bucket}"
+        if self.algorithm == "fixed_window":
+            results = []
+            with self.cluster.map() as client:
+                for request in requests:
+                    window = request.get("window") or self.window
+                    bucket = int(now / window)
+                    key = "rl:{}:{}".format(
+                        self._make_key(request["key"], request.get("project")), bucket
+                    )
+                    results.append((client.incr(key), request["limit"]))
+                    client.expire(key, window)
+
+            return [result.value > limit for result, limit in results]
+
+        commands = {}
+        for index, request in enumerate(requests):
+            limit = request["limit"]
+            window = request.get("window") or self.window
+            key = self._make_key(request["key"], request.get("project"))
+            if limit <= 0:
+                continue
+
+            if self.algorithm == "sliding_window":
+                bucket = int(now / window)
+                command = (
+                    SlidingWindowScript,
+                    [f"rl:sw:{key}:{bucket}", f"rl:sw:{key}:{bucket - 1}"],
+                    [limit, window, now - bucket * window],
+                )
+            else:
+                command = (GCRAScript, [f"rl:gcra:{key}"], [limit, window, repr(now)])
+
+            # Route by the key (not the bucket), so that the counters of all
+            # windows for a key live on the same host.
+            commands.setdefault(key, []).append((index, command))
 
-        with self.cluster.map() as client:
-            result = client.incr(key)
-            client.expire(key, window)
+        results = [True] * len(requests)
+        responses = self.cluster.execute_commands(
+            {key: [command for _, command in cmds] for key, cmds in commands.items()}
+        )
+        for key, cmds in commands.items():
+            for (index, _), response in zip(cmds, responses[key]):
+                results[index] = bool(response.value)
 
-        return result.value > limit
+        return results
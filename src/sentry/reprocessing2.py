@@ -143,7 +143,7 @@ def backup_unprocessed_event(project, data):
     if options.get("store.reprocessing-force-disable"):
         return
 
-    event_processing_store.store(dict(data), unprocessed=True)
+    event_processing_store.store(dict(data), unprocessed=True, stage="reprocess")
 
 
 def reprocess_event(project_id, event_id, start_time):
@@ -187,7 +187,7 @@ def reprocess_event(project_id, event_id, start_time):
     set_path(
         data, "contexts", "reprocessing", "original_primary_hash", value=event.get_primary_hash()
     )
-    cache_key = event_processing_store.store(data)
+    cache_key = event_processing_store.store(data, stage="reprocess")
 
     # Step 2: Copy attachments into attachment cache. Note that we can only
     # consider minidumps because filestore just stays as-is after reprocessing
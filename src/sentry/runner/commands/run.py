@@ -340,6 +340,31 @@ def post_process_forwarder(**options):
         return
 
 
+@run.command("symbolication-scheduler")
+@click.option(
+    "--concurrency",
+    default=16,
+    type=int,
+    help="How many parked events to poll symbolicator for at the same time.",
+)
+@log_options()
+@configuration
+def symbolication_scheduler(**options):
+    "Resume events parked while waiting for symbolicator."
+    from django.conf import settings
+
+    from sentry.lang.native.scheduler import get_scheduler
+
+    if not settings.SENTRY_SYMBOLICATION_SCHEDULER:
+        sys.stdout.write(
+            "The symbolication scheduler is not enabled "
+            "(SENTRY_SYMBOLICATION_SCHEDULER). Exiting...\n"
+        )
+        return
+
+    get_scheduler().run(concurrency=options["concurrency"])
+
+
 @run.command("query-subscription-consumer")
 @click.option(
     "--group",
@@ -419,6 +444,14 @@ def batching_kafka_options(group):
             help="How long to batch for before committing offsets.",
         )(f)
 
+        f = click.option(
+            "--processes",
+            "processes",
+            default=None,
+            type=int,
+            help="Number of processes used to decode messages. By default messages are decoded by the consumer process.",
+        )(f)
+
         f = click.option(
             "--auto-offset-reset",
             "auto_offset_reset",
@@ -469,7 +502,7 @@ def batching_kafka_options(group):
     "--concurrency",
     type=int,
     default=None,
-    help="(Deprecated) Ingest consumers no longer use multiple processing threads.",
+    help="Number of threads used to process the messages of a batch. Messages of the same project and event are processed in order.",
 )
 @configuration
 def ingest_consumer(consumer_types, all_consumer_types, **options):
@@ -493,10 +526,6 @@ def ingest_consumer(consumer_types, all_consumer_types, **options):
     if not all_consumer_types and not consumer_types:
         raise click.ClickException("Need to specify --all-consumer-types or --consumer-type")
 
-    concurrency = options.pop("concurrency", None)
-    if concurrency is not None:
-        click.echo("Warning: `concurrency` argument is deprecated and will be removed.", err=True)
-
     with metrics.global_tags(
         ingest_consumer_types=",".join(sorted(consumer_types)), _all_threads=True
     ):
@@ -0,0 +1,40 @@
+-- Checks which events have already been marked as processed by
+-- deduplication_mark.lua.
+--
+-- Every time partition of the deduplication index consists of a bloom filter
+-- and the exact set of event ids. The bloom filter is checked first, and the
+-- exact set only for events that may be contained in the filter, so that a
+-- false positive of the filter never marks an event as a duplicate.
+--
+-- KEYS = {bloom filter, exact set} for every partition that is checked
+-- ARGV = {hash count, then for every event: event id, followed by <hash count> bit offsets}
+--
+-- Returns a list with 1 for every duplicate event and 0 otherwise.
+local hash_count = tonumber(ARGV[1])
+local partitions = #KEYS / 2
+
+local function maybe_contains(bloom_filter, offset)
+    for i = 1, hash_count do
+        if redis.call('GETBIT', bloom_filter, ARGV[offset + i]) == 0 then
+            return false
+        end
+    end
+    return true
+end
+
+local rv = {}
+local offset = 2
+while offset <= #ARGV do
+    local event_id = ARGV[offset]
+    local duplicate = 0
+    for p = 1, partitions do
+        local bloom_filter, exact_set = KEYS[p * 2 - 1], KEYS[p * 2]
+        if maybe_contains(bloom_filter, offset) and redis.call('SISMEMBER', exact_set, event_id) == 1 then
+            duplicate = 1
+            break
+        end
+    end
+    table.insert(rv, duplicate)
+    offset = offset + hash_count + 1
+end
+return rv
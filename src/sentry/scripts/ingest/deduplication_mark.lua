@@ -0,0 +1,21 @@
+-- Marks events as processed in the current partition of the deduplication
+-- index (see deduplication_check.lua).
+--
+-- KEYS = {bloom filter, exact set} of the current partition
+-- ARGV = {hash count, TTL (seconds), then for every event: event id, followed by <hash count> bit offsets}
+local hash_count = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local bloom_filter, exact_set = KEYS[1], KEYS[2]
+
+local offset = 3
+while offset <= #ARGV do
+    for i = 1, hash_count do
+        redis.call('SETBIT', bloom_filter, ARGV[offset + i], 1)
+    end
+    redis.call('SADD', exact_set, ARGV[offset])
+    offset = offset + hash_count + 1
+end
+
+redis.call('EXPIRE', bloom_filter, ttl)
+redis.call('EXPIRE', exact_set, ttl)
+return 0
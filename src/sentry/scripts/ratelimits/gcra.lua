@@ -0,0 +1,23 @@
+-- Generic cell rate algorithm (GCRA) rate limiter, equivalent to a token
+-- bucket with a capacity of ``limit`` that refills at ``limit`` tokens per
+-- ``window``, while only storing a single timestamp per key: the theoretical
+-- arrival time (TAT) of the next request.
+--
+-- KEYS = {TAT key}
+-- ARGV = {limit, window (seconds), current time (seconds, fractional)}
+--
+-- Returns 1 if the request is limited, 0 otherwise.
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local interval = window / limit
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+local new_tat = math.max(tat, now) + interval
+
+if new_tat - now > window then
+    return 1
+end
+
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return 0
@@ -0,0 +1,27 @@
+-- Sliding window counter rate limiter.
+--
+-- Estimates the number of requests in the window ending now from the counter
+-- of the current fixed window and the counter of the previous one, weighted
+-- by how much of the previous window still overlaps. This avoids the 2x
+-- bursts a fixed window allows at window boundaries.
+--
+-- KEYS = {current window counter, previous window counter}
+-- ARGV = {limit, window (seconds), elapsed time in the current window (seconds)}
+--
+-- The current counter is only incremented if the request is not limited.
+-- Returns 1 if the request is limited, 0 otherwise.
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+
+local current = tonumber(redis.call('GET', KEYS[1]) or 0)
+local previous = tonumber(redis.call('GET', KEYS[2]) or 0)
+
+if previous * (window - elapsed) / window + current + 1 > limit then
+    return 1
+end
+
+redis.call('INCR', KEYS[1])
+-- The counter is needed as "previous" for the whole next window.
+redis.call('EXPIRE', KEYS[1], window * 2)
+return 0
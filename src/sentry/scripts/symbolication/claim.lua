@@ -0,0 +1,12 @@
+-- Claims the parked events which are due to be polled by the symbolication
+-- scheduler (see sentry.lang.native.scheduler). Claimed events are not
+-- removed, but scored by the end of their lease instead, so that they are
+-- claimed again if the scheduler fails to park or resume them.
+--
+-- KEYS = {parked events}
+-- ARGV = {now, end of the lease, maximum number of events to claim}
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, member in ipairs(members) do
+    redis.call('ZADD', KEYS[1], ARGV[2], member)
+end
+return members
@@ -0,0 +1,20 @@
+-- Releases an event claimed by the symbolication scheduler (see
+-- sentry.lang.native.scheduler) by either parking it again or removing it.
+-- Events are only released while they still hold the given lease, so that an
+-- event whose lease ran out and which was claimed by another scheduler, or
+-- parked again by the resumed task, is left alone.
+--
+-- KEYS = {parked events}
+-- ARGV = {member, end of the lease, score to park the event with or "" to remove it}
+--
+-- Returns 1 if the event was released, 0 otherwise.
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) ~= tonumber(ARGV[2]) then
+    return 0
+end
+if ARGV[3] == '' then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+else
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+end
+return 1
@@ -0,0 +1,34 @@
+--[[
+
+Counters
+========
+
+Increments the counters of many hashes and updates their expiration times in
+a single call, replacing a pipeline of ``HINCRBY`` and ``EXPIREAT`` commands.
+
+Every key in ``KEYS`` is a counter hash. The ``ARGV`` contains, for each key in
+the same order, the expiration timestamp of the hash, the number of fields to
+increment, and that many pairs of field and increment:
+
+    EVALSHA $SHA 2 ts:1:1368889980:1 ts:1:1368889980:2 \
+        1368896400 2 1 1 2 5 \
+        1368896400 1 3 1
+
+This increments fields 1 and 2 of the first hash by 1 and 5, and field 3 of
+the second hash by 1, and sets the expiration time of both hashes.
+
+]]--
+
+local argi = 1
+for _, key in ipairs(KEYS) do
+    local expiry = ARGV[argi]
+    local count = tonumber(ARGV[argi + 1])
+    argi = argi + 2
+
+    for _ = 1, count do
+        redis.call('HINCRBY', key, ARGV[argi], ARGV[argi + 1])
+        argi = argi + 2
+    end
+
+    redis.call('EXPIREAT', key, expiry)
+end
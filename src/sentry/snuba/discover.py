@@ -1,3 +1,4 @@
+import itertools
 import logging
 import math
 from collections import namedtuple
@@ -129,8 +130,15 @@ def transform_meta(results, function_alias_map):
         for value in results["meta"]
     }
     # Ensure all columns in the result have types.
-    if results["data"]:
-        for key in results["data"][0]:
+    if isinstance(results["data"], list):
+        first_row = results["data"][0] if results["data"] else None
+    else:
+        # Streamed results, peek at the first row.
+        first_row = next(results["data"], None)
+        if first_row is not None:
+            results["data"] = itertools.chain([first_row], results["data"])
+    if first_row:
+        for key in first_row:
             if key not in meta:
                 meta[key] = "string"
     return meta
@@ -160,10 +168,14 @@ def transform_data(result, translated_columns, snuba_filter, selected_columns=No
         return transformed
 
     if len(translated_columns):
-        result["data"] = [get_row(row) for row in result["data"]]
+        if isinstance(result["data"], list):
+            result["data"] = [get_row(row) for row in result["data"]]
+        else:
+            result["data"] = map(get_row, result["data"])
 
     rollup = snuba_filter.rollup
     if rollup and rollup > 0:
+        result["data"] = list(result["data"])
         with sentry_sdk.start_span(
             op="discover.discover", description="transform_results.zerofill"
         ) as span:
@@ -188,6 +200,7 @@ def query(
     use_aggregate_conditions=False,
     conditions=None,
     functions_acl=None,
+    stream=False,
 ):
     """
     High-level API for doing arbitrary user queries against events.
@@ -212,6 +225,8 @@ def query(
     use_aggregate_conditions (bool) Set to true if aggregates conditions should be used at all.
     conditions (Sequence[any]) List of conditions that are passed directly to snuba without
                     any additional processing.
+    stream (bool) Set to true to decode the response incrementally. The resulting "data"
+                    is an iterator of rows instead of a list.
     """
     if not selected_columns:
         raise InvalidSearchQuery("No columns selected")
@@ -313,12 +328,14 @@ def query(
             limit=limit,
             offset=offset,
             referrer=referrer,
+            **({"stream": True} if stream else {}),
         )
 
     with sentry_sdk.start_span(
         op="discover.discover", description="query.transform_results"
     ) as span:
-        span.set_data("result_count", len(result.get("data", [])))
+        if not stream:
+            span.set_data("result_count", len(result.get("data", [])))
         return transform_results(
             result, resolved_fields["functions"], translated_columns, snuba_filter, selected_columns
         )
@@ -51,6 +51,7 @@ class TagStorage(Service):
             "get_group_ids_for_users",
             "get_group_tag_values_for_users",
             "get_group_tag_keys_and_top_values",
+            "get_group_tag_keys_and_top_values_many",
             "get_tag_value_paginator",
             "get_group_tag_value_paginator",
             "get_tag_value_paginator_for_projects",
@@ -311,6 +312,26 @@ class TagStorage(Service):
 
         return tag_keys
 
+    def get_group_tag_keys_and_top_values_many(
+        self,
+        project_id,
+        group_ids,
+        environment_ids,
+        keys=None,
+        value_limit=TOP_VALUES_DEFAULT_LIMIT,
+        **kwargs,
+    ):
+        """
+        >>> get_group_tag_keys_and_top_values_many(1, [2, 3], [4])
+        {2: {GroupTagKey(...), ...}, 3: {...}}
+        """
+        return {
+            group_id: self.get_group_tag_keys_and_top_values(
+                project_id, group_id, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+            )
+            for group_id in group_ids
+        }
+
     def get_group_seen_values_for_environments(
         self, project_ids, group_id_list, environment_ids, start=None, end=None
     ):
@@ -8,6 +8,7 @@ from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
 
 from sentry.api.event_search import FIELD_ALIASES, PROJECT_ALIAS, USER_DISPLAY_ALIAS
 from sentry.api.utils import default_start_end_dates
+from sentry.app import env
 from sentry.models import Project, ReleaseProjectEnvironment
 from sentry.snuba.dataset import Dataset
 from sentry.tagstore import TagKeyStatus
@@ -53,6 +54,35 @@ def get_project_list(project_id):
     return project_id if isinstance(project_id, Iterable) else [project_id]
 
 
+def request_memoized(f):
+    """
+    Memoizes the results of a read method for the duration of the current
+    request, as endpoints (and the serializers they use) often look up the
+    same group tags several times. Outside of requests, nothing is memoized.
+
+    Memoized results are shared within the request and must not be modified.
+    """
+
+    @functools.wraps(f)
+    def inner(self, *args, **kwargs):
+        request = env.request
+        if request is None:
+            return f(self, *args, **kwargs)
+
+        memo = getattr(request, "_tagstore_memo", None)
+        if memo is None:
+            memo = request._tagstore_memo = {}
+
+        key = repr((f.__name__, args, sorted(kwargs.items())))
+        if key in memo:
+            metrics.incr("tagstore.request_memo.hit", tags={"method": f.__name__})
+        else:
+            memo[key] = f(self, *args, **kwargs)
+        return memo[key]
+
+    return inner
+
+
 class SnubaTagStorage(TagStorage):
     def __get_tag_key(self, project_id, group_id, environment_id, key):
         tag = f"tags[{key}]"
@@ -357,11 +387,13 @@ class SnubaTagStorage(TagStorage):
         )
         return set(key.top_values)
 
+    @request_memoized
     def get_group_tag_key(self, project_id, group_id, environment_id, key):
         return self.__get_tag_key_and_top_values(
             project_id, group_id, environment_id, key, limit=TOP_VALUES_DEFAULT_LIMIT
         )
 
+    @request_memoized
     def get_group_tag_keys(
         self, project_id, group_id, environment_ids, limit=None, keys=None, **kwargs
     ):
@@ -377,9 +409,11 @@ class SnubaTagStorage(TagStorage):
             **kwargs,
         )
 
+    @request_memoized
     def get_group_tag_value(self, project_id, group_id, environment_id, key, value):
         return self.__get_tag_value(project_id, group_id, environment_id, key, value)
 
+    @request_memoized
     def get_group_tag_values(self, project_id, group_id, environment_id, key):
         # NB this uses a 'top' values function, but the limit is None so it should
         # return all values for this key.
@@ -441,6 +475,7 @@ class SnubaTagStorage(TagStorage):
 
         return {issue: fix_tag_value_data(data) for issue, data in result.items()}
 
+    @request_memoized
     def get_group_tag_value_count(self, project_id, group_id, environment_id, key):
         tag = f"tags[{key}]"
         filters = {"project_id": get_project_list(project_id), "group_id": [group_id]}
@@ -457,12 +492,14 @@ class SnubaTagStorage(TagStorage):
             referrer="tagstore.get_group_tag_value_count",
         )
 
+    @request_memoized
     def get_top_group_tag_values(
         self, project_id, group_id, environment_id, key, limit=TOP_VALUES_DEFAULT_LIMIT
     ):
         tag = self.__get_tag_key_and_top_values(project_id, group_id, environment_id, key, limit)
         return tag.top_values
 
+    @request_memoized
     def get_group_tag_keys_and_top_values(
         self,
         project_id,
@@ -472,66 +509,139 @@ class SnubaTagStorage(TagStorage):
         keys=None,
         value_limit=TOP_VALUES_DEFAULT_LIMIT,
         **kwargs,
+    ):
+        return self.__get_group_tag_keys_and_top_values_many(
+            project_id, [group_id], environment_ids, keys, value_limit, **kwargs
+        )[group_id]
+
+    @request_memoized
+    def get_group_tag_keys_and_top_values_many(
+        self,
+        project_id,
+        group_ids,
+        environment_ids,
+        keys=None,
+        value_limit=TOP_VALUES_DEFAULT_LIMIT,
+        **kwargs,
+    ):
+        return self.__get_group_tag_keys_and_top_values_many(
+            project_id, group_ids, environment_ids, keys, value_limit, **kwargs
+        )
+
+    def __get_group_tag_keys_and_top_values_many(
+        self, project_id, group_ids, environment_ids, keys, value_limit, **kwargs
     ):
         # Similar to __get_tag_key_and_top_values except we get the top values
         # for all the keys provided. value_limit in this case means the number
         # of top values for each key, so the total rows returned should be
         # num_keys * limit.
-
-        # First get totals and unique counts by key.
-        keys_with_counts = self.get_group_tag_keys(project_id, group_id, environment_ids, keys=keys)
-
-        # Then get the top values with first_seen/last_seen/count for each
-        filters = {"project_id": get_project_list(project_id)}
+        #
+        # For every group, we need the totals and unique counts by key, as well
+        # as the top values with first_seen/last_seen/count for each key. All
+        # of these queries are sent to Snuba in a single request.
+        default_start, default_end = default_start_end_dates()
+        filters = {"project_id": sorted(get_project_list(project_id))}
         if environment_ids:
-            filters["environment"] = environment_ids
+            filters["environment"] = sorted(environment_ids)
         if keys is not None:
-            filters["tags_key"] = keys
-        if group_id is not None:
-            filters["group_id"] = [group_id]
-        conditions = kwargs.get("conditions", [])
-        conditions.append(DEFAULT_TYPE_CONDITION)
-        aggregations = kwargs.get("aggregations", [])
-        aggregations += [
+            filters["tags_key"] = sorted(keys)
+        conditions = kwargs.get("conditions", []) + [DEFAULT_TYPE_CONDITION]
+        aggregations = kwargs.get("aggregations", []) + [
             ["count()", "", "count"],
             ["min", SEEN_COLUMN, "first_seen"],
             ["max", SEEN_COLUMN, "last_seen"],
         ]
 
-        values_by_key = snuba.query(
-            dataset=Dataset.Events,
-            start=kwargs.get("start"),
-            end=kwargs.get("end"),
-            groupby=["tags_key", "tags_value"],
-            conditions=conditions,
-            filter_keys=filters,
-            aggregations=aggregations,
-            orderby="-count",
-            limitby=[value_limit, "tags_key"],
-            referrer="tagstore.__get_tag_keys_and_top_values",
-        )
+        snuba_params = []
+        for group_id in group_ids:
+            group_filters = dict(filters)
+            if group_id is not None:
+                group_filters["group_id"] = [group_id]
+
+            snuba_params.append(
+                snuba.SnubaQueryParams(
+                    dataset=Dataset.Events,
+                    start=default_start,
+                    end=default_end,
+                    groupby=["tags_key"],
+                    filter_keys=group_filters,
+                    aggregations=[
+                        ["count()", "", "count"],
+                        ["uniq", "tags_value", "values_seen"],
+                    ],
+                    limit=1000,
+                    orderby="-count",
+                    referrer="tagstore.__get_tag_keys",
+                )
+            )
+            snuba_params.append(
+                snuba.SnubaQueryParams(
+                    dataset=Dataset.Events,
+                    start=kwargs.get("start"),
+                    end=kwargs.get("end"),
+                    groupby=["tags_key", "tags_value"],
+                    conditions=conditions,
+                    filter_keys=group_filters,
+                    aggregations=aggregations,
+                    orderby="-count",
+                    limitby=[value_limit, "tags_key"],
+                    referrer="tagstore.__get_tag_keys_and_top_values",
+                )
+            )
 
-        # Then supplement the key objects with the top values for each.
-        if group_id is None:
-            value_ctor = TagValue
-        else:
-            value_ctor = functools.partial(GroupTagValue, group_id=group_id)
+        try:
+            results = snuba.bulk_raw_query(
+                snuba_params, referrer="tagstore.get_group_tag_keys_and_top_values_many"
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            if len(group_ids) == 1:
+                return {group_ids[0]: set()}
+            # One of the groups has no events in the queried range, which fails
+            # the whole batch. Query the groups one by one instead.
+            return {
+                group_id: self.__get_group_tag_keys_and_top_values_many(
+                    project_id, [group_id], environment_ids, keys, value_limit, **kwargs
+                )[group_id]
+                for group_id in group_ids
+            }
 
-        for keyobj in keys_with_counts:
-            key = keyobj.key
-            values = values_by_key.get(key, [])
-            keyobj.top_values = [
-                value_ctor(
-                    key=keyobj.key,
-                    value=value,
-                    times_seen=data["count"],
-                    first_seen=parse_datetime(data["first_seen"]),
-                    last_seen=parse_datetime(data["last_seen"]),
+        aggregate_names = [a[2] for a in aggregations]
+        tag_keys = {}
+        for index, group_id in enumerate(group_ids):
+            counts_by_key = snuba.nest_groups(
+                results[index * 2]["data"], ["tags_key"], ["count", "values_seen"]
+            )
+            values_by_key = snuba.nest_groups(
+                results[index * 2 + 1]["data"], ["tags_key", "tags_value"], aggregate_names
+            )
+
+            if group_id is None:
+                key_ctor = TagKey
+                value_ctor = TagValue
+            else:
+                key_ctor = functools.partial(GroupTagKey, group_id=group_id)
+                value_ctor = functools.partial(GroupTagValue, group_id=group_id)
+
+            tag_keys[group_id] = {
+                key_ctor(
+                    key=key,
+                    count=counts["count"],
+                    values_seen=counts["values_seen"],
+                    top_values=[
+                        value_ctor(
+                            key=key,
+                            value=value,
+                            times_seen=data["count"],
+                            first_seen=parse_datetime(data["first_seen"]),
+                            last_seen=parse_datetime(data["last_seen"]),
+                        )
+                        for value, data in values_by_key.get(key, {}).items()
+                    ],
                 )
-                for value, data in values.items()
-            ]
+                for key, counts in counts_by_key.items()
+            }
 
-        return keys_with_counts
+        return tag_keys
 
     def __get_release(self, project_id, group_id, first=True):
         filters = {"project_id": get_project_list(project_id)}
@@ -556,9 +666,11 @@ class SnubaTagStorage(TagStorage):
         else:
             return list(result.keys())[0]
 
+    @request_memoized
     def get_first_release(self, project_id, group_id):
         return self.__get_release(project_id, group_id, True)
 
+    @request_memoized
     def get_last_release(self, project_id, group_id):
         return self.__get_release(project_id, group_id, False)
 
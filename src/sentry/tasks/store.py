@@ -188,7 +188,9 @@ def preprocess_event_from_reprocessing(
     )
 
 
-def _do_symbolicate_event(cache_key, start_time, event_id, symbolicate_task, data=None):
+def _do_symbolicate_event(
+    cache_key, start_time, event_id, symbolicate_task, data=None, symbolication_start_time=None
+):
     from sentry.lang.native.processing import get_symbolication_function
 
     if data is None:
@@ -214,7 +216,10 @@ def _do_symbolicate_event(cache_key, start_time, event_id, symbolicate_task, dat
 
     from_reprocessing = symbolicate_task is symbolicate_event_from_reprocessing
 
-    symbolication_start_time = time()
+    # Events resumed by the symbolication scheduler keep the time they were
+    # first symbolicated, so that they are subject to the same timeouts.
+    if symbolication_start_time is None:
+        symbolication_start_time = time()
 
     with sentry_sdk.start_span(op="tasks.store.symbolicate_event.symbolication") as span:
         span.set_data("symbolicaton_function", symbolication_function.__name__)
@@ -263,6 +268,27 @@ def _do_symbolicate_event(cache_key, start_time, event_id, symbolicate_task, dat
                         data.setdefault("_metrics", {})["flag.processing.fatal"] = True
                         has_changed = True
                         break
+                    elif settings.SENTRY_SYMBOLICATION_SCHEDULER:
+                        # Free the worker, the symbolication scheduler resumes
+                        # the event once symbolicator is done with it.
+                        from sentry.lang.native.scheduler import ParkedEvent, get_scheduler
+
+                        get_scheduler().park(
+                            ParkedEvent(
+                                project_id=project_id,
+                                event_id=event_id,
+                                cache_key=cache_key,
+                                start_time=start_time,
+                                symbolication_start_time=symbolication_start_time,
+                                from_reprocessing=from_reprocessing,
+                            ),
+                            e.retry_after,
+                        )
+                        metrics.incr(
+                            "tasks.store.symbolicate_event.parked",
+                            tags={"symbolication_function": symbolication_function.__name__},
+                        )
+                        return
                     else:
                         # sleep for `retry_after` but max 5 seconds and try again
                         metrics.incr(
@@ -291,7 +317,7 @@ def _do_symbolicate_event(cache_key, start_time, event_id, symbolicate_task, dat
         data = dict(data.items())
 
     if has_changed:
-        cache_key = event_processing_store.store(data)
+        cache_key = event_processing_store.store(data, stage="symbolicate")
 
     process_task = process_event_from_reprocessing if from_reprocessing else process_event
     _do_process_event(
@@ -325,6 +351,7 @@ def symbolicate_event(cache_key, start_time=None, event_id=None, **kwargs):
         start_time=start_time,
         event_id=event_id,
         symbolicate_task=symbolicate_event,
+        symbolication_start_time=kwargs.get("symbolication_start_time"),
     )
 
 
@@ -341,6 +368,7 @@ def symbolicate_event_from_reprocessing(cache_key, start_time=None, event_id=Non
         start_time=start_time,
         event_id=event_id,
         symbolicate_task=symbolicate_event_from_reprocessing,
+        symbolication_start_time=kwargs.get("symbolication_start_time"),
     )
 
 
@@ -514,7 +542,7 @@ def _do_process_event(
             _do_preprocess_event(cache_key, data, start_time, event_id, process_task, project)
             return
 
-        cache_key = event_processing_store.store(data)
+        cache_key = event_processing_store.store(data, stage="process")
 
     from_reprocessing = process_task is process_event_from_reprocessing
     submit_save_event(project, from_reprocessing, cache_key, event_id, start_time, data)
@@ -676,7 +704,6 @@ def create_failed_event(
             data=issue["data"],
         )
     event_processing_store.delete_by_key(cache_key)
-    event_processing_store.delete_by_key(cache_key)
 
     return True
 
@@ -749,7 +776,7 @@ def _do_save_event(
                 if isinstance(data, CANONICAL_TYPES):
                     data = dict(data.items())
                 with metrics.timer("tasks.store.do_save_event.write_processing_cache"):
-                    event_processing_store.store(data)
+                    event_processing_store.store(data, stage="save")
         except HashDiscarded:
             # Delete the event payload from cache since it won't show up in post-processing.
             if cache_key:
@@ -12,6 +12,8 @@ from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
+from sentry.utils.cache import default_cache
 from sentry.utils.compat import crc32, map, zip
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
@@ -23,6 +25,8 @@ SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/cmsketch.lua"))
 
+CountersScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/counters.lua"))
+
 
 class SuppressionWrapper:
     """\
@@ -103,6 +107,16 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    When ``enable_scripted_counters`` is set, simple counters are incremented
+    with the ``counters.lua`` script, using one script call per host instead
+    of a ``HINCRBY`` and an ``EXPIREAT`` per hash field.
+
+    When ``range_cache_ttl`` is set, ``get_range`` caches the counts of closed
+    buckets (buckets that ended before the time of the query) for that many
+    seconds, and only reads the open bucket from Redis on subsequent calls.
+    Late writes to, merges into and deletes of closed buckets are only
+    visible once the cached entry expires.
     """
 
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
@@ -112,6 +126,8 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        self.enable_scripted_counters = options.pop("enable_scripted_counters", False)
+        self.range_cache_ttl = options.pop("range_cache_ttl", None)
         super().__init__(**options)
 
     def validate(self):
@@ -222,44 +238,82 @@ class RedisTSDB(BaseTSDB):
             default_timestamp = timezone.now()
 
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
-
-            with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
-
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
-
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+            # (hash_key, hash_field) -> count
+            key_operations = defaultdict(lambda: 0)
+            # (hash_key) -> "max expiration encountered"
+            key_expiries = defaultdict(lambda: 0.0)
+
+            for rollup, max_values in self.rollups.items():
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+
+                    for environment_id in environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
 
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                        if key_expiries[hash_key] < expiry:
+                            key_expiries[hash_key] = expiry
 
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
+                        key_operations[(hash_key, hash_field)] += count
 
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
+            if self.enable_scripted_counters:
+                try:
+                    self._incr_counters_scripted(cluster, key_operations, key_expiries)
+                except Exception:
+                    if durable:
+                        raise
+                continue
 
-                            key_operations[(hash_key, hash_field)] += count
+            manager = cluster.map()
+            if not durable:
+                manager = SuppressionWrapper(manager)
 
+            with manager as client:
                 for (hash_key, hash_field), count in key_operations.items():
                     client.hincrby(hash_key, hash_field, count)
                     if key_expiries.get(hash_key):
                         client.expireat(hash_key, key_expiries.pop(hash_key))
 
+    def _incr_counters_scripted(self, cluster, key_operations, key_expiries):
+        """
+        Apply counter increments with one ``counters.lua`` call per host.
+        Every hash is still written to the host it is routed to, so that
+        reads are not affected.
+        """
+        # hash_key -> [(hash_field, count), ...]
+        fields_by_key = defaultdict(list)
+        for (hash_key, hash_field), count in key_operations.items():
+            fields_by_key[hash_key].append((hash_field, count))
+
+        router = cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for hash_key in fields_by_key:
+            keys_by_host[router.get_host_for_key(hash_key)].append(hash_key)
+
+        commands = {}
+        for hash_keys in keys_by_host.values():
+            arguments = []
+            for hash_key in hash_keys:
+                fields = fields_by_key[hash_key]
+                arguments.extend([int(key_expiries[hash_key]), len(fields)])
+                for hash_field, count in fields:
+                    arguments.extend([hash_field, count])
+            # All keys route to the same host, so any of them can be used as
+            # the routing key.
+            commands[hash_keys[0]] = [(CountersScript, hash_keys, arguments)]
+
+        cluster.execute_commands(commands)
+
     def get_range(
         self, model, keys, start, end, rollup=None, environment_ids=None, use_cache=False
     ):
@@ -279,13 +333,42 @@ class RedisTSDB(BaseTSDB):
         self.validate_arguments([model], [environment_id])
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = map(to_datetime, series)
+
+        # key -> counts of the closed buckets, see ``range_cache_ttl``
+        cached_counts = {}
+        cache_keys = {}
+        closed_series = []
+        if self.range_cache_ttl:
+            now = int(to_timestamp(timezone.now()))
+            closed_series = [epoch for epoch in series if epoch + rollup <= now]
+            if closed_series:
+                cache_keys = {
+                    key: self.make_range_cache_key(
+                        model, rollup, closed_series, key, environment_id
+                    )
+                    for key in keys
+                }
+                cache_values = default_cache.get_many(list(cache_keys.values()))
+                cached_counts = {
+                    key: cache_values[cache_key]
+                    for key, cache_key in cache_keys.items()
+                    if cache_key in cache_values
+                }
+                metrics.incr("tsdb.range_cache.hit", amount=len(cached_counts), skip_internal=True)
+                metrics.incr(
+                    "tsdb.range_cache.miss",
+                    amount=len(keys) - len(cached_counts),
+                    skip_internal=True,
+                )
+
+        open_series = series[len(closed_series) :]
 
         results = []
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
             for key in keys:
-                for timestamp in series:
+                for epoch in open_series if key in cached_counts else series:
+                    timestamp = to_datetime(epoch)
                     hash_key, hash_field = self.make_counter_key(
                         model, rollup, timestamp, key, environment_id
                     )
@@ -297,10 +380,40 @@ class RedisTSDB(BaseTSDB):
         for epoch, key, count in results:
             results_by_key[key][epoch] = int(count.value or 0)
 
+        for key, counts in cached_counts.items():
+            for epoch, count in zip(closed_series, counts):
+                results_by_key[key][to_timestamp(to_datetime(epoch))] = count
+
         for key, points in results_by_key.items():
             results_by_key[key] = sorted(points.items())
+
+        if cache_keys:
+            default_cache.set_many(
+                {
+                    cache_key: [count for _, count in results_by_key[key][: len(closed_series)]]
+                    for key, cache_key in cache_keys.items()
+                    if key not in cached_counts and key in results_by_key
+                },
+                self.range_cache_ttl,
+            )
+
         return dict(results_by_key)
 
+    def make_range_cache_key(self, model, rollup, closed_series, key, environment_id):
+        """
+        Make the key used to cache the counts of the closed buckets of a
+        range (see ``range_cache_ttl``).
+        """
+        return "tsdb:range:{prefix}{model}:{rollup}:{start}:{end}:{key}:{environment_id}".format(
+            prefix=self.prefix,
+            model=model.value,
+            rollup=rollup,
+            start=closed_series[0],
+            end=closed_series[-1],
+            key=self.get_model_key(key),
+            environment_id=environment_id,
+        )
+
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
             [None]
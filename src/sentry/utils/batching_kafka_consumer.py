@@ -1,6 +1,9 @@
 import abc
 import logging
+import multiprocessing
 import time
+import traceback
+from collections import deque
 from typing import List
 
 from confluent_kafka import (
@@ -57,6 +60,71 @@ def wait_for_topics(admin_client: AdminClient, topics: List[str], timeout: int =
                 )
 
 
+class PicklableMessage:
+    """A copy of a Kafka message that can be sent to another process. It has
+    the same interface as `confluent_kafka.Message` for reading messages."""
+
+    __slots__ = ("_topic", "_partition", "_offset", "_key", "_value", "_headers", "_timestamp")
+
+    def __init__(self, message):
+        self._topic = message.topic()
+        self._partition = message.partition()
+        self._offset = message.offset()
+        self._key = message.key()
+        self._value = message.value()
+        self._headers = message.headers()
+        self._timestamp = message.timestamp()
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return self._headers
+
+    def timestamp(self):
+        return self._timestamp
+
+    def error(self):
+        return None
+
+
+# The worker of the consumer that started the process pool. Processes are
+# forked, so that the worker does not need to be picklable.
+_pool_worker = None
+
+
+def _process_messages_in_pool(messages):
+    rv = []
+    for message in messages:
+        start = time.time()
+        try:
+            result = (True, _pool_worker.process_message(message))
+        except Exception:
+            # Exceptions are not necessarily picklable.
+            result = (False, traceback.format_exc())
+        rv.append(result + ((time.time() - start) * 1000,))
+    return rv
+
+
 class AbstractBatchWorker(metaclass=abc.ABCMeta):
     """The `BatchingKafkaConsumer` requires an instance of this class to
     handle user provided work such as processing raw messages and flushing
@@ -111,6 +179,12 @@ class BatchingKafkaConsumer:
       and flush a batch of events
     * Supports an optional "dead letter topic" where messages that raise an exception during
       `process_message` are sent so as not to block the pipeline.
+    * Optionally (with ``processes``) calls `process_message` in a pool of forked processes,
+      so that decoding messages is not limited to a single core. Messages are sent to the pool
+      in chunks of ``process_chunk_size``; results are added to the batch in the order the
+      messages were received, and all messages of a batch are processed before the batch is
+      flushed and its offsets are committed. `process_message` must not rely on any state
+      shared with the consumer process.
 
     NOTE: This does not eliminate the possibility of duplicates if the consumer process
     crashes between writing to its backend and commiting Kafka offsets. This should eliminate
@@ -145,6 +219,8 @@ class BatchingKafkaConsumer:
         queued_min_messages=DEFAULT_QUEUED_MIN_MESSAGES,
         metrics_sample_rates=None,
         metrics_default_tags=None,
+        processes=None,
+        process_chunk_size=100,
     ):
         assert isinstance(worker, AbstractBatchWorker)
         self.worker = worker
@@ -169,6 +245,22 @@ class BatchingKafkaConsumer:
         # new messages)
         self.__batch_processing_time_ms = 0.0
 
+        # Messages not sent to the process pool yet, and the pending results
+        # of chunks of messages sent to the pool, in order.
+        self.__pool_chunk = []
+        self.__pool_results = deque()
+        self.__pool_pending_count = 0
+        self.process_chunk_size = process_chunk_size
+
+        if processes is not None and processes > 1:
+            # Fork before the consumer is created, so that its threads and
+            # sockets are not inherited.
+            global _pool_worker
+            _pool_worker = worker
+            self.pool = multiprocessing.get_context("fork").Pool(processes)
+        else:
+            self.pool = None
+
         if isinstance(topics, (tuple, set)):
             topics = list(topics)
         elif not isinstance(topics, list):
@@ -289,22 +381,21 @@ class BatchingKafkaConsumer:
         if not self.__batch_deadline:
             self.__batch_deadline = self.max_batch_time / 1000.0 + start
 
+        if self.pool is not None:
+            self.__pool_chunk.append(PicklableMessage(msg))
+            self.__pool_pending_count += 1
+            if len(self.__pool_chunk) >= self.process_chunk_size:
+                self._submit_pool_chunk()
+            self.__batch_messages_processed_count += 1
+            self._record_batch_offset(msg)
+            return
+
         try:
             result = self.worker.process_message(msg)
         except Exception:
             if self.dead_letter_topic:
                 logger.exception("Error handling message, sending to dead letter topic.")
-                self.producer.produce(
-                    self.dead_letter_topic,
-                    key=msg.key(),
-                    value=msg.value(),
-                    headers={
-                        "partition": str(msg.partition()) if msg.partition() else None,
-                        "offset": str(msg.offset()) if msg.offset() else None,
-                        "topic": msg.topic(),
-                    },
-                    on_delivery=self._commit_message_delivery_callback,
-                )
+                self._produce_dead_letter(msg)
             else:
                 raise
         else:
@@ -315,12 +406,63 @@ class BatchingKafkaConsumer:
             self.__batch_messages_processed_count += 1
             self.__batch_processing_time_ms += duration
             self.__record_timing("process_message", duration)
+            self._record_batch_offset(msg)
 
-            topic_partition_key = (msg.topic(), msg.partition())
-            if topic_partition_key in self.__batch_offsets:
-                self.__batch_offsets[topic_partition_key][1] = msg.offset()
-            else:
-                self.__batch_offsets[topic_partition_key] = [msg.offset(), msg.offset()]
+    def _record_batch_offset(self, msg):
+        topic_partition_key = (msg.topic(), msg.partition())
+        if topic_partition_key in self.__batch_offsets:
+            self.__batch_offsets[topic_partition_key][1] = msg.offset()
+        else:
+            self.__batch_offsets[topic_partition_key] = [msg.offset(), msg.offset()]
+
+    def _produce_dead_letter(self, msg):
+        self.producer.produce(
+            self.dead_letter_topic,
+            key=msg.key(),
+            value=msg.value(),
+            headers={
+                "partition": str(msg.partition()) if msg.partition() else None,
+                "offset": str(msg.offset()) if msg.offset() else None,
+                "topic": msg.topic(),
+            },
+            on_delivery=self._commit_message_delivery_callback,
+        )
+
+    def _submit_pool_chunk(self):
+        if not self.__pool_chunk:
+            return
+        chunk, self.__pool_chunk = self.__pool_chunk, []
+        self.__pool_results.append(
+            (chunk, self.pool.apply_async(_process_messages_in_pool, (chunk,)))
+        )
+
+    def _collect_pool_results(self, wait=False):
+        """Adds the results of chunks processed by the pool to the batch, in
+        the order the messages were received. With ``wait``, waits until all
+        messages received so far have been processed."""
+        if wait:
+            self._submit_pool_chunk()
+
+        while self.__pool_results:
+            chunk, async_result = self.__pool_results[0]
+            if not wait and not async_result.ready():
+                break
+            self.__pool_results.popleft()
+            self.__pool_pending_count -= len(chunk)
+
+            for msg, (ok, result, duration) in zip(chunk, async_result.get()):
+                self.__batch_processing_time_ms += duration
+                self.__record_timing("process_message", duration)
+                if ok:
+                    if result is not None:
+                        self.__batch_results.append(result)
+                elif self.dead_letter_topic:
+                    logger.error(
+                        "Error handling message, sending to dead letter topic.\n%s", result
+                    )
+                    self._produce_dead_letter(msg)
+                else:
+                    raise Exception(f"Error handling message in process pool:\n{result}")
 
     def _shutdown(self):
         logger.debug("Stopping")
@@ -328,6 +470,11 @@ class BatchingKafkaConsumer:
         # drop in-memory events, letting the next consumer take over where we left off
         self._reset_batch()
 
+        if self.pool is not None:
+            logger.debug("Stopping process pool")
+            self.pool.terminate()
+            self.pool.join()
+
         # tell the consumer to shutdown, and close the consumer
         logger.debug("Stopping worker")
         self.worker.shutdown()
@@ -342,6 +489,9 @@ class BatchingKafkaConsumer:
         self.__batch_deadline = None
         self.__batch_messages_processed_count = 0
         self.__batch_processing_time_ms = 0.0
+        self.__pool_chunk = []
+        self.__pool_results = deque()
+        self.__pool_pending_count = 0
 
     def _flush(self, force=False):
         """Decides whether the `BatchingKafkaConsumer` should flush because of either
@@ -350,11 +500,20 @@ class BatchingKafkaConsumer:
         if not self.__batch_messages_processed_count > 0:
             return  # No messages were processed, so there's nothing to do.
 
-        batch_by_size = len(self.__batch_results) >= self.max_batch_size
+        if self.pool is not None:
+            self._collect_pool_results()
+
+        batch_size = len(self.__batch_results) + self.__pool_pending_count
+        batch_by_size = batch_size >= self.max_batch_size
         batch_by_time = self.__batch_deadline and time.time() > self.__batch_deadline
         if not (force or batch_by_size or batch_by_time):
             return
 
+        if self.pool is not None:
+            # Offsets are committed for every message received so far, so
+            # all of them need to be processed first.
+            self._collect_pool_results(wait=True)
+
         logger.info(
             "Flushing %s items (from %r): forced:%s size:%s time:%s",
             len(self.__batch_results),
@@ -1,6 +1,6 @@
 import zlib
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, cast
+from typing import Generic, Optional, TypeVar, cast
 
 import zstandard
 
@@ -87,8 +87,24 @@ class ZlibCodec(Codec[bytes, bytes]):
 
 
 class ZstdCodec(Codec[bytes, bytes]):
+    """
+    Compress/decompress bytes with zstd, optionally using a dictionary (see
+    ``zstandard.train_dictionary``.) Values compressed with a dictionary can
+    only be decompressed with the same dictionary.
+    """
+
+    def __init__(self, dictionary: Optional[bytes] = None, level: int = 3) -> None:
+        self.level = level
+        self.dictionary: Optional[zstandard.ZstdCompressionDict] = None
+        if dictionary is not None:
+            self.dictionary = zstandard.ZstdCompressionDict(dictionary)
+            self.dictionary.precompute_compress(level=level)
+
     def encode(self, value: bytes) -> bytes:
-        return cast(bytes, zstandard.ZstdCompressor().compress(value))
+        return cast(
+            bytes,
+            zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary).compress(value),
+        )
 
     def decode(self, value: bytes) -> bytes:
-        return cast(bytes, zstandard.ZstdDecompressor().decompress(value))
+        return cast(bytes, zstandard.ZstdDecompressor(dict_data=self.dictionary).decompress(value))
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, Iterator, Optional, Sequence, Tuple
 
 from sentry.cache.base import BaseCache
 from sentry.utils.kvstore.abstract import KVStorage
@@ -23,18 +23,42 @@ class CacheKVStorage(KVStorage[Any, Any]):
     # value encoding strategies that are not always compatible (generally
     # pickle and JSON.)
 
-    def __init__(self, backend: BaseCache) -> None:
+    # If ``raw`` is set, values are passed to the backend as they are, without
+    # being encoded by the backend first (only supported for ``bytes`` values.)
+
+    def __init__(self, backend: BaseCache, raw: bool = False) -> None:
         self.backend = backend
+        self.raw = raw
 
     def get(self, key: Any) -> Optional[Any]:
-        return self.backend.get(key)
+        return self.backend.get(key, raw=self.raw)
+
+    def get_many(self, keys: Sequence[Any]) -> Iterator[Tuple[Any, Any]]:
+        for key, value in zip(keys, self.backend.get_many(keys, raw=self.raw)):
+            if value is not None:
+                yield key, value
 
     def set(self, key: Any, value: Any, ttl: Optional[timedelta] = None) -> None:
-        self.backend.set(key, value, timeout=int(ttl.total_seconds()) if ttl is not None else None)
+        self.backend.set(
+            key,
+            value,
+            timeout=int(ttl.total_seconds()) if ttl is not None else None,
+            raw=self.raw,
+        )
+
+    def set_many(self, items: Sequence[Tuple[Any, Any]], ttl: Optional[timedelta] = None) -> None:
+        self.backend.set_many(
+            items,
+            timeout=int(ttl.total_seconds()) if ttl is not None else None,
+            raw=self.raw,
+        )
 
     def delete(self, key: Any) -> None:
         self.backend.delete(key)
 
+    def delete_many(self, keys: Sequence[Any]) -> None:
+        self.backend.delete_many(keys)
+
     def bootstrap(self) -> None:
         # Nothing to do in this method: the backend is expected to either not
         # require any explicit setup action (memcached, Redis) or that setup is
@@ -23,24 +23,26 @@ def for_organization_member_invite(organization, email, user=None, auth=None, co
     if not features.has("organizations:invite-members-rate-limits", organization, actor=user):
         return False
 
-    limits = (
-        ratelimiter.is_limited(
-            "members:invite-by-user:{}".format(
-                md5_text(user.id if user and user.is_authenticated() else str(auth)).hexdigest()
-            ),
-            **config["members:invite-by-user"],
-        )
-        if (user or auth)
-        else None,
-        ratelimiter.is_limited(
-            f"members:invite-by-org:{md5_text(organization.id).hexdigest()}",
+    requests = [
+        {
+            "key": f"members:invite-by-org:{md5_text(organization.id).hexdigest()}",
             **config["members:invite-by-org"],
-        ),
-        ratelimiter.is_limited(
-            "members:org-invite-to-email:{}-{}".format(
+        },
+        {
+            "key": "members:org-invite-to-email:{}-{}".format(
                 organization.id, md5_text(email.lower()).hexdigest()
             ),
             **config["members:org-invite-to-email"],
-        ),
-    )
-    return any(limits)
+        },
+    ]
+    if user or auth:
+        requests.append(
+            {
+                "key": "members:invite-by-user:{}".format(
+                    md5_text(user.id if user and user.is_authenticated() else str(auth)).hexdigest()
+                ),
+                **config["members:invite-by-user"],
+            }
+        )
+
+    return any(ratelimiter.is_limited_many(requests))
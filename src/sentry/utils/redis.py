@@ -63,7 +63,9 @@ class _RBCluster:
     def supports(self, config):
         return not config.get("is_redis_cluster", False)
 
-    def factory(self, **config):
+    def factory(self, decode_responses=False, **config):
+        # rb clients always return bytes, ``decode_responses`` is ignored.
+        #
         # rb expects a dict of { host, port } dicts where the key is the host
         # ID. Coerce the configuration into the correct format if necessary.
         hosts = config["hosts"]
@@ -106,7 +108,7 @@ class _RedisCluster:
         #    in non-cluster mode.
         return config.get("is_redis_cluster", False) or len(config.get("hosts")) == 1
 
-    def factory(self, **config):
+    def factory(self, decode_responses=True, **config):
         # StrictRedisCluster expects a list of { host, port } dicts. Coerce the
         # configuration into the correct format if necessary.
         hosts = config.get("hosts")
@@ -125,14 +127,14 @@ class _RedisCluster:
                     #
                     # https://github.com/Grokzen/redis-py-cluster/blob/73f27edf7ceb4a408b3008ef7d82dac570ab9c6a/rediscluster/nodemanager.py#L385
                     startup_nodes=deepcopy(hosts),
-                    decode_responses=True,
+                    decode_responses=decode_responses,
                     skip_full_coverage_check=True,
                     max_connections=16,
                     max_connections_per_node=True,
                 )
             else:
                 host = hosts[0].copy()
-                host["decode_responses"] = True
+                host["decode_responses"] = decode_responses
                 return StrictRedis(**host)
 
         return SimpleLazyObject(cluster_factory)
@@ -147,8 +149,14 @@ class ClusterManager:
         self.__options_manager = options_manager
         self.__cluster_type = cluster_type()
 
-    def get(self, key):
-        cluster = self.__clusters.get(key)
+    def get(self, key, decode_responses=True):
+        """
+        Returns the cluster with the given name. Clients of redis-cluster
+        clusters decode responses to strings, unless ``decode_responses`` is
+        disabled to read binary values.
+        """
+        cache_key = key if decode_responses else (key, "bytes")
+        cluster = self.__clusters.get(cache_key)
 
         # Do not access attributes of the `cluster` object to prevent
         # setup/init of lazy objects. The _RedisCluster type will try to
@@ -163,7 +171,9 @@ class ClusterManager:
             if not self.__cluster_type.supports(configuration):
                 raise KeyError(f"Invalid cluster type, expected: {self.__cluster_type}")
 
-            cluster = self.__clusters[key] = self.__cluster_type.factory(**configuration)
+            cluster = self.__clusters[cache_key] = self.__cluster_type.factory(
+                decode_responses=decode_responses, **configuration
+            )
 
         return cluster
 
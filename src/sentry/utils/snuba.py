@@ -1,3 +1,4 @@
+import codecs
 import functools
 import logging
 import os
@@ -39,6 +40,7 @@ from sentry.snuba.events import Columns
 from sentry.utils import json, metrics
 from sentry.utils.compat import map
 from sentry.utils.dates import outside_retention_with_modified_start, to_timestamp
+from sentry.utils.locking import UnableToAcquireLock
 from sentry.utils.snql import should_use_snql
 
 logger = logging.getLogger(__name__)
@@ -630,11 +632,16 @@ def raw_query(
     is_grouprelease=False,
     use_cache=False,
     use_snql=None,
+    stream=False,
     **kwargs,
 ) -> Mapping[str, Any]:
     """
     Sends a query to snuba.  See `SnubaQueryParams` docstring for param
     descriptions.
+
+    With ``stream``, the response is decoded incrementally and ``data`` is
+    an iterator of rows, see ``_stream_response``. Streamed results are not
+    cached.
     """
     snuba_params = SnubaQueryParams(
         dataset=dataset,
@@ -653,7 +660,7 @@ def raw_query(
         use_snql = should_use_snql(referrer)
 
     return bulk_raw_query(
-        [snuba_params], referrer=referrer, use_cache=use_cache, use_snql=use_snql
+        [snuba_params], referrer=referrer, use_cache=use_cache, use_snql=use_snql, stream=stream
     )[0]
 
 
@@ -680,10 +687,34 @@ def get_cache_key(query: SnubaQuery) -> str:
     if isinstance(query, Query):
         hashable = str(query)
     else:
-        hashable = json.dumps(query, sort_keys=True)
+        hashable = json.dumps(_quantize_cache_window(query), sort_keys=True)
+
+    # sqc - Snuba Query Cache. Bump the version whenever the format of cached
+    # results changes (see ``_query_with_cache``), so that results written by
+    # the previous format are not read.
+    return f"sqc2:{sha1(hashable.encode('utf-8')).hexdigest()}"
+
+
+def _quantize_cache_window(query: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+    """
+    Quantizes the time window of queries relative to now (whose end is within
+    ``SENTRY_SNUBA_CACHE_TIME_QUANTUM_SECONDS`` of now) for the cache key, so
+    that repeated requests for e.g. the last 24 hours share a cache entry.
+    See ``quantize_time``.
+    """
+    quantum = settings.SENTRY_SNUBA_CACHE_TIME_QUANTUM_SECONDS
+    if not quantum or "from_date" not in query or "to_date" not in query:
+        return query
+
+    end = parse_datetime(query["to_date"])
+    if abs(naiveify_datetime(end) - datetime.utcnow()) > timedelta(seconds=quantum):
+        return query
 
-    # sqc - Snuba Query Cache
-    return f"sqc:{sha1(hashable.encode('utf-8')).hexdigest()}"
+    window = {k: v for k, v in query.items() if k not in ("from_date", "to_date")}
+    key_hash = int(sha1(json.dumps(window).encode("utf-8")).hexdigest()[:8], 16)
+    quantized_end = quantize_time(end, key_hash, duration=quantum)
+    quantized_start = parse_datetime(query["from_date"]) - (end - quantized_end)
+    return dict(query, from_date=quantized_start.isoformat(), to_date=quantized_end.isoformat())
 
 
 def bulk_raw_query(
@@ -691,10 +722,11 @@ def bulk_raw_query(
     referrer: Optional[str] = None,
     use_cache: Optional[bool] = False,
     use_snql: Optional[bool] = None,
+    stream: bool = False,
 ) -> ResultSet:
     params = map(_prepare_query_params, snuba_param_list)
     return _apply_cache_and_build_results(
-        params, referrer=referrer, use_cache=use_cache, use_snql=use_snql
+        params, referrer=referrer, use_cache=use_cache, use_snql=use_snql, stream=stream
     )
 
 
@@ -703,6 +735,7 @@ def _apply_cache_and_build_results(
     referrer: Optional[str] = None,
     use_cache: Optional[bool] = False,
     use_snql: Optional[bool] = None,
+    stream: bool = False,
 ) -> ResultSet:
     headers = {}
     if referrer:
@@ -711,41 +744,147 @@ def _apply_cache_and_build_results(
     # Store the original position of the query so that we can maintain the order
     query_param_list = list(enumerate(snuba_param_list))
 
-    results = []
-
-    if use_cache:
-        cache_keys = [get_cache_key(query_params) for _, query_params in query_param_list]
-        cache_data = cache.get_many(cache_keys)
-        to_query: List[Tuple[int, SnubaQueryBody, Optional[str]]] = []
-        for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
-            cached_result = cache_data.get(cache_key)
-            metric_tags = {"referrer": referrer} if referrer else None
-            if cached_result is None:
-                metrics.incr("snuba.query_cache.miss", tags=metric_tags)
-                to_query.append((query_pos, query_params, cache_key))
-            else:
-                metrics.incr("snuba.query_cache.hit", tags=metric_tags)
-                results.append((query_pos, json.loads(cached_result)))
+    if use_cache and not stream:
+        results = _query_with_cache(query_param_list, headers, referrer, use_snql)
     else:
-        to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
-
-    if to_query:
-        query_results = _bulk_snuba_query(map(itemgetter(1), to_query), headers, use_snql)
-        for result, (query_pos, _, cache_key) in zip(query_results, to_query):
-            if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
-            results.append((query_pos, result))
+        query_results = _bulk_snuba_query(
+            map(itemgetter(1), query_param_list), headers, use_snql, stream=stream
+        )
+        results = list(zip(map(itemgetter(0), query_param_list), query_results))
 
     # Sort so that we get the results back in the original param list order
-    results.sort()
+    results.sort(key=itemgetter(0))
     # Drop the sort order val
     return map(itemgetter(1), results)
 
 
+def _query_with_cache(
+    query_param_list: Sequence[Tuple[int, SnubaQueryBody]],
+    headers: Mapping[str, str],
+    referrer: Optional[str],
+    use_snql: Optional[bool],
+) -> List[Tuple[int, Mapping[str, Any]]]:
+    """
+    Serves queries from the query cache, and queries Snuba for the others.
+
+    Results are fresh for ``SENTRY_SNUBA_CACHE_TTL_SECONDS``, and afterwards
+    served stale for ``SENTRY_SNUBA_CACHE_STALE_SECONDS`` while one worker
+    revalidates them. With ``SENTRY_SNUBA_CACHE_LOCK_WAIT_SECONDS``, only one
+    worker queries Snuba on a cache miss, and others wait for its result
+    for up to that many seconds (after which they query Snuba themselves.)
+    """
+    stale_seconds = settings.SENTRY_SNUBA_CACHE_STALE_SECONDS
+    lock_wait_seconds = settings.SENTRY_SNUBA_CACHE_LOCK_WAIT_SECONDS
+    use_locks = bool(stale_seconds or lock_wait_seconds)
+    metric_tags = {"referrer": referrer} if referrer else None
+
+    cache_keys = {
+        query_pos: get_cache_key(query_params[0]) for query_pos, query_params in query_param_list
+    }
+    cache_data = cache.get_many(list(cache_keys.values()))
+    now = time.time()
+
+    results = []
+    to_query = []
+    to_wait = []
+    locks = []
+    try:
+        for query_pos, query_params in query_param_list:
+            cache_key = cache_keys[query_pos]
+            cached_result = cache_data.get(cache_key)
+            if cached_result is not None:
+                cached_result = json.loads(cached_result)
+                if cached_result["fresh_until"] > now:
+                    metrics.incr("snuba.query_cache.hit", tags=metric_tags)
+                    results.append((query_pos, cached_result["result"]))
+                    continue
+
+            lock = _acquire_cache_lock(cache_key) if use_locks else None
+            if lock is not None:
+                locks.append(lock)
+
+            if cached_result is not None:
+                if lock is None and use_locks:
+                    # Somebody else is already revalidating the result.
+                    metrics.incr("snuba.query_cache.stale", tags=metric_tags)
+                    results.append((query_pos, cached_result["result"]))
+                    continue
+                metrics.incr("snuba.query_cache.revalidate", tags=metric_tags)
+            elif lock is None and lock_wait_seconds:
+                to_wait.append((query_pos, query_params, cache_key))
+                continue
+            else:
+                metrics.incr("snuba.query_cache.miss", tags=metric_tags)
+
+            to_query.append((query_pos, query_params, cache_key))
+
+        if to_wait:
+            waited = _wait_for_cached_results(to_wait, lock_wait_seconds)
+            for query_pos, query_params, cache_key in to_wait:
+                if query_pos in waited:
+                    metrics.incr("snuba.query_cache.coalesced", tags=metric_tags)
+                    results.append((query_pos, waited[query_pos]))
+                else:
+                    metrics.incr("snuba.query_cache.miss", tags=metric_tags)
+                    to_query.append((query_pos, query_params, cache_key))
+
+        if to_query:
+            query_results = _bulk_snuba_query(map(itemgetter(1), to_query), headers, use_snql)
+            fresh_until = time.time() + settings.SENTRY_SNUBA_CACHE_TTL_SECONDS
+            for result, (query_pos, _, cache_key) in zip(query_results, to_query):
+                cache.set(
+                    cache_key,
+                    json.dumps({"fresh_until": fresh_until, "result": result}),
+                    settings.SENTRY_SNUBA_CACHE_TTL_SECONDS + stale_seconds,
+                )
+                results.append((query_pos, result))
+    finally:
+        for lock in locks:
+            lock.release()
+
+    return results
+
+
+def _acquire_cache_lock(cache_key: str):
+    """
+    Attempts to acquire the lock for refreshing a cache entry without
+    blocking. Returns the lock, or ``None`` if it is held by somebody else.
+    """
+    from sentry.app import locks
+
+    lock = locks.get(f"{cache_key}:lock", duration=settings.SENTRY_SNUBA_TIMEOUT)
+    try:
+        lock.acquire()
+    except UnableToAcquireLock:
+        return None
+    return lock
+
+
+def _wait_for_cached_results(
+    to_wait: Sequence[Tuple[int, SnubaQueryBody, str]], timeout: float
+) -> Mapping[int, Mapping[str, Any]]:
+    """
+    Polls the cache for results written by the workers holding the locks of
+    the given queries, until all of them are found or ``timeout`` passes.
+    """
+    results = {}
+    deadline = time.time() + timeout
+    delay = 0.05
+    pending = {cache_key: query_pos for query_pos, _, cache_key in to_wait}
+    while pending and time.time() < deadline:
+        time.sleep(min(delay, max(deadline - time.time(), 0)))
+        delay = min(delay * 2, 0.5)
+        for cache_key, cached_result in cache.get_many(list(pending)).items():
+            if cached_result is not None:
+                results[pending.pop(cache_key)] = json.loads(cached_result)["result"]
+    return results
+
+
 def _bulk_snuba_query(
     snuba_param_list: Sequence[SnubaQueryBody],
     headers: Mapping[str, str],
     use_snql: Optional[bool] = None,
+    stream: bool = False,
 ) -> ResultSet:
     with sentry_sdk.start_span(
         op="start_snuba_query",
@@ -766,6 +905,12 @@ def _bulk_snuba_query(
         elif use_snql:
             query_fn = _snql_dryrun_query
 
+        # Only responses of legacy JSON queries are streamed, the results of
+        # all other queries are decoded at once.
+        stream = stream and query_fn is _snuba_query
+        if stream:
+            query_fn = _stream_snuba_query
+
         if len(snuba_param_list) > 1:
             query_results = list(
                 _query_thread_pool.map(
@@ -779,6 +924,10 @@ def _bulk_snuba_query(
 
     results = []
     for response, _, reverse in query_results:
+        if stream and response.status == 200:
+            results.append(_stream_response(response, reverse))
+            continue
+
         try:
             body = json.loads(response.data)
             if SNUBA_INFO:
@@ -821,8 +970,169 @@ def _bulk_snuba_query(
 
 RawResult = Tuple[urllib3.response.HTTPResponse, Callable[[Any], Any], Callable[[Any], Any]]
 
+# Size of the chunks streamed responses are read in.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _JSONStreamReader:
+    """
+    Decodes a JSON document incrementally from an iterator of byte chunks.
+    Only the structure of the outermost object and arrays are parsed by the
+    reader itself, all other values are decoded as a whole.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=1):
+        """
+        Reads chunks until at least ``size`` unconsumed characters are
+        buffered. Returns ``False`` if the end of the document was reached.
+        """
+        self.buffer = self.buffer[self.pos :]
+        self.pos = 0
+        while len(self.buffer) < size and not self.eof:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                self.buffer += self.decoder.decode(b"", final=True)
+            else:
+                self.buffer += self.decoder.decode(chunk)
+        return len(self.buffer) >= size
+
+    def next_char(self):
+        """
+        Consumes and returns the next non-whitespace character.
+        """
+        while True:
+            if self.pos >= len(self.buffer) and not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+            char = self.buffer[self.pos]
+            self.pos += 1
+            if not char.isspace():
+                return char
+
+    def expect(self, expected):
+        char = self.next_char()
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} in JSON document, got {char!r}")
+
+    def read_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = json._default_decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                # Values are re-parsed from their start once more data is
+                # buffered, so grow the buffer exponentially.
+                self._fill(2 * (len(self.buffer) - self.pos) + 1)
+                continue
+
+            # A number at the end of the buffer may be cut off.
+            if end < len(self.buffer) or self.eof:
+                self.pos = end
+                return value
+            self._fill(len(self.buffer) - self.pos + 1)
+
+    def iter_object(self):
+        """
+        Yields the keys of an object. The value of every key has to be
+        consumed before the iteration is continued.
+        """
+        self.expect("{")
+        if self._peek() == "}":
+            self.next_char()
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            char = self.next_char()
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON document, got {char!r}")
+
+    def iter_array(self):
+        self.expect("[")
+        if self._peek() == "]":
+            self.next_char()
+            return
+        while True:
+            yield self.read_value()
+            char = self.next_char()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON document, got {char!r}")
+
+    def _peek(self):
+        char = self.next_char()
+        self.pos -= 1
+        return char
+
+
+def _stream_response(
+    response: urllib3.response.HTTPResponse, reverse: Translator
+) -> MutableMapping[str, Any]:
+    """
+    Decodes the body of a successful response incrementally. The returned
+    result contains all keys preceding ``data`` in the response, ``data`` is
+    a lazy iterator over the translated rows. The keys following ``data``
+    (e.g. ``totals`` or ``timing``) are added to the result once all rows have
+    been consumed.
+
+    The connection is returned to the pool once all rows have been consumed,
+    and closed if the iterator is discarded before.
+    """
+    reader = _JSONStreamReader(response.stream(STREAM_CHUNK_SIZE))
+    keys = reader.iter_object()
+    result: MutableMapping[str, Any] = {}
+
+    def iter_rows():
+        completed = False
+        try:
+            for row in reader.iter_array():
+                yield reverse(row)
+            for key in keys:
+                result[key] = reader.read_value()
+            completed = True
+        except ValueError as e:
+            raise UnexpectedResponseError(f"Could not decode JSON response: {e}")
+        finally:
+            if not completed:
+                response.close()
+            response.release_conn()
+
+    try:
+        for key in keys:
+            if key == "data":
+                result["data"] = iter_rows()
+                return result
+            result[key] = reader.read_value()
+    except ValueError as e:
+        response.close()
+        response.release_conn()
+        raise UnexpectedResponseError(f"Could not decode JSON response: {e}")
+
+    response.release_conn()
+    result["data"] = iter(())
+    return result
+
+
+def _stream_snuba_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> RawResult:
+    return _snuba_query(params, preload_content=False)
+
 
-def _snuba_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> RawResult:
+def _snuba_query(
+    params: Tuple[SnubaQuery, Hub, Mapping[str, str]], preload_content: bool = True
+) -> RawResult:
     query_data, thread_hub, headers = params
     query_params, forward, reverse = query_data
     try:
@@ -838,7 +1148,13 @@ def _snuba_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> RawResult
                 for param_key, param_data in query_params.items():
                     span.set_data(param_key, param_data)
                 return (
-                    _snuba_pool.urlopen("POST", "/query", body=body, headers=headers),
+                    _snuba_pool.urlopen(
+                        "POST",
+                        "/query",
+                        body=body,
+                        headers=headers,
+                        preload_content=preload_content,
+                    ),
                     forward,
                     reverse,
                 )
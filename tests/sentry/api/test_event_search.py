@@ -27,10 +27,12 @@ from sentry.api.event_search import (
     parse_function,
     parse_search_query,
     resolve_field_list,
+    search_query_cache,
     with_default,
 )
 from sentry.testutils.cases import TestCase
 from sentry.testutils.helpers.datetime import before_now
+from sentry.utils.compat import mock
 
 
 def test_get_json_meta_type():
@@ -1456,6 +1458,46 @@ class ParseSearchQueryTest(unittest.TestCase):
         # Empty quotations become a dropped term
         assert parse_search_query("") == []
 
+    def test_cache(self):
+        search_query_cache.clear()
+        query = "user.email:foo@example.com release:1.2.1 hello"
+        with mock.patch(
+            "sentry.api.event_search.event_search_grammar", wraps=event_search_grammar
+        ) as grammar:
+            result = parse_search_query(query)
+            cached = parse_search_query(query)
+            assert grammar.parse.call_count == 1
+
+            # The visitor configuration is part of the key.
+            parse_search_query(query, allow_boolean=False)
+            assert grammar.parse.call_count == 2
+
+        assert cached == result
+        # Callers get their own list of terms.
+        cached.pop()
+        assert parse_search_query(query) == result
+
+    def test_cache_uncacheable(self):
+        search_query_cache.clear()
+        with mock.patch(
+            "sentry.api.event_search.event_search_grammar", wraps=event_search_grammar
+        ) as grammar:
+            # Relative dates depend on the current time.
+            parse_search_query("first_seen:-2w")
+            parse_search_query("first_seen:-2w")
+            assert grammar.parse.call_count == 2
+
+            # Aggregates may be resolved against the params.
+            parse_search_query("p95():>1s", params={"project_id": [1]})
+            parse_search_query("p95():>1s", params={"project_id": [1]})
+            assert grammar.parse.call_count == 4
+
+            # Errors are not cached.
+            for _ in range(2):
+                with pytest.raises(InvalidSearchQuery):
+                    parse_search_query("(user.email:foo@example.com OR user.email:bar@example.com")
+            assert grammar.parse.call_count == 6
+
 
 # Helper functions to make reading the expected output from the boolean tests easier to read. #
 # a:b
@@ -1,3 +1,4 @@
+import math
 from datetime import timedelta
 
 from django.utils import timezone
@@ -6,6 +7,7 @@ from sentry.buffer.base import Buffer
 from sentry.models import Group, Organization, Project, Release, ReleaseProject, Team
 from sentry.testutils import TestCase
 from sentry.utils.compat import mock
+from sentry.utils.dates import to_timestamp
 
 
 class BufferTest(TestCase):
@@ -73,3 +75,39 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch_updates_existing_rows(self):
+        project = self.create_project()
+        group1 = self.create_group(project=project)
+        group2 = self.create_group(project=project)
+        the_date = timezone.now() + timedelta(days=5)
+        items = [
+            (Group, {"times_seen": 1}, {"id": group1.id}, {"last_seen": the_date}, None),
+            (Group, {"times_seen": 3}, {"id": group2.id}, {"last_seen": the_date}, None),
+        ]
+        with mock.patch("sentry.buffer.base.buffer_incr_complete") as signal:
+            self.buf.process_batch(items)
+        assert len(signal.send_robust.mock_calls) == 2
+
+        group1_ = Group.objects.get(id=group1.id)
+        group2_ = Group.objects.get(id=group2.id)
+        assert group1_.times_seen == group1.times_seen + 1
+        assert group2_.times_seen == group2.times_seen + 3
+        assert group1_.last_seen == group2_.last_seen == the_date
+        # Same as ``ScoreClause``: base 10 logarithm in SQL, rounded when
+        # stored in the integer column.
+        assert group1_.score == round(
+            math.log10(group1_.times_seen) * 600 + math.floor(to_timestamp(the_date))
+        )
+
+    def test_process_batch_creates_missing_rows(self):
+        group = Group.objects.create(project=Project(id=1), message="foo")
+        columns = {"times_seen": 1}
+        self.buf.process_batch(
+            [
+                (Group, columns, {"message": "foo", "project_id": 1}, None, None),
+                (Group, columns, {"message": "foo bar", "project_id": 1}, None, None),
+            ]
+        )
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 1
+        assert Group.objects.get(message="foo bar").times_seen == 2
@@ -1,9 +1,11 @@
 import pickle
 from datetime import datetime
 
+import pytest
 from django.utils import timezone
 from django.utils.encoding import force_text
 
+from sentry.buffer.codecs import MSGPACK_HEADER, MsgpackValueCodec, decode_value
 from sentry.buffer.redis import RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
@@ -121,6 +123,170 @@ class RedisBufferTest(TestCase):
         pending = client.zrange("b:p", 0, -1)
         assert pending == [b"foo"]
 
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_does_bubble_up_msgpack(self, process):
+        now = datetime(2017, 5, 3, 6, 6, 6, 123, tzinfo=timezone.utc)
+        codec = MsgpackValueCodec()
+        client = self.buf.cluster.get_routing_client()
+        client.hmset(
+            "foo",
+            {
+                "e+foo": codec.encode("bar"),
+                "e+datetime": codec.encode(now),
+                "f": codec.encode({"pk": 1}),
+                "i+times_seen": "2",
+                "m": "sentry.models.Group",
+            },
+        )
+        self.buf.process("foo")
+        process.assert_called_once_with(
+            Group, {"times_seen": 2}, {"pk": 1}, {"foo": "bar", "datetime": now}, None
+        )
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.redis.process_incr", mock.Mock())
+    def test_incr_saves_to_redis_with_msgpack(self):
+        self.buf = RedisBuffer(value_codec="msgpack")
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        columns = {"times_seen": 1}
+        filters = {"pk": 1, "datetime": now}
+        score = ("not", "msgpack")
+        self.buf.incr(model, columns, filters, extra={"foo": "bar", "score": score})
+        result = client.hgetall("foo")
+        result = {force_text(k): v for k, v in result.items()}
+
+        assert result["f"].startswith(MSGPACK_HEADER)
+        assert decode_value(result.pop("f")) == filters
+        assert decode_value(result.pop("e+foo")) == "bar"
+        # unsupported types fall back to pickle
+        assert pickle.loads(result.pop("e+score")) == score
+        assert result == {"i+times_seen": b"1", "m": b"mock.mock.Mock"}
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.redis.process_incr", mock.Mock())
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_incr_and_process_roundtrip_with_json(self, process):
+        self.buf = RedisBuffer(value_codec="json")
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1}, extra={"foo": "bar"})
+        client = self.buf.cluster.get_routing_client()
+        assert client.hget("foo", "f") == b'{"pk":["i","1"]}'
+        client.hset("foo", "m", "sentry.models.Group")
+        self.buf.process("foo")
+        process.assert_called_once_with(Group, {"times_seen": 1}, {"pk": 1}, {"foo": "bar"}, None)
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.redis.threading.Timer")
+    def test_incr_coalesces_until_flush(self, timer):
+        self.buf = RedisBuffer(incr_coalesce_window=1)
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        self.buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "bar"})
+        self.buf.incr(model, {"times_seen": 2}, filters, extra={"foo": "baz"}, signal_only=True)
+
+        # the window is started once, and nothing has been written yet
+        timer.assert_called_once_with(1, self.buf.flush_incrs)
+        assert client.hgetall("foo") == {}
+        assert client.zrange("b:p", 0, -1) == []
+
+        self.buf.flush_incrs()
+        result = {force_text(k): v for k, v in client.hgetall("foo").items()}
+        assert pickle.loads(result.pop("f")) == filters
+        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert result == {"i+times_seen": b"3", "m": b"mock.mock.Mock", "s": b"1"}
+        assert client.zrange("b:p", 0, -1) == [b"foo"]
+        assert len(self.buf.pending_incrs) == 0
+
+    @mock.patch("sentry.buffer.redis.threading.Timer", mock.Mock())
+    def test_incr_coalesce_flushes_when_full(self):
+        self.buf = RedisBuffer(incr_coalesce_window=60, incr_coalesce_size=2)
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        assert client.zrange("b:p", 0, -1) == []
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 2})
+        assert sorted(client.zrange("b:p", 0, -1)) == sorted(
+            [
+                self.buf._make_key(model, {"pk": 1}).encode("utf-8"),
+                self.buf._make_key(model, {"pk": 2}).encode("utf-8"),
+            ]
+        )
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.redis.threading.Timer")
+    def test_incr_coalesce_requeues_on_flush_failure(self, timer):
+        self.buf = RedisBuffer(incr_coalesce_window=1)
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1}, extra={"foo": "bar"})
+
+        with mock.patch("redis.client.Pipeline.execute", side_effect=ConnectionError):
+            self.buf.flush_incrs()
+
+        # nothing is lost, and the flush is retried
+        assert timer.call_count == 2
+        assert client.hgetall("foo") == {}
+        self.buf.incr(model, {"times_seen": 2}, {"pk": 1}, extra={"foo": "baz"})
+
+        self.buf.flush_incrs()
+        result = {force_text(k): v for k, v in client.hgetall("foo").items()}
+        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert result["i+times_seen"] == b"3"
+
+    @mock.patch("atexit.register")
+    def test_flush_on_shutdown_connected_once(self, register):
+        with mock.patch("sentry.buffer.redis._flush_on_shutdown_connected", False):
+            RedisBuffer(incr_coalesce_window=1)
+            RedisBuffer(incr_coalesce_window=1)
+
+        assert register.call_count == 1
+
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_batched(self, process_batch):
+        self.buf = RedisBuffer(process_batched=True)
+        client = self.buf.cluster.get_routing_client()
+        for key, pk in (("foo", "1"), ("bar", "2")):
+            client.hmset(
+                key,
+                {
+                    "f": '{"pk": ["i","%s"]}' % pk,
+                    "i+times_seen": "2",
+                    "m": "sentry.models.Group",
+                },
+            )
+            client.zadd("b:p", {key: 1})
+        # "baz" is locked by another worker
+        client.set("l:baz", "1")
+
+        # the locks are held while the whole batch is applied
+        lock_ttls = []
+        process_batch.side_effect = lambda items: lock_ttls.append(client.ttl("l:foo"))
+
+        self.buf.process(batch_keys=["foo", "bar", "baz"])
+        assert 10 < lock_ttls[0] <= 13
+        process_batch.assert_called_once_with(
+            [
+                (Group, {"times_seen": 2}, {"pk": 1}, {}, None),
+                (Group, {"times_seen": 2}, {"pk": 2}, {}, None),
+            ]
+        )
+        assert client.zrange("b:p", 0, -1) == []
+        assert client.exists("foo", "bar", "l:foo", "l:bar") == 0
+        assert client.get("l:baz") == b"1"
+
+    def test_invalid_value_codec(self):
+        with pytest.raises(ValueError):
+            RedisBuffer(value_codec="yaml")
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr")
     @mock.patch("sentry.buffer.redis.process_pending")
@@ -1,6 +1,15 @@
 import copy
 
-from sentry.eventstore.compressor import assemble, deduplicate
+from django.core.cache import cache
+
+from sentry.eventstore.compressor import (
+    assemble,
+    assemble_many,
+    deduplicate,
+    get_blob_id,
+    save_blobs,
+)
+from sentry.utils.compat import mock
 
 
 def _assert_roundtrip(data, assert_extra_keys=None):
@@ -28,7 +37,7 @@ def test_basic():
     _assert_roundtrip({"debug_meta": {"images": None}})
     _assert_roundtrip({"debug_meta": {"images": [{}]}})
 
-    checksum = "1a3e017bec533f3f4e59e44a3f53784e"
+    checksum = "42466b35cc9155adf6620fd3d22e3062b241f691"
     _assert_roundtrip(
         {
             "debug_meta": {
@@ -52,3 +61,101 @@ def test_basic():
             }
         },
     )
+
+
+def test_interfaces():
+    data = {
+        "message": "hello",
+        "modules": {"django": "1.11", "celery": "4.4"},
+        "sdk": {"name": "sentry.python", "version": "0.19.5"},
+        "contexts": {
+            "os": {"name": "Linux", "version": "5.4"},
+            "device": {"model": "Pixel 4", "arch": "arm64", "battery_level": 50},
+            "runtime": {"name": "CPython", "version": "3.8"},
+        },
+        "breadcrumbs": {
+            "values": [
+                {"timestamp": 1.0, "category": "ui.click", "message": "button"},
+                {"timestamp": 2.0, "type": "http", "data": {"url": "/foo"}},
+                {"timestamp": 3.0, "category": "ui.click", "message": "button"},
+            ]
+        },
+    }
+    original = copy.deepcopy(data)
+
+    new_data, extra_keys = deduplicate(data)
+    assert data == original
+    assert new_data["message"] == "hello"
+    assert {key for key, _, _ in new_data["__nodestore_patchsets"]} == {
+        "modules",
+        "sdk",
+        "contexts",
+        "breadcrumbs",
+    }
+    assert not {"modules", "sdk", "contexts", "breadcrumbs"} & set(new_data)
+    assert len(extra_keys) == 4
+
+    _assert_roundtrip(data)
+
+
+def test_shared_blobs():
+    first = {
+        "event_id": "a" * 32,
+        "modules": {"django": "1.11"},
+        "contexts": {"device": {"model": "Pixel 4", "battery_level": 50}},
+    }
+    second = {
+        "event_id": "b" * 32,
+        "modules": {"django": "1.11"},
+        "contexts": {"device": {"model": "Pixel 4", "battery_level": 20}},
+    }
+
+    first_data, first_keys = deduplicate(first)
+    second_data, second_keys = deduplicate(second)
+    assert first_keys == second_keys
+    assert first_data != second_data
+    # Node ids are limited to 40 characters by the Django backend.
+    assert all(len(get_blob_id(checksum)) <= 40 for checksum in first_keys)
+
+    blobs = {get_blob_id(checksum): value for checksum, value in first_keys.items()}
+    with mock.patch(
+        "sentry.eventstore.compressor.nodestore.get_multi",
+        side_effect=lambda ids: {id: copy.deepcopy(blobs[id]) for id in ids},
+    ) as get_multi:
+        nodes = assemble_many({"1": first_data, "2": second_data, "3": None})
+
+    assert get_multi.call_count == 1
+    assert nodes == {"1": first, "2": second, "3": None}
+
+
+def test_missing_blob():
+    data = {"message": "hello", "modules": {"django": "1.11"}, "debug_meta": {"images": [{}]}}
+    new_data, extra_keys = deduplicate(data)
+
+    assert assemble(new_data, lambda checksums: {}) == {
+        "message": "hello",
+        "debug_meta": {"images": [{}]},
+    }
+
+
+def test_save_blobs():
+    cache.clear()
+    _, first_keys = deduplicate({"modules": {"django": "1.11"}, "sdk": {"name": "python"}})
+    _, second_keys = deduplicate({"modules": {"django": "1.11"}, "sdk": {"name": "java"}})
+
+    with mock.patch("sentry.eventstore.compressor.nodestore.set_many") as set_many:
+        save_blobs(first_keys)
+        save_blobs(second_keys)
+
+    # Both blobs of the first event are written in one batch, the modules
+    # blob shared with the second event is not written again.
+    assert set_many.call_args_list == [
+        mock.call({get_blob_id(checksum): value for checksum, value in first_keys.items()}),
+        mock.call(
+            {
+                get_blob_id(checksum): value
+                for checksum, value in second_keys.items()
+                if checksum not in first_keys
+            }
+        ),
+    ]
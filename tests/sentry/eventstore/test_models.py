@@ -2,6 +2,7 @@ import pickle
 
 import pytest
 
+from sentry import eventstore, nodestore
 from sentry.db.models.fields.node import NodeData
 from sentry.eventstore.models import Event
 from sentry.models import Environment
@@ -180,6 +181,29 @@ class EventTest(TestCase):
         assert event.group is None
         assert event.culprit == "app/components/events/eventEntries in map"
 
+    def test_deduplicated_nodestore(self):
+        with self.options({"store.nodestore-deduplication-sample-rate": 1.0}):
+            event = self.store_event(
+                data={
+                    "message": "Hello World!",
+                    "modules": {"django": "1.11"},
+                    "contexts": {"os": {"name": "Linux"}},
+                },
+                project_id=self.project.id,
+            )
+
+        node_data = nodestore.get(event.data.id)
+        assert "modules" not in node_data
+        assert node_data["__nodestore_patchsets"]
+
+        loaded = Event(self.project.id, event.event_id)
+        assert loaded.data["modules"] == {"django": "1.11"}
+        assert loaded.data["contexts"]["os"]["name"] == "Linux"
+
+        bound = Event(self.project.id, event.event_id)
+        eventstore.bind_nodes([bound], "data")
+        assert bound.data == loaded.data
+
     def test_snuba_data(self):
         self.store_event(
             data={
@@ -0,0 +1,76 @@
+import pytest
+
+from sentry.eventstore.processing.base import (
+    CompressedEventCodec,
+    EventProcessingStore,
+    get_event_codec,
+)
+from sentry.eventstore.processing.redis import RedisClusterEventProcessingStore
+from sentry.utils import json
+from sentry.utils.compat import mock
+from sentry.utils.kvstore.memory import MemoryKVStorage
+
+
+def test_many():
+    store = EventProcessingStore(MemoryKVStorage())
+    events = [{"event_id": f"{i:032x}", "project": 1, "index": i} for i in range(3)]
+
+    keys = store.store_many(events)
+    assert keys == [store.store(event) for event in events]
+    unprocessed_keys = store.store_many(events[:1], unprocessed=True)
+    assert unprocessed_keys == [f"{keys[0]}:u"]
+
+    assert store.get_many(keys + ["missing"]) == dict(zip(keys, events))
+    assert store.get_many(keys, unprocessed=True) == {keys[0]: events[0]}
+
+    store.delete_many(keys[:2])
+    assert store.get_many(keys) == {keys[2]: events[2]}
+    assert store.get_many(keys, unprocessed=True) == {}
+
+
+@mock.patch("sentry.eventstore.processing.base.metrics.timing")
+def test_compression(mock_timing):
+    inner = MemoryKVStorage()
+    store = EventProcessingStore(inner, codec=CompressedEventCodec())
+    event = {"event_id": "a" * 32, "project": 1, "message": "hello " * 100}
+
+    key = store.store(event, stage="ingest")
+    assert store.get(key) == event
+    assert store.get_many([key]) == {key: event}
+    assert len(inner.get(key)) < len(json.dumps(event))
+    mock_timing.assert_called_once_with(
+        "eventstore.processing.stored_bytes", len(inner.get(key)), tags={"stage": "ingest"}
+    )
+
+    # Events stored before compression was enabled can still be read.
+    inner.set(key, json.dumps(event).encode("utf-8"))
+    assert store.get(key) == event
+
+
+def test_compression_dictionary(tmpdir):
+    path = tmpdir.join("dictionary")
+    path.write_binary(b'{"event_id": "", "project": 1, "platform": "python"}' * 4)
+    codec = get_event_codec(compression="zstd", compression_dictionary=str(path))
+    event = {"event_id": "a" * 32, "project": 1, "platform": "python"}
+
+    assert codec.decode(codec.encode(event)) == event
+    assert codec.encode(event) != CompressedEventCodec().encode(event)
+
+
+def test_get_event_codec():
+    assert get_event_codec() is None
+    assert isinstance(get_event_codec(compression="zstd"), CompressedEventCodec)
+    with pytest.raises(ValueError):
+        get_event_codec(compression="gzip")
+
+
+def test_redis_cluster_compression():
+    store = RedisClusterEventProcessingStore(cluster_id="default", compression="zstd")
+    event = {"event_id": "a" * 32, "project": 1, "message": "hello " * 100}
+
+    key = store.store(event)
+    try:
+        assert store.get(key) == event
+        assert store.get_many([key]) == {key: event}
+    finally:
+        store.delete_by_key(key)
@@ -1,5 +1,6 @@
 import pytest
 
+from sentry.grouping.component import GroupingComponent
 from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig
 
 
@@ -137,6 +138,24 @@ def test_family_matching():
     assert bool(native_rule.get_matching_frame_actions([{"function": "std::whatever"}], "native"))
 
 
+def test_multiple_family_matching():
+    enhancement = Enhancements.from_config_string(
+        """
+        family:native,javascript function:foo          +app
+        family:all function:bar                        -app
+    """
+    )
+    multi_rule, all_rule = enhancement.rules
+
+    assert multi_rule.get_matching_frame_actions([{"function": "foo"}], "javascript")
+    assert multi_rule.get_matching_frame_actions([{"function": "foo"}], "native")
+    assert not multi_rule.get_matching_frame_actions([{"function": "foo"}], "python")
+
+    assert all_rule.get_matching_frame_actions([{"function": "bar"}], "python")
+    assert all_rule.get_matching_frame_actions([{"function": "bar"}], "native")
+    assert not all_rule.get_matching_frame_actions([{"function": "foo"}], "native")
+
+
 def test_app_matching():
     enhancement = Enhancements.from_config_string(
         """
@@ -374,3 +393,49 @@ def test_range_matching_direct():
         ],
         "python",
     )
+
+
+def test_literal_matching():
+    enhancement = Enhancements.from_config_string(
+        """
+        function:foo                    -group
+        function:foo                    +app
+        package:/usr/lib/libfoo.so      -app
+    """
+    )
+    group_rule, app_rule, package_rule = enhancement.rules
+
+    # Matchers with the same key and pattern are shared between rules.
+    assert group_rule.matchers[0]._matcher is app_rule.matchers[0]._matcher
+
+    frames = [{"function": "foo"}, {"function": "foobar"}, {"function": "bar"}, {"function": "foo"}]
+    assert [idx for idx, _ in group_rule.get_matching_frame_actions(frames, "native")] == [0, 3]
+
+    assert package_rule.get_matching_frame_actions([{"package": "/USR/LIB/libfoo.so"}], "native")
+    assert package_rule.get_matching_frame_actions([{"package": "usr/lib/libfoo.so"}], "native")
+    assert package_rule.get_matching_frame_actions([{"package": "\\usr\\lib\\libfoo.so"}], "native")
+    assert not package_rule.get_matching_frame_actions(
+        [{"package": "/usr/lib/libfoo.so.1"}], "native"
+    )
+
+
+def test_matching_modified_frames():
+    enhancement = Enhancements.from_config_string(
+        """
+        function:foo                    +app category=bar
+        category:bar app:yes            -group
+    """
+    )
+
+    frames = [{"function": "foo"}, {"function": "bar"}]
+    enhancement.apply_modifications_to_frame(frames, "native", None)
+    assert frames[0]["in_app"]
+    assert frames[0]["data"]["category"] == "bar"
+    assert "in_app" not in frames[1]
+
+    components = [
+        GroupingComponent(id="frame", values=[frame["function"]], contributes=True)
+        for frame in frames
+    ]
+    enhancement.update_frame_components_contributions(components, frames, "native", None)
+    assert [c.contributes for c in components] == [False, True]
@@ -4,7 +4,10 @@ import uuid
 import pytest
 
 from sentry.event_manager import EventManager
+from sentry.eventstore.processing import event_processing_store
+from sentry.ingest.deduplication import event_deduplicator
 from sentry.ingest.ingest_consumer import (
+    IngestConsumerWorker,
     process_attachment_chunk,
     process_event,
     process_individual_attachment,
@@ -312,3 +315,87 @@ def test_individual_attachments_missing_chunks(default_project, factories, monke
     attachments = list(EventAttachment.objects.filter(project_id=project_id, event_id=event_id))
 
     assert not attachments
+
+
+@pytest.mark.django_db
+def test_concurrent_flush_batch(default_project, monkeypatch):
+    calls = []
+
+    def record(message_type):
+        def inner(message, projects):
+            assert projects == {default_project.id: default_project}
+            if message.get("fail"):
+                raise ValueError("failed")
+            calls.append((message_type, message["event_id"], message["index"]))
+
+        return inner
+
+    for message_type in ("userreport", "attachment_chunk", "individual_attachment"):
+        monkeypatch.setattr(
+            f"sentry.ingest.ingest_consumer.process_{message_type}", record(message_type)
+        )
+
+    batch = []
+    for index in range(3):
+        for event_id in ("a", "b", "c"):
+            for message_type in ("attachment", "attachment_chunk", "user_report"):
+                batch.append(
+                    {
+                        "type": message_type,
+                        "project_id": default_project.id,
+                        "event_id": event_id,
+                        "index": index,
+                    }
+                )
+
+    worker = IngestConsumerWorker(concurrency=4)
+    try:
+        worker.flush_batch(batch)
+
+        assert len(calls) == len(batch)
+        # All chunks are processed before any other message.
+        assert {t for t, _, _ in calls[:9]} == {"attachment_chunk"}
+        # Messages of the same event are processed in order.
+        for event_id in ("a", "b", "c"):
+            assert [(t, i) for t, e, i in calls[9:] if e == event_id] == [
+                ("individual_attachment", 0),
+                ("userreport", 0),
+                ("individual_attachment", 1),
+                ("userreport", 1),
+                ("individual_attachment", 2),
+                ("userreport", 2),
+            ]
+
+        batch[-1]["fail"] = True
+        with pytest.raises(ValueError):
+            worker.flush_batch(batch)
+    finally:
+        worker.shutdown()
+
+
+@pytest.mark.django_db
+def test_deduplicate_and_store_batch(default_project, monkeypatch):
+    calls = []
+
+    def process_event(message, projects, check_duplicate=True, data=None, cache_key=None):
+        calls.append((message["event_id"], check_duplicate, data, cache_key))
+
+    monkeypatch.setattr("sentry.ingest.ingest_consumer.process_event", process_event)
+    event_deduplicator.mark_processed([(default_project.id, "a")])
+
+    IngestConsumerWorker().flush_batch(
+        [
+            {
+                "type": "event",
+                "project_id": default_project.id,
+                "event_id": event_id,
+                "payload": json.dumps({"event_id": event_id, "project": default_project.id}),
+            }
+            for event_id in ("a", "b", "c", "b")
+        ]
+    )
+
+    assert [call[:2] for call in calls] == [("b", False), ("c", False)]
+    for event_id, _, data, cache_key in calls:
+        assert data == {"event_id": event_id, "project": default_project.id}
+        assert event_processing_store.get(cache_key) == data
@@ -0,0 +1,48 @@
+from sentry.ingest.deduplication.default import CacheEventDeduplicator
+from sentry.ingest.deduplication.redis import RedisEventDeduplicator
+from sentry.testutils import TestCase
+from sentry.utils.compat.mock import patch
+
+
+class CacheEventDeduplicatorTest(TestCase):
+    def test_get_duplicates(self):
+        deduplicator = CacheEventDeduplicator()
+        deduplicator.mark_processed([(1, "a"), (2, "b")])
+        assert deduplicator.get_duplicates([(1, "a"), (1, "b"), (2, "b")]) == {(1, "a"), (2, "b")}
+        assert deduplicator.is_duplicate(1, "a")
+        assert not deduplicator.is_duplicate(2, "a")
+
+
+class RedisEventDeduplicatorTest(TestCase):
+    def test_get_duplicates(self):
+        deduplicator = RedisEventDeduplicator()
+        assert deduplicator.get_duplicates([]) == set()
+        assert deduplicator.get_duplicates([(1, "a")]) == set()
+
+        deduplicator.mark_processed([(1, "a"), (2, "b"), (2, "c")])
+        assert deduplicator.get_duplicates([(1, "a"), (1, "b"), (2, "b"), (2, "c"), (3, "a")]) == {
+            (1, "a"),
+            (2, "b"),
+            (2, "c"),
+        }
+
+    def test_bloom_filter_false_positives(self):
+        # Every event is contained in a bloom filter of a single bit.
+        deduplicator = RedisEventDeduplicator(bloom_filter_bits=1)
+        deduplicator.mark_processed([(1, "a")])
+        assert deduplicator.get_duplicates([(1, "a"), (1, "b")]) == {(1, "a")}
+
+    @patch("sentry.ingest.deduplication.redis.time")
+    def test_horizon(self, mock_time):
+        deduplicator = RedisEventDeduplicator(horizon=60, partitions=2)
+
+        mock_time.return_value = 1000.0
+        deduplicator.mark_processed([(1, "a")])
+
+        mock_time.return_value = 1059.0
+        deduplicator.mark_processed([(1, "b")])
+        assert deduplicator.get_duplicates([(1, "a"), (1, "b")]) == {(1, "a"), (1, "b")}
+
+        # The partition of "a" is older than the horizon.
+        mock_time.return_value = 1100.0
+        assert deduplicator.get_duplicates([(1, "a"), (1, "b")]) == {(1, "b")}
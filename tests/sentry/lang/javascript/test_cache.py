@@ -1,6 +1,7 @@
 from unittest import TestCase
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import ParsedViewCache, SourceCache
+from sentry.utils.compat.mock import Mock
 
 
 class BasicCacheTest(TestCase):
@@ -37,3 +38,33 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+class ParsedViewCacheTest(TestCase):
+    def test_get_or_parse(self):
+        cache = ParsedViewCache(max_size=10)
+        parse = Mock(side_effect=lambda body: object())
+
+        view = cache.get_or_parse("source", parse, b"foo")
+        assert cache.get_or_parse("source", parse, b"foo") is view
+        assert parse.call_count == 1
+
+        # Views are keyed by their kind and payload.
+        assert cache.get_or_parse("sourcemap", parse, b"foo") is not view
+        assert cache.get_or_parse("source", parse, b"bar") is not view
+        assert parse.call_count == 3
+        assert cache.size == 9
+
+        # Evicts the least recently used views.
+        cache.get_or_parse("source", parse, b"foo")
+        cache.get_or_parse("source", parse, b"baz")
+        assert cache.size == 9
+        assert parse.call_count == 4
+        assert cache.get_or_parse("source", parse, b"foo") is view
+        assert parse.call_count == 4
+
+        # Payloads larger than the cache are not cached.
+        cache.get_or_parse("source", parse, b"x" * 11)
+        cache.get_or_parse("source", parse, b"x" * 11)
+        assert parse.call_count == 6
+        assert cache.size == 9
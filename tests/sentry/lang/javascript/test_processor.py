@@ -109,6 +109,33 @@ class FetchReleaseFileTest(TestCase):
         new_result = fetch_release_file("file.min.js", release)
         assert result == new_result
 
+    def test_manifest(self):
+        project = self.project
+        release = Release.objects.create(organization_id=project.organization_id, version="abc")
+        release.add_project(project)
+
+        file = File.objects.create(name="file.min.js", type="release.file", headers={})
+        file.putfile(BytesIO(b"foo"))
+        ReleaseFile.objects.create(
+            name="file.min.js", release=release, organization_id=project.organization_id, file=file
+        )
+
+        assert ReleaseFile.get_manifest(release) == {
+            ReleaseFile.get_ident("file.min.js"): ReleaseFile.objects.get(release=release).id
+        }
+
+        # Missing artifacts are looked up in the manifest only.
+        with self.assertNumQueries(0):
+            assert fetch_release_file("missing.min.js", release) is None
+
+        assert fetch_release_file("file.min.js", release).body == b"foo"
+
+        # Uploading an artifact invalidates the manifest.
+        ReleaseFile.objects.create(
+            name="other.min.js", release=release, organization_id=project.organization_id, file=file
+        )
+        assert fetch_release_file("other.min.js", release).body == b"foo"
+
     def test_distribution(self):
         project = self.project
         release = Release.objects.create(organization_id=project.organization_id, version="abc")
@@ -1142,3 +1169,42 @@ class CacheSourceTest(TestCase):
         # now we have an error
         assert len(processor.cache.get_errors(abs_path)) == 1
         assert processor.cache.get_errors(abs_path)[0] == {"url": map_url, "type": "js_no_source"}
+
+
+class PopulateSourceCacheTest(TestCase):
+    @patch("sentry.lang.javascript.processor.fetch_sourcemap")
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_concurrent_fetching(self, mock_fetch_file, mock_fetch_sourcemap):
+        mock_fetch_file.side_effect = lambda url, **kwargs: http.UrlResult(
+            url, {"sourcemap": "shared.js.map"}, b"console.log(1)", 200, "utf-8"
+        )
+        mock_fetch_sourcemap.return_value = fetch_sourcemap(base64_sourcemap)
+        sourcemap_url = "http://example.com/shared.js.map"
+
+        project = self.create_project()
+        processor = JavaScriptStacktraceProcessor(data={}, stacktrace_infos=None, project=project)
+        processor.max_fetches = 3
+        frames = [{"abs_path": f"http://example.com/{i}.js"} for i in range(4)]
+
+        with self.settings(SENTRY_SOURCE_FETCH_WORKERS=2):
+            processor.populate_source_cache(frames)
+
+        fetched = {c[0][0] for c in mock_fetch_file.call_args_list}
+        assert mock_fetch_file.call_count == len(fetched) == 3
+        # The source map is only fetched once, even though every file references it.
+        mock_fetch_sourcemap.assert_called_once_with(
+            sourcemap_url, project=project, release=None, dist=None, allow_scraping=True
+        )
+
+        for frame in frames:
+            abs_path = frame["abs_path"]
+            if abs_path in fetched:
+                assert processor.cache.get(abs_path)
+                assert processor.sourcemaps.get_link(abs_path)[0] == sourcemap_url
+            else:
+                assert processor.cache.get_errors(abs_path) == [
+                    {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES}
+                ]
+
+        assert not processor.prefetched_sources
+        assert not processor.prefetched_sourcemaps
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from sentry.cache import default_cache
+from sentry.lang.native.scheduler import ParkedEvent, SymbolicationScheduler
+from sentry.lang.native.symbolicator import (
+    _response_cache_key_for_event,
+    _task_id_cache_key_for_event,
+)
+from sentry.testutils.helpers import override_options
+from sentry.utils import json
+from sentry.utils.compat import mock
+
+EVENT_ID = "cc3e6c2bb6b6498097f336d1e6979f4b"
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = SymbolicationScheduler(key="symbolicate:parked:test")
+    yield scheduler
+    scheduler._get_client().delete(scheduler.key)
+
+
+def claimed_events(scheduler, now=None):
+    return [event for _, event, _ in scheduler.claim(now=now)]
+
+
+def make_event(event_id=EVENT_ID, symbolication_start_time=None):
+    return ParkedEvent(
+        project_id=1,
+        event_id=event_id,
+        cache_key=f"e:{event_id}:1",
+        start_time=1,
+        symbolication_start_time=symbolication_start_time or time.time(),
+        from_reprocessing=False,
+    )
+
+
+def test_claim_due_events(scheduler):
+    due = make_event("a" * 32)
+    later = make_event("b" * 32)
+
+    scheduler.park(due, 0)
+    scheduler.park(later, 5)
+
+    assert claimed_events(scheduler) == [due]
+    # Claimed events are leased, so that no other scheduler polls them.
+    assert claimed_events(scheduler) == []
+    assert claimed_events(scheduler, now=time.time() + 10) == [later]
+
+    # Events that were neither parked nor resumed are claimed again once the
+    # lease runs out.
+    assert claimed_events(scheduler, now=time.time() + scheduler.get_lease() + 10) == [due, later]
+
+
+def test_poll_due(scheduler):
+    pending = make_event("a" * 32)
+    done = make_event("b" * 32)
+    scheduler.park(pending, 0)
+    scheduler.park(done, 0)
+
+    def poll(event):
+        return 2 if event == pending else None
+
+    loop = asyncio.new_event_loop()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with mock.patch.object(scheduler, "poll", side_effect=poll):
+            with mock.patch.object(scheduler, "resume") as mock_resume:
+                assert scheduler.poll_due(loop, executor) == 2
+    loop.close()
+
+    mock_resume.assert_called_once_with(done)
+    assert claimed_events(scheduler) == []
+    assert claimed_events(scheduler, now=time.time() + scheduler.get_lease() + 10) == [pending]
+
+
+def test_poll_due_keeps_events_that_fail_to_resume(scheduler):
+    first = make_event("a" * 32)
+    second = make_event("b" * 32)
+    scheduler.park(first, 0)
+    scheduler.park(second, 0)
+
+    def resume(event):
+        if event == first:
+            raise Exception("broker unavailable")
+
+    loop = asyncio.new_event_loop()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with mock.patch.object(scheduler, "poll", return_value=None):
+            with mock.patch.object(scheduler, "resume", side_effect=resume) as mock_resume:
+                assert scheduler.poll_due(loop, executor) == 2
+    loop.close()
+
+    # The failure does not abort the batch, and the event is parked again to
+    # be resumed right away.
+    assert mock_resume.call_count == 2
+    assert claimed_events(scheduler) == [first]
+
+
+def test_poll_due_keeps_events_parked_by_resumed_task(scheduler):
+    event = make_event()
+    scheduler.park(event, 0)
+
+    loop = asyncio.new_event_loop()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with mock.patch.object(scheduler, "poll", return_value=None):
+            with mock.patch.object(
+                scheduler, "resume", side_effect=lambda event: scheduler.park(event, 0)
+            ):
+                assert scheduler.poll_due(loop, executor) == 1
+    loop.close()
+
+    assert claimed_events(scheduler) == [event]
+
+
+def test_release_lost_lease(scheduler):
+    event = make_event()
+    scheduler.park(event, 0)
+
+    [(member, _, lease_end)] = scheduler.claim()
+    # The lease runs out and another scheduler claims the event.
+    [(_, _, other_lease_end)] = scheduler.claim(now=lease_end + 1)
+
+    assert not scheduler.release(member, lease_end)
+    assert not scheduler.release(member, lease_end, retry_after=0)
+
+    # The event still holds the lease of the other scheduler.
+    assert scheduler.release(member, other_lease_end)
+    assert claimed_events(scheduler, now=other_lease_end + 1) == []
+
+
+def test_poll_resumes_timed_out_event(scheduler):
+    event = make_event(symbolication_start_time=time.time() - 3600)
+
+    with mock.patch("sentry.lang.native.symbolicator.Symbolicator") as mock_symbolicator:
+        assert scheduler.poll(event) is None
+
+    assert mock_symbolicator.call_count == 0
+
+
+class FakeSymbolicatorHandler(BaseHTTPRequestHandler):
+    # Maps task ids to the responses returned by subsequent polls. Like
+    # symbolicator, tasks are forgotten once their response was returned.
+    tasks = {}
+
+    def do_GET(self):
+        task_id = self.path.split("?")[0].rsplit("/", 1)[-1]
+        responses = self.tasks.get(task_id)
+        if not responses:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps(responses.pop(0)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_symbolicator():
+    server = HTTPServer(("127.0.0.1", 0), FakeSymbolicatorHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeSymbolicatorHandler.tasks = {}
+    url = "http://{}:{}".format(*server.server_address)
+    with override_options({"symbolicator.options": {"url": url}}):
+        yield FakeSymbolicatorHandler.tasks
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_poll_due_against_symbolicator(scheduler, fake_symbolicator, default_project):
+    pending = make_event("a" * 32)._replace(project_id=default_project.id)
+    done = make_event("b" * 32)._replace(project_id=default_project.id)
+
+    fake_symbolicator["task-a"] = [{"status": "pending", "retry_after": 1}]
+    fake_symbolicator["task-b"] = [{"status": "completed", "stacktraces": []}]
+    for event, task_id in ((pending, "task-a"), (done, "task-b")):
+        default_cache.set(
+            _task_id_cache_key_for_event(event.project_id, event.event_id), task_id, 60
+        )
+        scheduler.park(event, 0)
+
+    loop = asyncio.new_event_loop()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with mock.patch.object(scheduler, "resume") as mock_resume:
+            assert scheduler.poll_due(loop, executor) == 2
+    loop.close()
+
+    mock_resume.assert_called_once_with(done)
+    assert claimed_events(scheduler, now=time.time() + scheduler.get_lease() + 10) == [pending]
+
+    # The response of the completed task is kept for symbolicate_event.
+    response_key = _response_cache_key_for_event(done.project_id, done.event_id)
+    assert default_cache.get(response_key) == {"status": "completed", "stacktraces": []}
@@ -1,11 +1,18 @@
 import copy
 
 import pytest
+from django.test.utils import override_settings
 
+from sentry.cache import default_cache
 from sentry.lang.native import symbolicator
-from sentry.lang.native.symbolicator import get_sources_for_project, redact_internal_sources
-from sentry.testutils.helpers import Feature
-from sentry.utils.compat import map
+from sentry.lang.native.symbolicator import (
+    Symbolicator,
+    SymbolicatorSession,
+    get_sources_for_project,
+    redact_internal_sources,
+)
+from sentry.testutils.helpers import Feature, override_options
+from sentry.utils.compat import map, mock
 
 CUSTOM_SOURCE_CONFIG = """
 [{
@@ -105,6 +112,58 @@ def test_sources_custom_disabled(default_project):
     assert source_ids == ["sentry:project"]
 
 
+@pytest.mark.django_db
+def test_poll_task_stashes_response(default_project):
+    event_id = "a" * 32
+    response = {"status": "completed", "stacktraces": []}
+
+    with override_options({"symbolicator.options": {"url": "http://symbolicator"}}):
+        native_symbolicator = Symbolicator(project=default_project, event_id=event_id)
+        default_cache.set(native_symbolicator.task_id_cache_key, "task-1", 60)
+
+        with mock.patch.object(SymbolicatorSession, "query_task") as mock_query_task:
+            mock_query_task.return_value = {"status": "pending", "retry_after": 2}
+            assert native_symbolicator.poll_task() == 2
+
+            mock_query_task.return_value = response
+            assert native_symbolicator.poll_task() is None
+
+            # The response is only returned once by symbolicator, processing
+            # the event picks up the stashed response instead.
+            mock_query_task.return_value = None
+            create_task = mock.Mock()
+            assert native_symbolicator._process(create_task, "process_payload") == response
+
+    assert mock_query_task.call_count == 2
+    assert create_task.call_count == 0
+    assert default_cache.get(native_symbolicator.task_id_cache_key) is None
+    assert default_cache.get(native_symbolicator.response_cache_key) is None
+
+
+@override_settings(SYMBOLICATOR_POOL_SIZE=2)
+def test_sessions_share_pool():
+    with SymbolicatorSession(url="http://symbolicator", event_id="a" * 32) as sess_a:
+        pooled = sess_a.session
+        with mock.patch.object(pooled, "close") as mock_close:
+            with SymbolicatorSession(url="http://symbolicator", event_id="b" * 32) as sess_b:
+                assert sess_b.session is pooled
+
+    assert mock_close.call_count == 0
+    assert pooled.get_adapter("http://symbolicator/")._pool_maxsize == 2
+
+    with SymbolicatorSession(url="http://other-symbolicator") as sess:
+        assert sess.session is not pooled
+
+
+@override_settings(SYMBOLICATOR_POOL_SIZE=0)
+def test_sessions_without_pool():
+    with SymbolicatorSession(url="http://symbolicator") as sess_a:
+        with SymbolicatorSession(url="http://symbolicator") as sess_b:
+            assert sess_a.session is not sess_b.session
+
+    assert sess_a.session is None
+
+
 class TestInternalSourcesRedaction:
     def test_custom_untouched(self):
         debug_id = "451a38b5-0679-79d2-0738-22a5ceb24c4b"
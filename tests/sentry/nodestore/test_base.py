@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from sentry.nodestore.base import LocalNodeCache, NodeStorage
+from sentry.utils.compat import mock
+
+
+class InMemoryNodeStorage(NodeStorage):
+    """
+    A backend without native batching, to exercise the fallbacks in
+    ``NodeStorage``.
+
+    Nodestores are thread locals, so all state shared with the worker threads
+    is passed to the constructor.
+    """
+
+    def __init__(self, data, threads, delay, **options):
+        super().__init__(**options)
+        self.data = data
+        self.threads = threads
+        self.delay = delay
+
+    def _get_bytes(self, id):
+        self.threads.add(threading.current_thread().name)
+        self.delay.wait()
+        return self.data.get(id)
+
+    def _set_bytes(self, id, data, ttl=None):
+        self.data[id] = data
+
+    def delete(self, id):
+        self.threads.add(threading.current_thread().name)
+        self.data.pop(id, None)
+        self._delete_cache_item(id)
+
+    @property
+    def cache(self):
+        return None
+
+
+@pytest.mark.parametrize("multi_concurrency", [1, 4])
+def test_get_multi_fallback(multi_concurrency):
+    delay = threading.Event()
+    delay.set()
+    ns = InMemoryNodeStorage({}, set(), delay, multi_concurrency=multi_concurrency)
+    ids = [f"node_{i}" for i in range(10)]
+    for id in ids[:5]:
+        ns.set(id, {"id": id})
+
+    result = ns.get_multi(ids)
+    assert result == {id: {"id": id} if i < 5 else None for i, id in enumerate(ids)}
+    if multi_concurrency > 1:
+        assert all(name.startswith("nodestore-multi") for name in ns.threads)
+
+    ns.delete_multi(ids[:3])
+    assert sorted(ns.data) == ids[3:5]
+
+
+def test_get_multi_fallback_timeout():
+    ns = InMemoryNodeStorage({}, set(), threading.Event(), multi_concurrency=2, multi_timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            ns.get_multi(["node_1", "node_2"])
+    finally:
+        ns.delay.set()
+
+
+def test_local_cache():
+    ns = InMemoryNodeStorage({}, set(), threading.Event(), local_cache_size=1024)
+    ns.delay.set()
+    ns.set("node_1", {"foo": "a"})
+    ns.data.clear()
+
+    # served from the local cache, as a copy
+    node = ns.get("node_1")
+    assert node == {"foo": "a"}
+    node["foo"] = "b"
+    assert ns.get_multi(["node_1"]) == {"node_1": {"foo": "a"}}
+
+    ns.set("node_1", None)
+    assert ns.get("node_1") is None
+
+    ns.set("node_1", {"foo": "a"})
+    ns.delete("node_1")
+    assert ns.local_cache.get("node_1") is None
+
+
+def test_local_cache_evicts_by_size():
+    cache = LocalNodeCache(max_size=30, ttl=60)
+    cache.set("node_1", {"foo": "a" * 10})
+    cache.set("node_2", {"foo": "b" * 10})
+    assert cache.size <= 30
+    assert cache.get("node_1") is None
+    assert cache.get("node_2") == {"foo": "b" * 10}
+
+    # too large to be cached at all
+    cache.set("node_3", {"foo": "c" * 100})
+    assert cache.get("node_3") is None
+
+
+def test_local_cache_expires():
+    cache = LocalNodeCache(max_size=1024, ttl=60)
+    with mock.patch("sentry.nodestore.base.monotonic", return_value=0):
+        cache.set("node_1", {"foo": "a"})
+    with mock.patch("sentry.nodestore.base.monotonic", return_value=59):
+        assert cache.get("node_1") == {"foo": "a"}
+    with mock.patch("sentry.nodestore.base.monotonic", return_value=61):
+        assert cache.get("node_1") is None
+    assert cache.size == 0
@@ -6,6 +6,7 @@ from contextlib import contextmanager
 
 import pytest
 
+from sentry.nodestore.base import FRAMED_HEADER
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from tests.sentry.nodestore.bigtable.backend.tests import (
     MockedBigtableNodeStorage,
@@ -53,6 +54,12 @@ def test_set(ns):
     assert ns.get(node_id) == data
 
 
+def test_set_many(ns):
+    nodes = {"a" * 32: {"foo": "a"}, "b" * 32: {"foo": "b"}}
+    ns.set_many(nodes)
+    assert ns.get_multi(list(nodes)) == nodes
+
+
 def test_delete(ns):
     node_id = "d2502ebbd7df41ceba8d3275595cac33"
     data = {"foo": "bar"}
@@ -97,3 +104,30 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+@pytest.mark.parametrize("section_compression", [None, "zstd"])
+def test_set_subkeys_framed(ns, section_compression):
+    ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+
+    ns.framed_encoding = True
+    ns.section_compression = section_compression
+
+    # nodes written in the legacy encoding can still be read
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+
+    ns.set_subkeys("node_2", {None: {"foo": "a"}, "other": {"foo": "b"}})
+    assert ns._get_bytes("node_2").startswith(FRAMED_HEADER)
+    assert ns.get("node_2") == {"foo": "a"}
+    assert ns.get("node_2", subkey="other") == {"foo": "b"}
+    assert ns.get("node_2", subkey="missing") is None
+    assert ns.get_multi(["node_1", "node_2"], subkey="other") == {
+        "node_1": {"foo": "b"},
+        "node_2": {"foo": "b"},
+    }
+
+    ns.framed_encoding = False
+
+    # and framed nodes can be read without the framed encoding enabled
+    assert ns.get("node_2", subkey="other") == {"foo": "b"}
@@ -1,5 +1,7 @@
+from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.redis import RedisRateLimiter
 from sentry.testutils import TestCase
+from sentry.utils.compat.mock import patch
 
 
 class RedisRateLimiterTest(TestCase):
@@ -13,3 +15,62 @@ class RedisRateLimiterTest(TestCase):
     def test_simple_key(self):
         assert not self.backend.is_limited("foo", 1)
         assert self.backend.is_limited("foo", 1)
+
+    def test_is_limited_many(self):
+        requests = [{"key": "foo", "limit": 1}, {"key": "bar", "limit": 2}]
+        assert self.backend.is_limited_many(requests) == [False, False]
+        assert self.backend.is_limited_many(requests) == [True, False]
+        assert self.backend.is_limited_many(requests) == [True, True]
+
+
+class SlidingWindowRateLimiterTest(TestCase):
+    def setUp(self):
+        self.backend = RedisRateLimiter(algorithm="sliding_window")
+
+    def test_simple_key(self):
+        assert not self.backend.is_limited("foo", 2)
+        assert not self.backend.is_limited("foo", 2)
+        assert self.backend.is_limited("foo", 2)
+        assert not self.backend.is_limited("foo", 2, self.project)
+
+    @patch("sentry.ratelimits.redis.time")
+    def test_previous_window(self, mock_time):
+        mock_time.return_value = 1200
+        for _ in range(4):
+            assert not self.backend.is_limited("foo", 4, window=60)
+        assert self.backend.is_limited("foo", 4, window=60)
+
+        # Halfway into the next window, half of the previous window counts.
+        mock_time.return_value = 1290
+        assert not self.backend.is_limited("foo", 4, window=60)
+        assert not self.backend.is_limited("foo", 4, window=60)
+        assert self.backend.is_limited("foo", 4, window=60)
+
+    def test_zero_limit(self):
+        assert self.backend.is_limited("foo", 0)
+
+
+class GCRARateLimiterTest(TestCase):
+    def setUp(self):
+        self.backend = RedisRateLimiter(algorithm="gcra")
+
+    @patch("sentry.ratelimits.redis.time")
+    def test_burst_and_refill(self, mock_time):
+        mock_time.return_value = 1000.0
+        for _ in range(3):
+            assert not self.backend.is_limited("foo", 3, window=30)
+        assert self.backend.is_limited("foo", 3, window=30)
+
+        # One token is refilled every 10 seconds.
+        mock_time.return_value = 1010.0
+        assert not self.backend.is_limited("foo", 3, window=30)
+        assert self.backend.is_limited("foo", 3, window=30)
+
+    def test_is_limited_many(self):
+        requests = [{"key": "foo", "limit": 1}, {"key": "foo", "limit": 1, "project": self.project}]
+        assert self.backend.is_limited_many(requests) == [False, False]
+        assert self.backend.is_limited_many(requests) == [True, True]
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(InvalidConfiguration):
+            RedisRateLimiter(algorithm="leaky")
@@ -7,6 +7,7 @@ from sentry import quotas
 from sentry.event_manager import EventManager, HashDiscarded
 from sentry.plugins.base.v2 import Plugin2
 from sentry.tasks.store import (
+    RetrySymbolication,
     preprocess_event,
     process_event,
     save_event,
@@ -169,6 +170,39 @@ def test_symbolicate_event_call_process_inline(
     )
 
 
+@pytest.mark.django_db
+@override_settings(SENTRY_SYMBOLICATION_SCHEDULER=True)
+def test_symbolicate_event_parks_pending_event(
+    default_project,
+    mock_event_processing_store,
+    mock_process_event,
+    mock_get_symbolication_function,
+):
+    data = {"project": default_project.id, "platform": "native", "event_id": EVENT_ID}
+    mock_event_processing_store.get.return_value = data
+
+    def symbolicate(data):
+        raise RetrySymbolication(retry_after=2)
+
+    mock_get_symbolication_function.return_value = symbolicate
+
+    with mock.patch("sentry.lang.native.scheduler.get_scheduler") as mock_get_scheduler:
+        with mock.patch("sentry.tasks.store._do_process_event") as mock_do_process_event:
+            symbolicate_event(cache_key="e:1", start_time=1, symbolication_start_time=time() - 10)
+
+    # The worker does not wait for symbolicator, nor does it continue processing.
+    assert mock_do_process_event.call_count == 0
+    assert mock_event_processing_store.store.call_count == 0
+
+    ((event, retry_after), _) = mock_get_scheduler.return_value.park.call_args
+    assert event.cache_key == "e:1"
+    assert event.event_id == EVENT_ID
+    assert event.start_time == 1
+    assert time() - event.symbolication_start_time >= 10
+    assert not event.from_reprocessing
+    assert retry_after == 2
+
+
 @pytest.mark.django_db
 def test_move_to_save_event(
     default_project, mock_process_event, mock_save_event, mock_symbolicate_event, register_plugin
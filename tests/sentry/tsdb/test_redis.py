@@ -7,6 +7,7 @@ import pytz
 from sentry.testutils import TestCase
 from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
 from sentry.tsdb.redis import CountMinScript, RedisTSDB, SuppressionWrapper
+from sentry.utils.cache import default_cache
 from sentry.utils.dates import to_datetime, to_timestamp
 
 
@@ -29,7 +30,7 @@ def test_suppression_wrapper():
 
 class RedisTSDBTest(TestCase):
     def setUp(self):
-        self.db = RedisTSDB(
+        self.db_options = dict(
             rollups=(
                 # time in seconds, samples to keep
                 (10, 30),  # 5 minutes at 10 seconds
@@ -41,6 +42,7 @@ class RedisTSDBTest(TestCase):
             enable_frequency_sketches=True,
             hosts={i - 6: {"db": i} for i in range(6, 9)},
         )
+        self.db = RedisTSDB(**self.db_options)
 
     def tearDown(self):
         with self.db.cluster.all() as client:
@@ -179,6 +181,63 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_scripted_counters(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        pipelined = RedisTSDB(prefix="ts:pipelined:", **self.db_options)
+        scripted = RedisTSDB(
+            prefix="ts:scripted:", enable_scripted_counters=True, **self.db_options
+        )
+        for db in (pipelined, scripted):
+            db.incr(TSDBModel.project, 1, dts[0])
+            db.incr(TSDBModel.project, 1, dts[1], count=2)
+            db.incr_multi(
+                [(TSDBModel.project, 1), (TSDBModel.project, "foo"), (TSDBModel.group, 3)],
+                dts[3],
+                count=3,
+                environment_id=1,
+            )
+
+        for model, keys in ((TSDBModel.project, [1, "foo"]), (TSDBModel.group, [3])):
+            for environment_ids in (None, [1]):
+                expected = pipelined.get_range(
+                    model, keys, dts[0], dts[-1], environment_ids=environment_ids
+                )
+                assert any(count for points in expected.values() for _, count in points)
+                assert expected == scripted.get_range(
+                    model, keys, dts[0], dts[-1], environment_ids=environment_ids
+                )
+
+        ttls = []
+        for db in (pipelined, scripted):
+            hash_key, _ = db.make_counter_key(TSDBModel.project, ONE_HOUR, dts[3], 1, None)
+            with db.cluster.map() as client:
+                ttls.append(client.ttl(hash_key))
+        assert ttls[0].value > 0
+        assert abs(ttls[0].value - ttls[1].value) <= 1
+
+    def test_range_cache(self):
+        self.addCleanup(default_cache.clear)
+        db = RedisTSDB(range_cache_ttl=60, **self.db_options)
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        dts = [now - timedelta(hours=i) for i in range(3, -1, -1)]
+        for dt in dts:
+            db.incr(TSDBModel.project, 1, dt)
+
+        def get_range():
+            return db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1], rollup=ONE_HOUR)
+
+        results = get_range()
+        assert [count for _, count in results[1]] == [1, 1, 1, 1]
+        assert [count for _, count in results[2]] == [0, 0, 0, 0]
+
+        # closed buckets are served from the cache, the open bucket is re-read
+        db.incr(TSDBModel.project, 1, dts[0])
+        db.incr(TSDBModel.project, 1, dts[-1])
+        results = get_range()
+        assert [count for _, count in results[1]] == [1, 1, 1, 2]
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
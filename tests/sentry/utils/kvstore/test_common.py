@@ -100,3 +100,16 @@ def test_multiple_key_operations(properties: Properties) -> None:
     store.delete_many(all_keys)
 
     assert dict(store.get_many(all_keys)) == {}
+
+
+def test_set_many(properties: Properties) -> None:
+    store = properties.store
+
+    items = dict(itertools.islice(properties.items, 10))
+    store.set_many(list(items.items()))
+    assert dict(store.get_many(list(items))) == items
+
+    # Test overwriting existing keys.
+    new_items = dict(zip(items, properties.values))
+    store.set_many(list(new_items.items()))
+    assert dict(store.get_many(list(items))) == new_items
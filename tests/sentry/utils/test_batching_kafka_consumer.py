@@ -0,0 +1,119 @@
+import pytest
+
+from sentry.utils.batching_kafka_consumer import AbstractBatchWorker, BatchingKafkaConsumer
+
+
+class FakeMessage:
+    def __init__(self, offset, value):
+        self._offset = offset
+        self._value = value
+
+    def topic(self):
+        return "topic"
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return None
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return None
+
+    def timestamp(self):
+        return (0, 0)
+
+    def error(self):
+        return None
+
+
+class FakeConsumer:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.commits = 0
+
+    def poll(self, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+
+    def commit(self, asynchronous=True):
+        self.commits += 1
+        return []
+
+    def close(self):
+        pass
+
+
+class Worker(AbstractBatchWorker):
+    def __init__(self):
+        self.batches = []
+
+    def process_message(self, message):
+        if message.value() == b"error":
+            raise ValueError("invalid message")
+        if message.value() == b"skip":
+            return None
+        return message.value().decode("utf-8").upper()
+
+    def flush_batch(self, batch):
+        self.batches.append(batch)
+
+    def shutdown(self):
+        pass
+
+
+class FakeBatchingKafkaConsumer(BatchingKafkaConsumer):
+    def create_consumer(self, *args, **kwargs):
+        return FakeConsumer([])
+
+
+def create_consumer(values, **options):
+    consumer = FakeBatchingKafkaConsumer(
+        "topic",
+        worker=Worker(),
+        max_batch_size=3,
+        max_batch_time=60000,
+        cluster_name="default",
+        group_id="group",
+        **options,
+    )
+    consumer.consumer.messages = [FakeMessage(i, value) for i, value in enumerate(values)]
+    return consumer
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_batches(processes):
+    consumer = create_consumer(
+        [b"a", b"b", b"skip", b"c", b"d", b"e"], processes=processes, process_chunk_size=2
+    )
+    try:
+        for _ in range(6):
+            consumer._run_once()
+        consumer._flush(force=True)
+    finally:
+        consumer._shutdown()
+
+    items = [item for batch in consumer.worker.batches for item in batch]
+    assert items == ["A", "B", "C", "D", "E"]
+    assert consumer.consumer.commits == len(consumer.worker.batches)
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_error(processes):
+    consumer = create_consumer([b"a", b"error"], processes=processes)
+    try:
+        with pytest.raises(Exception):
+            for _ in range(2):
+                consumer._run_once()
+            consumer._flush(force=True)
+    finally:
+        consumer._shutdown()
+
+    assert consumer.worker.batches == []
+    assert consumer.consumer.commits == 0
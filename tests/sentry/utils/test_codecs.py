@@ -1,4 +1,5 @@
 import pytest
+import zstandard
 
 from sentry.utils.codecs import BytesCodec, JSONCodec, ZlibCodec, ZstdCodec
 
@@ -22,3 +23,15 @@ def test_codec_chaining() -> None:
 
     assert codec.encode([1, 2, 3]) == b"[1,2,3]"
     assert codec.decode(b"[1,2,3]") == [1, 2, 3]
+
+
+def test_zstd_dictionary() -> None:
+    dictionary = b'{"platform": "python", "exception": {"values": []}}' * 4
+    codec = ZstdCodec(dictionary=dictionary)
+    value = b'{"platform": "python"}'
+
+    encoded = codec.encode(value)
+    assert codec.decode(encoded) == value
+    assert encoded != ZstdCodec().encode(value)
+    with pytest.raises(zstandard.ZstdError):
+        ZstdCodec().decode(encoded)
@@ -57,6 +57,17 @@ class ClusterManagerTestCase(TestCase):
         with pytest.raises(KeyError):
             manager.get("bar")
 
+    @mock.patch("sentry.utils.redis.StrictRedis")
+    def test_specific_cluster_without_decoding(self, StrictRedis):
+        manager = make_manager(cluster_type=_RedisCluster)
+
+        cluster = manager.get("foo", decode_responses=False)
+        assert cluster is manager.get("foo", decode_responses=False)
+        assert cluster is not manager.get("foo")
+
+        assert cluster._setupfunc() is StrictRedis.return_value
+        StrictRedis.assert_called_once_with(db=0, decode_responses=False)
+
     def test_multiple_retrieval_do_not_setup_lazy_object(self):
         class TestClusterType:
             def supports(self, config):
@@ -1,18 +1,29 @@
+import threading
+import time
 import unittest
 from datetime import datetime, timedelta
 
 import pytest
 import pytz
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from sentry.app import locks
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.utils import json
 from sentry.utils.compat import mock
 from sentry.utils.snuba import (
     Dataset,
     SnubaQueryParams,
+    UnexpectedResponseError,
     UnqualifiedQueryError,
+    _apply_cache_and_build_results,
     _prepare_query_params,
+    _quantize_cache_window,
+    _stream_response,
+    get_cache_key,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
@@ -350,3 +361,131 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+class QueryCacheTest(TestCase):
+    def setUp(self):
+        self.query = {"dataset": "events", "selected_columns": ["event_id"], "project": [1]}
+        self.params = (self.query, lambda x: x, lambda x: x)
+        self.cache_key = get_cache_key(self.query)
+        cache.delete(self.cache_key)
+
+    def _query(self, calls):
+        with mock.patch(
+            "sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": ["new"]}]
+        ) as mock_query:
+            results = list(_apply_cache_and_build_results([self.params], use_cache=True))
+            calls.extend(mock_query.call_args_list)
+        return results
+
+    def _set_cached(self, result, fresh_until):
+        cache.set(self.cache_key, json.dumps({"fresh_until": fresh_until, "result": result}), 60)
+
+    def test_hit_and_miss(self):
+        calls = []
+        assert self._query(calls) == [{"data": ["new"]}]
+        assert self._query(calls) == [{"data": ["new"]}]
+        assert len(calls) == 1
+
+    def test_stale_while_revalidate(self):
+        calls = []
+        with self.settings(SENTRY_SNUBA_CACHE_STALE_SECONDS=60):
+            self._set_cached({"data": ["old"]}, time.time() - 1)
+
+            # Somebody else is revalidating, the stale result is served.
+            lock = locks.get(f"{self.cache_key}:lock", duration=10)
+            with lock.acquire():
+                assert self._query(calls) == [{"data": ["old"]}]
+            assert len(calls) == 0
+
+            assert self._query(calls) == [{"data": ["new"]}]
+            assert len(calls) == 1
+            assert not lock.locked()
+
+    def test_single_flight(self):
+        calls = []
+        with self.settings(SENTRY_SNUBA_CACHE_LOCK_WAIT_SECONDS=5):
+            lock = locks.get(f"{self.cache_key}:lock", duration=10)
+            with lock.acquire():
+                writer = threading.Timer(
+                    0.1, self._set_cached, args=({"data": ["other"]}, time.time() + 60)
+                )
+                writer.start()
+                assert self._query(calls) == [{"data": ["other"]}]
+                writer.join()
+            assert len(calls) == 0
+
+    def test_single_flight_timeout(self):
+        calls = []
+        with self.settings(SENTRY_SNUBA_CACHE_LOCK_WAIT_SECONDS=0.1):
+            lock = locks.get(f"{self.cache_key}:lock", duration=10)
+            with lock.acquire():
+                assert self._query(calls) == [{"data": ["new"]}]
+            assert len(calls) == 1
+
+    def test_quantize_cache_window(self):
+        end = datetime.utcnow()
+        query = dict(
+            self.query,
+            from_date=(end - timedelta(days=1)).isoformat(),
+            to_date=end.isoformat(),
+        )
+
+        with self.settings(SENTRY_SNUBA_CACHE_TIME_QUANTUM_SECONDS=60):
+            quantized = _quantize_cache_window(query)
+            quantized_end = parse_datetime(quantized["to_date"])
+            assert timedelta(0) < end - quantized_end <= timedelta(seconds=61)
+            assert parse_datetime(quantized["from_date"]) == quantized_end - timedelta(days=1)
+
+            # Absolute time windows are not quantized.
+            query["to_date"] = (end - timedelta(hours=1)).isoformat()
+            assert _quantize_cache_window(query) == query
+
+        assert _quantize_cache_window(query) == query
+
+
+class StreamResponseTest(unittest.TestCase):
+    def _response(self, body, chunk_size):
+        response = mock.Mock()
+        response.stream.return_value = (
+            body[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+        )
+        return response
+
+    def test_stream(self):
+        body = {
+            "meta": [{"name": "message", "type": "String"}],
+            "data": [{"message": "\N{SNOWMAN}" * i, "count": i} for i in range(100)],
+            "totals": {"count": 4950},
+            "timing": {"duration_ms": 12345},
+        }
+        encoded = json.dumps(body).encode("utf-8")
+
+        for chunk_size in (1, 7, 1024, len(encoded)):
+            response = self._response(encoded, chunk_size)
+            result = _stream_response(response, lambda row: dict(row, translated=True))
+            assert result["meta"] == body["meta"]
+            assert "totals" not in result
+
+            rows = list(result["data"])
+            assert rows == [dict(row, translated=True) for row in body["data"]]
+            assert result["totals"] == body["totals"]
+            assert result["timing"] == body["timing"]
+            assert response.release_conn.call_count == 1
+            assert not response.close.called
+
+    def test_discarded(self):
+        response = self._response(b'{"data": [{"a": 1}, {"a": 2}]}', 4)
+        result = _stream_response(response, lambda row: row)
+        assert next(result["data"]) == {"a": 1}
+
+        result["data"].close()
+        assert response.close.call_count == 1
+        assert response.release_conn.call_count == 1
+
+    def test_invalid(self):
+        response = self._response(b'{"data": [{"a": 1}, {"a"', 4)
+        result = _stream_response(response, lambda row: row)
+        with pytest.raises(UnexpectedResponseError):
+            list(result["data"])
+        assert response.close.call_count == 1
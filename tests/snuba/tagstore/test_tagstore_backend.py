@@ -1,8 +1,10 @@
 from datetime import timedelta
 
 import pytest
+from django.http import HttpRequest
 from django.utils import timezone
 
+from sentry.app import env
 from sentry.models import Environment, EventUser, Release, ReleaseProjectEnvironment
 from sentry.tagstore.exceptions import (
     GroupTagKeyNotFound,
@@ -13,6 +15,8 @@ from sentry.tagstore.exceptions import (
 from sentry.tagstore.snuba.backend import SnubaTagStorage
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import iso_format
+from sentry.utils import snuba
+from sentry.utils.compat import mock
 
 
 class TagStorageTest(TestCase, SnubaTestCase):
@@ -135,6 +139,7 @@ class TagStorageTest(TestCase, SnubaTestCase):
 
         assert result[4].key == "sentry:release"
         assert result[4].count == 2
+        assert result[4].values_seen == 2
         top_release_values = result[4].top_values
         assert len(top_release_values) == 2
         assert {v.value for v in top_release_values} == {"100", "200"}
@@ -162,6 +167,54 @@ class TagStorageTest(TestCase, SnubaTestCase):
         assert {v.value for v in top_release_values} == {"100", "200"}
         assert all(v.times_seen == 1 for v in top_release_values)
 
+    def test_get_group_tag_keys_and_top_values_many(self):
+        group_ids = [self.proj1group1.id, self.proj1group2.id]
+        with mock.patch(
+            "sentry.utils.snuba.bulk_raw_query", wraps=snuba.bulk_raw_query
+        ) as bulk_raw_query:
+            result = self.ts.get_group_tag_keys_and_top_values_many(
+                self.proj1.id, group_ids, [self.proj1env1.id], keys=["foo", "sentry:release"]
+            )
+            assert bulk_raw_query.call_count == 1
+
+        assert set(result) == set(group_ids)
+        for group_id in group_ids:
+            expected = self.ts.get_group_tag_keys_and_top_values(
+                self.proj1.id, group_id, [self.proj1env1.id], keys=["foo", "sentry:release"]
+            )
+            assert result[group_id] == expected
+            assert {k.key: (k.count, k.values_seen) for k in result[group_id]} == {
+                k.key: (k.count, k.values_seen) for k in expected
+            }
+            assert all(k.values_seen for k in result[group_id])
+            assert {k.key: k.top_values for k in result[group_id]} == {
+                k.key: k.top_values for k in expected
+            }
+
+    def test_request_memoized(self):
+        with mock.patch.object(env, "request", HttpRequest()), mock.patch(
+            "sentry.utils.snuba.query", wraps=snuba.query
+        ) as query:
+            for _ in range(2):
+                count = self.ts.get_group_tag_value_count(
+                    self.proj1.id, self.proj1group1.id, self.proj1env1.id, "foo"
+                )
+                assert count == 2
+            assert query.call_count == 1
+
+            self.ts.get_group_tag_value_count(
+                self.proj1.id, self.proj1group1.id, self.proj1env1.id, "baz"
+            )
+            assert query.call_count == 2
+
+        # Nothing is memoized outside of requests.
+        with mock.patch("sentry.utils.snuba.query", wraps=snuba.query) as query:
+            for _ in range(2):
+                self.ts.get_group_tag_value_count(
+                    self.proj1.id, self.proj1group1.id, self.proj1env1.id, "foo"
+                )
+            assert query.call_count == 2
+
     def test_get_top_group_tag_values(self):
         resp = self.ts.get_top_group_tag_values(
             self.proj1.id, self.proj1group1.id, self.proj1env1.id, "foo", 1